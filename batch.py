@@ -0,0 +1,188 @@
+# batch.py
+
+"""
+Runs a file of search terms unattended, back to back on one logged-in browser.
+
+Each line of the query file is a search term, optionally followed by its own
+max_posts and max_runtime, separated by "|". Blank lines and lines starting
+with # are ignored:
+
+    # query | max_posts | max_runtime
+    lawn mowing | 50 | 600
+    snow removal | 30
+    handyman
+
+If the browser session is lost mid-crawl, the driver is recovered (logging in
+again only if `verify_login` fails) and the crawl resumes from its checkpoint.
+A query that still fails is recorded and the batch moves on. Nothing waits on input(): drafted
+comments stay queued for `python review_comments.py`, and only comments that
+were already approved get posted. Each query's outcome is stored in
+`batch_results`, and its stage timings in `runs`/`stage_metrics`.
+
+Usage:
+    python batch.py queries.txt [--max-posts 50] [--max-runtime 1200] [--headless] [--full-feed]
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import time  # Batch and per-query timings
+import logging  # For structured logging
+import argparse  # Command-line interface
+
+from config import NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD, HEADLESS_MODE, CRAWL_NEWEST_FIRST
+from database import initialize_db, save_batch_result, shutdown_post_writer
+from ledger import shutdown_ledger
+from nextdoor_login import login_to_nextdoor
+from main import run_search_with_resume, recover_driver
+from nextdoor_scrape import driver_alive
+from utils import human_pause, configure_logging
+
+
+def load_queries(path, max_posts=50, max_runtime=1200):
+    """
+    Reads a query file (see the module docstring for the format).
+
+    Args:
+        path (str): Query file.
+        max_posts (int, optional): Limit for lines that don't set their own.
+        max_runtime (int, optional): Runtime limit in seconds for lines that don't set their own.
+
+    Returns:
+        list[dict]: `query`, `max_posts` and `max_runtime` per query, in file order.
+
+    Raises:
+        ValueError: If a line has too many fields or a limit isn't a positive integer.
+    """
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [field.strip() for field in line.split("|")]
+            if len(fields) > 3 or not fields[0]:
+                raise ValueError(f"{path}:{line_number}: expected 'query | max_posts | max_runtime'")
+            limits = [max_posts, max_runtime]
+            for i, field in enumerate(fields[1:]):
+                if not field:
+                    continue
+                if not field.isdigit() or int(field) == 0:
+                    raise ValueError(f"{path}:{line_number}: '{field}' is not a positive integer")
+                limits[i] = int(field)
+            jobs.append({"query": fields[0], "max_posts": limits[0], "max_runtime": limits[1]})
+    return jobs
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        logging.debug(f"Error closing the browser: {e}")
+
+
+def run_batch(jobs, login, pause=(10, 30), newest_first=CRAWL_NEWEST_FIRST):
+    """
+    Runs every query in `jobs` on one driver, recording each outcome.
+
+    Ctrl-C stops the batch after recording what finished. The driver is closed
+    when the batch ends either way.
+
+    Args:
+        jobs (list[dict]): Output of `load_queries`.
+        login (callable): Returns a logged-in driver, or None if login failed.
+            Called once up front and again whenever the session can't be recovered.
+        pause (tuple, optional): Human-like pause range in seconds between queries.
+        newest_first (bool, optional): Let each crawl stop at posts stored by earlier runs
+            (see `parse_posts`); False walks every feed in full.
+
+    Returns:
+        list[dict]: One result per query run: its job fields plus `status`, `error`,
+        `run_id`, `posts_saved`, `posts_skipped`, `started_at` and `finished_at`.
+    """
+    batch_started_at = time.time()
+    driver = None
+    login_failed = False
+    results = []
+    try:
+        for position, job in enumerate(jobs, 1):
+            result = dict(job, batch_started_at=batch_started_at, position=position, status=None, error=None,
+                          run_id=None, posts_saved=0, posts_skipped=0, started_at=time.time())
+            if driver is None and not login_failed:
+                driver = login()
+                login_failed = driver is None
+
+            if login_failed:
+                result.update(status="skipped", error="login failed")
+            else:
+                logging.info(f"Batch query {position}/{len(jobs)}: '{job['query']}'")
+                try:
+                    driver, status, run, run_id = run_search_with_resume(
+                        driver, job["query"], job["max_posts"], job["max_runtime"], review=False, login=login,
+                        newest_first=newest_first,
+                    )
+                    result.update(status=status, run_id=run_id)
+                    if run is not None:
+                        result["posts_saved"] = run.counters.get("posts_saved", 0)
+                        result["posts_skipped"] = run.counters.get("posts_skipped", 0)
+                    if status == "error":
+                        result["error"] = "browser session lost"
+                except Exception as e:
+                    logging.error(f"Batch query '{job['query']}' failed: {e}")
+                    result.update(status="error", error=f"{type(e).__name__}: {e}")
+                    if not driver_alive(driver):
+                        driver = recover_driver(driver, login)
+                login_failed = driver is None
+
+            result["finished_at"] = time.time()
+            save_batch_result(result)
+            results.append(result)
+            if position < len(jobs) and not login_failed:
+                human_pause(*pause)
+    except KeyboardInterrupt:
+        logging.info(f"Batch interrupted by user after {len(results)}/{len(jobs)} queries.")
+    finally:
+        if driver is not None:
+            logging.info("Closing browser session...")
+            _quit(driver)
+    return results
+
+
+def print_batch_summary(results):
+    """Prints one line per batch query with its status, new posts and duration."""
+    print(f"\n{'query':<32}{'status':>12}{'saved':>7}{'skipped':>9}{'seconds':>9}")
+    for result in results:
+        print(f"{result['query'][:31]:<32}{result['status']:>12}{result['posts_saved']:>7}"
+              f"{result['posts_skipped']:>9}{result['finished_at'] - result['started_at']:>9.0f}")
+    failed = sum(1 for result in results if result["status"] != "ok")
+    print(f"\n{len(results)} queries, {failed} not ok, "
+          f"{sum(result['posts_saved'] for result in results)} new posts saved.")
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("query_file", help="File with one search term per line.")
+    parser.add_argument("--max-posts", type=int, default=50, help="Default posts per query (default 50).")
+    parser.add_argument("--max-runtime", type=int, default=1200, help="Default seconds per query (default 1200).")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS_MODE, help="Run Chrome headless.")
+    parser.add_argument("--full-feed", action="store_true",
+                        help="Walk every feed in full instead of stopping at posts stored by earlier runs.")
+    args = parser.parse_args()
+
+    try:
+        jobs = load_queries(args.query_file, args.max_posts, args.max_runtime)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not jobs:
+        parser.error(f"{args.query_file} has no queries.")
+
+    initialize_db()
+    try:
+        results = run_batch(jobs, lambda: login_to_nextdoor(NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD, headless=args.headless),
+                            newest_first=CRAWL_NEWEST_FIRST and not args.full_feed)
+        print_batch_summary(results)
+    finally:
+        # Commit any posts still sitting in the write-behind buffers
+        shutdown_post_writer()
+        shutdown_ledger()
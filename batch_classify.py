@@ -0,0 +1,285 @@
+# batch_classify.py
+
+"""
+Offline (re)classification of stored posts through Batch-API-style JSONL files.
+
+Instead of one synchronous chat call per row, the backfill is split into
+three steps that each stream their input, so memory stays bounded:
+
+ 1) export  - write one Chat Completions request per unclassified or stale post
+ 2) run     - send the file to the OpenAI Batch API (submit/fetch), or use the
+              local stand-in (`local`) that writes a result file without network
+ 3) import  - read the result file and bulk-update `service_request` in chunks
+
+Answers from the local stand-in are stored with classification_version
+"keyword-standin", not the prompt version, so the next export picks them up again.
+
+Usage:
+    python batch_classify.py export --out batch_requests.jsonl [--all] [--limit N]
+    python batch_classify.py local  --requests batch_requests.jsonl --results batch_results.jsonl
+    python batch_classify.py submit --requests batch_requests.jsonl
+    python batch_classify.py fetch  BATCH_ID --results batch_results.jsonl
+    python batch_classify.py import --results batch_results.jsonl
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import json  # Request/result files are JSON Lines
+import logging  # For structured logging
+import argparse  # Command-line interface
+
+from classifier import (
+    CLASSIFY_PROMPT_VERSION,
+    build_classification_request,
+    parse_classification,
+    get_openai_client,
+)
+from database import (
+    initialize_db,
+    iter_posts_needing_classification,
+    update_classifications,
+    KEYWORD_STANDIN_VERSION,
+    NON_LLM_VERSIONS,
+)
+from prefilter import seed_hits
+from utils import configure_logging
+
+CUSTOM_ID_PREFIX = "post-"
+
+
+# ---------------------------------------------------------------------------
+# 1. Export request files
+# ---------------------------------------------------------------------------
+def export_batch_requests(output_path, include_current=False, limit=None):
+    """
+    Writes one Batch API request line per post that needs (re)classification.
+
+    Args:
+        output_path (str): JSONL file to write.
+        include_current (bool, optional): Also export posts already labelled with the current prompt.
+        limit (int, optional): Stop after this many requests.
+
+    Returns:
+        int: Number of requests written.
+    """
+    written = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+        for post_id, author, content in iter_posts_needing_classification(CLASSIFY_PROMPT_VERSION, include_current):
+            if limit is not None and written >= limit:
+                break
+            if not content or not content.strip():
+                continue
+            request = {
+                "custom_id": f"{CUSTOM_ID_PREFIX}{post_id}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": build_classification_request(content, author),
+            }
+            out.write(json.dumps(request, ensure_ascii=False) + "\n")
+            written += 1
+
+    logging.info(f"Wrote {written} classification requests to {output_path}.")
+    return written
+
+
+# ---------------------------------------------------------------------------
+# 2. Run the batch (OpenAI Batch API or local stand-in)
+# ---------------------------------------------------------------------------
+def keyword_responder(body):
+    """
+    Answers a classification request locally with the prefilter's seed phrases.
+
+    Args:
+        body (dict): The Chat Completions request body from the request file.
+
+    Returns:
+        str: Message content in the same JSON shape the model returns.
+    """
+    post_text = body["messages"][-1]["content"].lower()
+    is_request = bool(seed_hits(post_text))
+    return json.dumps({
+        "is_service_request": is_request,
+        "service_type": None,
+        "comment": None,
+    })
+
+
+def run_local_batch(requests_path, results_path, responder=keyword_responder, version=KEYWORD_STANDIN_VERSION):
+    """
+    Produces a Batch-API-style result file without calling the network.
+
+    Each result body names `version` as its model, so `import_batch_results`
+    stores the answers under that version instead of the prompt version.
+
+    Args:
+        requests_path (str): JSONL request file written by `export_batch_requests`.
+        results_path (str): JSONL result file to write.
+        responder (callable, optional): `responder(body) -> str` returning the message content.
+        version (str, optional): classification_version for these answers; one of NON_LLM_VERSIONS.
+
+    Returns:
+        int: Number of results written.
+    """
+    written = 0
+    with open(requests_path, encoding="utf-8") as requests_file, open(results_path, "w", encoding="utf-8") as out:
+        for line in requests_file:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            try:
+                content = responder(request["body"])
+                result = {
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": {
+                            "model": version,
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                        },
+                    },
+                    "error": None,
+                }
+            except Exception as e:
+                result = {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            written += 1
+
+    logging.info(f"Local stand-in wrote {written} results to {results_path}.")
+    return written
+
+
+def submit_openai_batch(requests_path):
+    """
+    Uploads a request file and starts an OpenAI batch job.
+
+    Returns:
+        str: The batch ID to pass to `fetch_openai_batch`.
+    """
+    client = get_openai_client()
+
+    with open(requests_path, "rb") as requests_file:
+        uploaded = client.files.create(file=requests_file, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    logging.info(f"Submitted batch {batch.id} ({batch.status}).")
+    return batch.id
+
+
+def fetch_openai_batch(batch_id, results_path):
+    """
+    Downloads the result file of a finished OpenAI batch job.
+
+    Returns:
+        bool: True if the results were written, False if the batch isn't complete yet.
+    """
+    client = get_openai_client()
+
+    batch = client.batches.retrieve(batch_id)
+    if batch.status != "completed" or not batch.output_file_id:
+        logging.info(f"Batch {batch_id} is {batch.status}; nothing to download yet.")
+        return False
+
+    client.files.content(batch.output_file_id).write_to_file(results_path)
+    logging.info(f"Downloaded results of batch {batch_id} to {results_path}.")
+    return True
+
+
+# ---------------------------------------------------------------------------
+# 3. Import result files
+# ---------------------------------------------------------------------------
+def import_batch_results(results_path, chunk_size=500):
+    """
+    Reads a result file and updates `service_request` for every parsed answer.
+
+    Updates are written in chunks of `chunk_size` rows per transaction. Answers
+    whose body names a version in NON_LLM_VERSIONS as the model (the local
+    stand-in's) are stored under that version; all others under CLASSIFY_PROMPT_VERSION.
+
+    Args:
+        results_path (str): JSONL result file.
+        chunk_size (int, optional): Rows per UPDATE transaction.
+
+    Returns:
+        dict: Counts of `updated`, `failed` (error or unparseable) and `yes` labels.
+    """
+    stats = {"updated": 0, "failed": 0, "yes": 0}
+    pending = []
+
+    with open(results_path, encoding="utf-8") as results_file:
+        for line in results_file:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            custom_id = result.get("custom_id", "")
+            response = result.get("response") or {}
+
+            body = response.get("body") or {}
+
+            classification = None
+            if not result.get("error") and response.get("status_code") == 200 and custom_id.startswith(CUSTOM_ID_PREFIX):
+                choices = body.get("choices") or [{}]
+                classification = parse_classification(choices[0].get("message", {}).get("content"))
+
+            if classification is None:
+                stats["failed"] += 1
+                continue
+
+            label = "yes" if classification.is_service_request else "no"
+            stats["yes"] += label == "yes"
+            version = body.get("model") if body.get("model") in NON_LLM_VERSIONS else CLASSIFY_PROMPT_VERSION
+            pending.append((label, version, int(custom_id[len(CUSTOM_ID_PREFIX):])))
+
+            if len(pending) >= chunk_size:
+                stats["updated"] += update_classifications(pending)
+                pending = []
+
+    stats["updated"] += update_classifications(pending)
+    logging.info(
+        f"Imported {results_path}: {stats['updated']} posts updated "
+        f"({stats['yes']} service requests), {stats['failed']} failed."
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = commands.add_parser("export", help="Write requests for unclassified or stale posts.")
+    export_cmd.add_argument("--out", default="batch_requests.jsonl")
+    export_cmd.add_argument("--all", action="store_true", help="Re-export posts already labelled with the current prompt.")
+    export_cmd.add_argument("--limit", type=int, default=None)
+
+    local_cmd = commands.add_parser("local", help="Answer a request file locally without network.")
+    local_cmd.add_argument("--requests", default="batch_requests.jsonl")
+    local_cmd.add_argument("--results", default="batch_results.jsonl")
+
+    submit_cmd = commands.add_parser("submit", help="Upload a request file to the OpenAI Batch API.")
+    submit_cmd.add_argument("--requests", default="batch_requests.jsonl")
+
+    fetch_cmd = commands.add_parser("fetch", help="Download the results of a finished batch.")
+    fetch_cmd.add_argument("batch_id")
+    fetch_cmd.add_argument("--results", default="batch_results.jsonl")
+
+    import_cmd = commands.add_parser("import", help="Apply a result file to the posts table.")
+    import_cmd.add_argument("--results", default="batch_results.jsonl")
+    import_cmd.add_argument("--chunk-size", type=int, default=500)
+
+    args = parser.parse_args()
+    initialize_db()
+
+    if args.command == "export":
+        export_batch_requests(args.out, include_current=args.all, limit=args.limit)
+    elif args.command == "local":
+        run_local_batch(args.requests, args.results)
+    elif args.command == "submit":
+        print(submit_openai_batch(args.requests))
+    elif args.command == "fetch":
+        fetch_openai_batch(args.batch_id, args.results)
+    elif args.command == "import":
+        import_batch_results(args.results, chunk_size=args.chunk_size)
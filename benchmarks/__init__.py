@@ -0,0 +1,5 @@
+"""
+Offline micro-benchmarks for the Nextdoor bot.
+
+Run them from the repository root, e.g. `python -m benchmarks.db_connections`.
+"""
@@ -0,0 +1,84 @@
+# benchmarks/browser_startup.py
+
+"""
+Live benchmark of browser startup: a fresh profile with a full login versus a
+persisted Chrome profile whose saved session is reused.
+
+Each launch is timed from `login_to_nextdoor` until the search bar is
+available, then the browser is closed. The first profile launch may have to
+log in (and pass 2FA) to create the saved session; it is reported but left
+out of the profile median. Needs Chrome and the credentials in config.py.
+
+Usage:
+    python -m benchmarks.browser_startup [--runs 3] [--profile-dir chrome_profile] [--headless]
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import logging
+import argparse
+import statistics
+
+import nextdoor_login
+from config import NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD, HEADLESS_MODE, CHROME_PROFILE_DIR
+from utils import configure_logging
+
+
+def launch(profile_dir, headless):
+    """
+    Starts and closes one browser session.
+
+    Returns:
+        (float, bool): Seconds until the browser was ready and whether the saved
+        session was reused, or None if startup failed.
+    """
+    driver = nextdoor_login.login_to_nextdoor(NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD, headless=headless,
+                                              profile_dir=profile_dir)
+    if driver is None:
+        return None
+    try:
+        return nextdoor_login.last_startup["seconds"], nextdoor_login.last_startup["reused_session"]
+    finally:
+        driver.quit()
+
+
+def run(runs, profile_dir, headless):
+    """
+    Launches `runs` times with a fresh profile and `runs` + 1 times with `profile_dir`.
+
+    Returns:
+        dict: Median startup seconds for "fresh" and "profile" (None if no launch succeeded).
+    """
+    results = {"fresh": [], "profile": []}
+    for mode, dir_for_mode, launches in (("fresh", None, runs), ("profile", profile_dir, runs + 1)):
+        for n in range(launches):
+            outcome = launch(dir_for_mode, headless)
+            if outcome is None:
+                print(f"{mode:<8} launch {n + 1}: failed")
+                continue
+            seconds, reused = outcome
+            note = "reused session" if reused else "logged in"
+            print(f"{mode:<8} launch {n + 1}: {seconds:6.1f}s ({note})")
+            if mode == "fresh" or n > 0:
+                results[mode].append(seconds)
+
+    medians = {mode: statistics.median(times) if times else None for mode, times in results.items()}
+    print()
+    for mode, median in medians.items():
+        print(f"{mode:<8} median: " + (f"{median:6.1f}s" if median is not None else "n/a"))
+    if medians["fresh"] and medians["profile"]:
+        print(f"Saved per launch: {medians['fresh'] - medians['profile']:.1f}s")
+    return medians
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Timed launches per mode (default 3).")
+    parser.add_argument("--profile-dir", default=CHROME_PROFILE_DIR or "chrome_profile",
+                        help="Persisted Chrome user-data dir (default from config).")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS_MODE, help="Run Chrome headless.")
+    args = parser.parse_args()
+
+    configure_logging(logging.WARNING)
+    run(args.runs, args.profile_dir, args.headless)
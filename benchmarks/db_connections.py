@@ -0,0 +1,85 @@
+# benchmarks/db_connections.py
+
+"""
+Compares the shared per-thread connection in database.py against the old
+behaviour of opening a fresh `sqlite3.connect` for every call.
+
+Both variants run the same workload as `parse_posts`: one `post_exists` check
+followed by one `save_post` per post, against a throwaway database file.
+
+Usage:
+    python -m benchmarks.db_connections [--posts 2000]
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import os
+import time
+import sqlite3
+import logging
+import argparse
+import tempfile
+
+import database
+from utils import configure_logging
+
+
+def connect_per_call(db_path, posts):
+    """Replays the workload the way database.py used to: one connection per call."""
+    for i in range(posts):
+        link = f"https://nextdoor.com/p/bench{i}"
+
+        conn = sqlite3.connect(db_path)
+        conn.execute("SELECT 1 FROM posts WHERE link = ?", (link,)).fetchone()
+        conn.close()
+
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "INSERT INTO posts (link, author, date, location, content, service_request) VALUES (?, ?, ?, ?, ?, ?)",
+            (link, "Bench Author", "01/01/25, 12:00", "Bench Hills", "Need my lawn mowed", "no"),
+        )
+        conn.commit()
+        conn.close()
+
+
+def shared_connection(db_path, posts):
+    """Replays the workload through database.py's shared connection."""
+    database.configure_db(db_path)
+    for i in range(posts):
+        link = f"https://nextdoor.com/p/bench{i}"
+        database.post_exists(link)
+        database.save_post(link, "Bench Author", "01/01/25, 12:00", "Bench Hills", "Need my lawn mowed", "no")
+    database.close_all_connections()
+
+
+def run(posts):
+    """Runs both variants on fresh databases and prints posts/second for each."""
+    results = {}
+    for name, workload in (("connect-per-call", connect_per_call), ("shared connection", shared_connection)):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            database.configure_db(db_path)
+            database.initialize_db()
+            database.close_all_connections()
+
+            start = time.perf_counter()
+            workload(db_path, posts)
+            elapsed = time.perf_counter() - start
+            results[name] = elapsed
+
+    for name, elapsed in results.items():
+        print(f"{name:<20} {elapsed:8.3f}s  {posts / elapsed:10.0f} posts/s")
+    baseline = results["connect-per-call"]
+    print(f"speedup: {baseline / results['shared connection']:.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=2000, help="Number of simulated posts (default 2000).")
+    args = parser.parse_args()
+
+    # The per-call INFO lines would dominate the measurement
+    configure_logging(logging.WARNING)
+    run(args.posts)
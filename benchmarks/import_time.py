@@ -0,0 +1,95 @@
+# benchmarks/import_time.py
+
+"""
+Import-time benchmark for the bot's modules and commands.
+
+Each module is imported in a fresh interpreter `--runs` times. The report
+shows the median import time and which heavy third-party stacks the import
+pulled in (OpenAI, httpx, pydantic, Selenium, undetected_chromedriver,
+selenium_stealth, BeautifulSoup). DB-only and reporting commands should load
+none of them. A module whose dependencies aren't installed is reported as failed.
+
+Usage:
+    python -m benchmarks.import_time [--runs 5] [module ...]
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = (
+    "database",
+    "search",
+    "review_comments",
+    "ledger",
+    "selector_registry",
+    "prefilter",
+    "cascade",
+    "batch_classify",
+    "classifier",
+    "nextdoor_login",
+    "nextdoor_scrape",
+    "main",
+)
+HEAVY_PACKAGES = ("openai", "httpx", "pydantic", "selenium", "undetected_chromedriver", "selenium_stealth", "bs4")
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def measure(module, runs=5):
+    """
+    Imports `module` in `runs` fresh interpreters.
+
+    Returns:
+        dict: `median_ms`, `heavy` (heavy packages loaded) and `error` (last stderr line if the import failed).
+    """
+    times = []
+    heavy = ""
+    for _ in range(runs):
+        probe = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_PACKAGES)],
+            cwd=REPO_ROOT, capture_output=True, text=True,
+        )
+        if probe.returncode != 0:
+            lines = probe.stderr.strip().splitlines()
+            return {"median_ms": None, "heavy": "", "error": lines[-1] if lines else f"exit {probe.returncode}"}
+        # The probe always ends with two lines: the import time and the (possibly empty) package list
+        elapsed, heavy = probe.stdout.splitlines()[-2:]
+        times.append(float(elapsed) * 1000)
+    return {"median_ms": statistics.median(times), "heavy": heavy, "error": None}
+
+
+def run(modules=MODULES, runs=5):
+    """Measures every module and prints the report."""
+    results = {}
+    print(f"{'module':<18}{'import ms':>10}  heavy packages loaded")
+    for module in modules:
+        result = results[module] = measure(module, runs)
+        if result["error"]:
+            print(f"{module:<18}{'failed':>10}  {result['error']}")
+        else:
+            print(f"{module:<18}{result['median_ms']:>10.1f}  {result['heavy'] or '-'}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=MODULES, help="Modules to import (default: all entry points).")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module (default 5).")
+    args = parser.parse_args()
+
+    run(args.modules, args.runs)
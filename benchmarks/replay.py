@@ -0,0 +1,309 @@
+# benchmarks/replay.py
+
+"""
+Recorded-HTML fixtures and a fake WebDriver that replays them.
+
+A fixture is a directory with a `manifest.json`:
+
+    {
+        "search_page": "search.html",      # saved search results page
+        "cards_per_scroll": 10,            # cards revealed per scroll
+        "posts": {                         # post link -> saved detail page
+            "https://nextdoor.com/p/abc": "posts/0001.html"
+        }
+    }
+
+`record_fixture` saves live pages in that format. `generate_fixture` writes a
+synthetic one that matches the scraper's current selectors. FakeDriver serves
+the pages through the subset of the Selenium API that nextdoor_scrape uses,
+and counts every call so benchmarks can report WebDriver round trips.
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import os
+import json
+import time
+import random
+from collections import Counter
+
+from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import NoSuchElementException
+
+from nextdoor_scrape import FEED_HARVEST_SCRIPT
+from selector_registry import SELECTOR_CANDIDATES
+
+SEARCH_URL = "https://nextdoor.com/search/posts/"
+
+
+# ---------------------------------------------------------------------------
+# 1. Fixtures
+# ---------------------------------------------------------------------------
+def load_fixture(fixture_dir):
+    """
+    Reads a fixture directory into memory.
+
+    Returns:
+        dict: `search_html`, `cards_per_scroll` and `posts` (link -> HTML).
+    """
+    with open(os.path.join(fixture_dir, "manifest.json"), encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    def read(relative_path):
+        with open(os.path.join(fixture_dir, relative_path), encoding="utf-8") as page_file:
+            return page_file.read()
+
+    return {
+        "search_html": read(manifest["search_page"]),
+        "cards_per_scroll": manifest.get("cards_per_scroll", 10),
+        "posts": {link: read(path) for link, path in manifest["posts"].items()},
+    }
+
+
+def record_fixture(driver, fixture_dir, post_links, cards_per_scroll=10):
+    """
+    Saves the search results page the driver is showing, then each post page.
+
+    Args:
+        driver (WebDriver): A live, logged-in driver showing search results.
+        fixture_dir (str): Directory to write.
+        post_links (list): Post URLs to visit and save.
+        cards_per_scroll (int, optional): Recorded in the manifest for replay.
+    """
+    os.makedirs(os.path.join(fixture_dir, "posts"), exist_ok=True)
+    with open(os.path.join(fixture_dir, "search.html"), "w", encoding="utf-8") as page_file:
+        page_file.write(driver.page_source)
+
+    posts = {}
+    for n, link in enumerate(post_links, start=1):
+        driver.get(link)
+        time.sleep(3)
+        relative_path = f"posts/{n:04d}.html"
+        with open(os.path.join(fixture_dir, relative_path), "w", encoding="utf-8") as page_file:
+            page_file.write(driver.page_source)
+        posts[link] = relative_path
+
+    with open(os.path.join(fixture_dir, "manifest.json"), "w", encoding="utf-8") as manifest_file:
+        json.dump({"search_page": "search.html", "cards_per_scroll": cards_per_scroll, "posts": posts}, manifest_file, indent=2)
+
+
+SAMPLE_CONTENT = [
+    "Looking for someone to mow my lawn every other week this summer. Any recommendations?",
+    "Need a snow removal service for our driveway this winter, who do you all use?",
+    "Lost cat near the park, orange tabby, answers to Milo. Please call if you see him.",
+    "Can anyone recommend a landscaper to redo our front beds and add mulch?",
+    "Garage sale this Saturday 8-2, furniture, toys and tools.",
+    "Our deck and siding need a power wash before we sell. Quotes welcome!",
+    "Does anyone know why the sirens were going off last night?",
+    "Need junk hauled away from the basement, old couch and a fridge.",
+]
+
+
+def generate_fixture(fixture_dir, posts=40, cards_per_scroll=10, seed=0):
+    """
+    Writes a synthetic fixture whose markup matches the scraper's selectors.
+
+    Args:
+        fixture_dir (str): Directory to write.
+        posts (int, optional): Number of posts in the feed.
+        cards_per_scroll (int, optional): Cards revealed per scroll.
+        seed (int, optional): Seed for the generated content.
+    """
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(fixture_dir, "posts"), exist_ok=True)
+
+    cards = []
+    manifest_posts = {}
+    for n in range(1, posts + 1):
+        link = f"https://nextdoor.com/p/fixture{n:04d}?view=detail&init_source=search"
+        content = f"{rng.choice(SAMPLE_CONTENT)} (post {n})"
+        author = f"Neighbor {n}"
+        cards.append(
+            f'<div data-testid="dwell-tracker-searchFeedItem-{n}">'
+            f'<a class="BaseLink__kjvg670" href="{link}">{author}</a><p>{content}</p></div>'
+        )
+        page = (
+            "<html><body>"
+            f'<a class="_3I7vNNNM E7NPJ3WK" href="#">{author}</a>'
+            '<a class="post-byline-redesign post-byline-truncated" href="#">Fixture Hills</a>'
+            f'<a class="post-byline-redesign" href="#">{rng.randint(1, 23)} hr ago</a>'
+            f'<div class="blocks-uj7zvs"><span><div><span><span>{content}</span></span></div></span></div>'
+            '<form class="comment-body-container">'
+            '<textarea data-testid="comment-add-reply-input"></textarea>'
+            '<button data-testid="inline-composer-reply-button" aria-disabled="false">Reply</button>'
+            "</form></body></html>"
+        )
+        relative_path = f"posts/{n:04d}.html"
+        with open(os.path.join(fixture_dir, relative_path), "w", encoding="utf-8") as page_file:
+            page_file.write(page)
+        manifest_posts[link] = relative_path
+
+    search_page = (
+        '<html><body><input id="search-input-field"/>'
+        '<a data-testid="tab-posts" href="#">Posts</a>'
+        f'<div id="feed">{"".join(cards)}</div></body></html>'
+    )
+    with open(os.path.join(fixture_dir, "search.html"), "w", encoding="utf-8") as page_file:
+        page_file.write(search_page)
+    with open(os.path.join(fixture_dir, "manifest.json"), "w", encoding="utf-8") as manifest_file:
+        json.dump({"search_page": "search.html", "cards_per_scroll": cards_per_scroll, "posts": manifest_posts}, manifest_file, indent=2)
+
+
+# ---------------------------------------------------------------------------
+# 2. Fake WebDriver
+# ---------------------------------------------------------------------------
+class FakeElement:
+    """An element of a replayed page, backed by a BeautifulSoup tag."""
+
+    def __init__(self, driver, tag):
+        self._driver = driver
+        self._tag = tag
+
+    @property
+    def text(self):
+        self._driver.calls["element.text"] += 1
+        return " ".join(self._tag.get_text(" ", strip=True).split())
+
+    def get_attribute(self, name):
+        self._driver.calls["element.get_attribute"] += 1
+        value = self._tag.get(name)
+        return " ".join(value) if isinstance(value, list) else value
+
+    def click(self):
+        self._driver.calls["element.click"] += 1
+        href = self._tag.get("href")
+        if self._tag.name == "a" and href and href != "#":
+            self._driver.get(href)
+
+    def send_keys(self, *keys):
+        self._driver.calls["element.send_keys"] += 1
+        typed = "".join(keys)
+        if Keys.RETURN in typed and self._tag.get("id") == "search-input-field":
+            self._driver.get(SEARCH_URL)
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def find_element(self, by, value):
+        self._driver.calls["element.find_element"] += 1
+        found = self._driver._select(self._tag, by, value)
+        if not found:
+            raise NoSuchElementException(f"No element matches {value}")
+        return FakeElement(self._driver, found[0])
+
+    def find_elements(self, by, value):
+        self._driver.calls["element.find_elements"] += 1
+        return [FakeElement(self._driver, tag) for tag in self._driver._select(self._tag, by, value)]
+
+
+class FakeDriver:
+    """
+    Replays a fixture through the Selenium calls nextdoor_scrape makes.
+
+    Args:
+        fixture (dict): Output of `load_fixture`.
+        latency (float, optional): Seconds added to every navigation, to mimic page loads.
+    """
+
+    def __init__(self, fixture, latency=0.0):
+        self.fixture = fixture
+        self.latency = latency
+        self.calls = Counter()
+        self.current_url = "https://nextdoor.com/news_feed/"
+        self.scrolls = 0
+        self._history = []
+        self._soup = BeautifulSoup(fixture["search_html"], "html.parser")
+
+    # -- navigation ---------------------------------------------------------
+    def get(self, url):
+        self.calls["get"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        self._history.append(self.current_url)
+        self._load(url)
+
+    def back(self):
+        self.calls["back"] += 1
+        if self._history:
+            self._load(self._history.pop())
+
+    def _load(self, url):
+        self.current_url = url
+        if url in self.fixture["posts"]:
+            html = self.fixture["posts"][url]
+        else:
+            html = self.fixture["search_html"]
+            self.scrolls = 0
+        self._soup = BeautifulSoup(html, "html.parser")
+
+    # -- page access --------------------------------------------------------
+    def _visible_cards(self, card_selector=SELECTOR_CANDIDATES["feed_card"][0]):
+        cards = self._soup.select(card_selector)
+        return cards[:self.fixture["cards_per_scroll"] * (self.scrolls + 1)]
+
+    def _select(self, root, by, value):
+        if by == By.ID:
+            value = f"#{value}"
+        elif by == By.NAME:
+            value = f'[name="{value}"]'
+        elif by != By.CSS_SELECTOR:
+            raise NotImplementedError(f"FakeDriver does not support locator strategy {by}")
+        found = root.select(value)
+        if root is self._soup and any(selector in value for selector in SELECTOR_CANDIDATES["feed_card"]):
+            found = found[:len(self._visible_cards())]
+        return found
+
+    @property
+    def page_source(self):
+        self.calls["page_source"] += 1
+        return str(self._soup)
+
+    def find_element(self, by, value):
+        self.calls["find_element"] += 1
+        found = self._select(self._soup, by, value)
+        if not found:
+            raise NoSuchElementException(f"No element matches {value}")
+        return FakeElement(self, found[0])
+
+    def find_elements(self, by, value):
+        self.calls["find_elements"] += 1
+        return [FakeElement(self, tag) for tag in self._select(self._soup, by, value)]
+
+    def execute_script(self, script, *args):
+        self.calls["execute_script"] += 1
+        if script == FEED_HARVEST_SCRIPT:
+            card_selectors, link_selectors = args
+            for card_selector in card_selectors:
+                cards = []
+                for card in self._visible_cards(card_selector):
+                    link_selector = next((selector for selector in link_selectors if card.select_one(selector)), None)
+                    link = card.select_one(link_selector) if link_selector else None
+                    cards.append({
+                        "href": link.get("href") if link else None,
+                        "preview": card.get_text(" ", strip=True)[:1000],
+                        "card_selector": card_selector,
+                        "link_selector": link_selector,
+                    })
+                if cards:
+                    return cards
+            return []
+        if "scrollTo" in script and self.current_url not in self.fixture["posts"]:
+            self.scrolls += 1
+            return None
+        if "arguments[0].click()" in script and args:
+            args[0].click()
+        return None
+
+    # -- misc ---------------------------------------------------------------
+    def save_screenshot(self, path):
+        self.calls["save_screenshot"] += 1
+        return True
+
+    def quit(self):
+        self.calls["quit"] += 1
@@ -0,0 +1,141 @@
+# benchmarks/scrape_pipeline.py
+
+"""
+Offline benchmark of the full scrape pipeline.
+
+Replays a recorded (or generated) fixture through FakeDriver, classifies
+against the local stub OpenAI server, and reports posts per minute, time per
+stage (including the per-stage spans from metrics.py) and WebDriver call counts. No network or Nextdoor session is needed.
+
+Usage:
+    python -m benchmarks.scrape_pipeline [--fixture DIR] [--posts 40]
+                                         [--llm-latency 1.0] [--page-latency 0.2]
+                                         [--delay-scale 0]
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import os
+import time
+import sqlite3
+import logging
+import argparse
+import tempfile
+
+import utils
+import ledger
+import metrics
+import database
+import classifier
+import nextdoor_scrape
+import selector_registry
+from review_comments import review_pending_comments
+from benchmarks.replay import FakeDriver, generate_fixture, load_fixture
+from benchmarks.stub_openai import StubOpenAIServer
+
+
+def timed(stages, name, func, *args, **kwargs):
+    """Runs `func` and adds its wall time to `stages[name]`."""
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def run(fixture_dir, max_posts, llm_latency, page_latency, delay_scale):
+    """
+    Runs one search + parse over the fixture and prints the report.
+
+    Returns:
+        dict: `posts_per_minute`, `stages` (seconds) and `driver_calls`.
+    """
+    fixture = load_fixture(fixture_dir)
+    stages = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.configure_db(os.path.join(tmp, "bench.db"))
+        database.initialize_db()
+        utils.set_human_delay_scale(delay_scale)
+
+        stub = StubOpenAIServer(latency=llm_latency).start()
+        classifier.configure_openai(api_key="stub", base_url=stub.base_url)
+        try:
+            driver = FakeDriver(fixture, latency=page_latency)
+            start = time.perf_counter()
+            metrics.start_run("benchmark")
+            timed(stages, "search", nextdoor_scrape.search_nextdoor, driver, "landscaper")
+            timed(stages, "parse_posts", nextdoor_scrape.parse_posts, driver, max_posts=max_posts, max_runtime=3600)
+            # Approve every queued draft, as a reviewer would, and post them in one batch
+            review_pending_comments(reviewer=lambda item: ("approve", item["comment"]))
+            timed(stages, "post_approved_comments", nextdoor_scrape.post_approved_comments, driver)
+            total = time.perf_counter() - start
+            run_metrics = metrics.finish_run()
+            driver_calls = dict(driver.calls)
+
+            # Per-call micro-benchmarks on a single post page
+            sample_link = next(iter(fixture["posts"]))
+            probe = FakeDriver(fixture)
+            probe.get(sample_link)
+            timed(stages, "extract_post_details (1 post)", nextdoor_scrape.extract_post_details, probe, sample_link)
+            snapshot_calls = sum(probe.calls.values()) - 1
+            probe.calls.clear()
+            timed(stages, "extract_element_text x4 (1 post)", lambda: [
+                nextdoor_scrape.extract_element_text(probe, field, default)
+                for field, default in nextdoor_scrape.POST_FIELD_DEFAULTS.items()
+            ])
+            per_field_calls = sum(probe.calls.values())
+        finally:
+            stub.stop()
+            database.shutdown_post_writer()
+            ledger.shutdown_ledger()
+            # Persist buffered selector counts while the temporary DB still exists
+            selector_registry.flush_selector_stats()
+            database.close_all_connections()
+            utils.set_human_delay_scale(1.0)
+
+        saved = database_count(os.path.join(tmp, "bench.db"))
+
+    posts_per_minute = saved / (total / 60) if total else 0.0
+    print(f"\nPosts saved:        {saved}")
+    print(f"Total time:         {total:.2f}s")
+    print(f"Posts per minute:   {posts_per_minute:.1f}")
+    print(f"LLM requests:       {stub.requests}")
+    print("\nTime per stage:")
+    for name, seconds in stages.items():
+        print(f"  {name:<34} {seconds:8.3f}s")
+    print("\n" + metrics.format_summary(run_metrics, metrics.summarize(run_metrics)))
+    print("\nWebDriver calls during search + parse:")
+    for name, count in sorted(driver_calls.items(), key=lambda item: -item[1]):
+        print(f"  {name:<34} {count:8d}")
+    print(f"  {'total':<34} {sum(driver_calls.values()):8d}")
+    print(f"\nWebDriver calls to extract one post: snapshot={snapshot_calls}, per-field={per_field_calls}")
+    return {"posts_per_minute": posts_per_minute, "stages": stages, "driver_calls": driver_calls}
+
+
+def database_count(db_path):
+    """Counts stored posts in a finished benchmark database."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", help="Fixture directory (default: generate a synthetic one).")
+    parser.add_argument("--posts", type=int, default=40, help="Posts in the generated feed and max_posts (default 40).")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Stub OpenAI reply delay in seconds (default 1.0).")
+    parser.add_argument("--page-latency", type=float, default=0.2, help="Fake page load delay in seconds (default 0.2).")
+    parser.add_argument("--delay-scale", type=float, default=0.0, help="Multiplier for human-like pauses (default 0).")
+    args = parser.parse_args()
+
+    utils.configure_logging(logging.WARNING)
+    if args.fixture:
+        run(args.fixture, args.posts, args.llm_latency, args.page_latency, args.delay_scale)
+    else:
+        with tempfile.TemporaryDirectory() as fixture_dir:
+            generate_fixture(fixture_dir, posts=args.posts)
+            run(fixture_dir, args.posts, args.llm_latency, args.page_latency, args.delay_scale)
@@ -0,0 +1,172 @@
+# benchmarks/stub_openai.py
+
+"""
+A local OpenAI-compatible chat completions server for offline benchmarks.
+
+It answers `POST /v1/chat/completions` after a configurable delay. Replies to
+the structured classification prompt are JSON built from the prefilter's seed
+phrases (with logprobs when asked, for the model cascade); other prompts get
+"yes"/"no" or a canned comment.
+
+Usage:
+    python -m benchmarks.stub_openai [--port 8765] [--latency 1.5]
+
+Then point the bot at it with OPENAI_BASE_URL = "http://127.0.0.1:8765/v1".
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from prefilter import seed_hits
+
+STUB_COMMENT = "Hi neighbor! We'd be glad to help with that. Call 808-987-6065 or email cj@mokunebraska.com."
+
+
+def stub_reply(request):
+    """Builds the assistant message content for a chat request."""
+    messages = request.get("messages", [])
+    post_text = messages[-1]["content"] if messages else ""
+    is_request = bool(seed_hits(post_text))
+
+    if request.get("response_format", {}).get("type") == "json_object":
+        return json.dumps({
+            "is_service_request": is_request,
+            "service_type": "lawn care" if is_request else None,
+            "comment": STUB_COMMENT if is_request else None,
+        })
+    system_prompt = messages[0]["content"] if messages else ""
+    if "Answer only 'yes' or 'no'" in system_prompt:
+        return "yes" if is_request else "no"
+    if "service extraction" in system_prompt:
+        return "lawn care"
+    return STUB_COMMENT
+
+
+def stub_logprobs(request, content):
+    """
+    Builds a `logprobs` block for replies to requests that ask for it.
+
+    The `is_service_request` token is confident when the post has no seed phrase
+    or several, and unsure when it has exactly one, so the cascade escalates some posts.
+    """
+    if not request.get("logprobs") or request.get("response_format", {}).get("type") != "json_object":
+        return None
+    messages = request.get("messages", [])
+    hits = len(seed_hits(messages[-1]["content"] if messages else ""))
+    answer = "true" if hits else "false"
+    other = "false" if hits else "true"
+    p_answer = 0.7 if hits == 1 else 0.98
+    token = {
+        "token": answer,
+        "logprob": math.log(p_answer),
+        "top_logprobs": [
+            {"token": answer, "logprob": math.log(p_answer)},
+            {"token": other, "logprob": math.log(1 - p_answer)},
+        ],
+    }
+    return {"content": [{"token": '{"', "logprob": 0.0, "top_logprobs": []}, token]}
+
+
+class StubOpenAIServer:
+    """
+    Runs the stub in a background thread.
+
+    Args:
+        port (int, optional): Port to listen on; 0 picks a free one.
+        latency (float, optional): Mean seconds to wait before answering.
+        jitter (float, optional): +/- seconds of uniform noise added to the latency.
+    """
+
+    def __init__(self, port=0, latency=1.0, jitter=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+
+                time.sleep(max(0.0, stub.latency + random.uniform(-stub.jitter, stub.jitter)))
+                with stub._lock:
+                    stub.requests += 1
+                    request_id = stub.requests
+
+                content = stub_reply(request)
+                prompt_tokens = sum(len(m.get("content") or "") for m in request.get("messages", [])) // 4
+                completion_tokens = len(content) // 4
+                body = json.dumps({
+                    "id": f"chatcmpl-stub-{request_id}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "logprobs": stub_logprobs(request, content),
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                }).encode("utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds before each reply (default 1.0).")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(args.port, args.latency, args.jitter).start()
+    print(f"Stub OpenAI server listening on {server.base_url} (latency {args.latency}s). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,169 @@
+# cascade.py
+
+"""
+Reports on and tunes the classifier's model cascade.
+
+`classify_post` asks CASCADE_FAST_MODEL first and escalates to
+CLASSIFIER_MODEL when the fast answer's probability is below
+CASCADE_CONFIDENCE_THRESHOLD (see classifier.request_classification).
+
+ report - escalation rate, fast/escalated agreement and per-tier latency from
+          the `cascade_decisions` table
+ tune   - run the fast tier over posts the cascade escalated, so their label
+          came from the larger model, and show, for a range of thresholds,
+          how many posts would escalate, how often the kept fast answers match
+          those labels, and the estimated cost per post
+
+Tuning only uses escalated posts because every other stored label came from
+the fast tier itself or from the prefilter; scoring the fast tier against
+them would measure it against its own answers. The sample is therefore
+skewed towards posts the fast tier found hard, so the accuracy it shows is a
+lower bound.
+
+Usage:
+    python cascade.py report [--days 30]
+    python cascade.py tune [--limit 200]
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import time  # Report window
+import random  # Sampling escalated posts
+import logging  # For structured logging
+import argparse  # Command-line interface
+from concurrent.futures import ThreadPoolExecutor  # Parallel fast-tier calls while tuning
+
+from config import CLASSIFIER_MODEL, CASCADE_FAST_MODEL, CASCADE_CONFIDENCE_THRESHOLD, CLASSIFIER_WORKERS
+from database import initialize_db, iter_escalated_labels, cascade_report
+from ledger import estimate_cost, shutdown_ledger
+from utils import configure_logging
+
+TUNE_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98, 0.99)
+
+
+def print_cascade_report(days=None):
+    """Prints how the cascade has routed posts, per fast-tier model."""
+    since = time.time() - days * 86400 if days else None
+    rows = cascade_report(since)
+    if not rows:
+        print("No cascade decisions recorded.")
+        return rows
+    for row in rows:
+        escalated = row["escalated"] or 0
+        print(f"Fast model:            {row['fast_model']}")
+        print(f"Posts routed:          {row['posts']}")
+        print(f"Escalated:             {escalated} ({escalated / row['posts']:.1%})")
+        if row["compared"]:
+            print(f"Agreement when escalated: {row['agreed'] / row['compared']:.1%} of {row['compared']}")
+        print(f"Avg fast latency:      {row['avg_fast_latency_ms'] or 0:.0f} ms")
+        print(f"Avg escalated latency: {row['avg_escalated_latency_ms'] or 0:.0f} ms\n")
+    return rows
+
+
+def score_fast_tier(samples, workers=CLASSIFIER_WORKERS):
+    """
+    Runs the fast tier over labelled posts.
+
+    Args:
+        samples (list): (content, is_service_request) pairs.
+        workers (int, optional): Concurrent requests.
+
+    Returns:
+        list[dict]: `label`, `answer` (None if the call failed), `confidence`,
+        `prompt_tokens` and `completion_tokens` per post.
+    """
+    # Imported here so `cascade.py report` doesn't load the classifier and its schema
+    from classifier import send_classification_request, answer_probability
+
+    def score(sample):
+        content, label = sample
+        scored = {"label": label, "answer": None, "confidence": None, "prompt_tokens": 0, "completion_tokens": 0}
+        try:
+            response, result, _ = send_classification_request(
+                content, "a neighbor", CASCADE_FAST_MODEL, "cascade_tune", logprobs=True
+            )
+        except Exception as e:
+            logging.warning(f"Fast classifier failed: {e}")
+            return scored
+        usage = getattr(response, "usage", None)
+        scored["prompt_tokens"] = getattr(usage, "prompt_tokens", 0) or 0
+        scored["completion_tokens"] = getattr(usage, "completion_tokens", 0) or 0
+        p_true = answer_probability(response)
+        if result is not None:
+            scored["answer"] = result.is_service_request
+            if p_true is not None:
+                scored["confidence"] = p_true if result.is_service_request else 1 - p_true
+        return scored
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(score, samples))
+
+
+def threshold_table(scored, thresholds=TUNE_THRESHOLDS):
+    """
+    Simulates the cascade at each threshold.
+
+    Escalated posts are assumed to get their label, since `scored` should only
+    hold posts labelled by the larger model (see iter_escalated_labels).
+
+    Returns:
+        list[dict]: `threshold`, `escalation_rate`, `fast_accuracy` (kept answers
+        matching the label), `recall` (stored 'yes' posts answered yes) and
+        `cost_per_post` (USD, estimated).
+    """
+    total = len(scored)
+    prompt_tokens = sum(s["prompt_tokens"] for s in scored) / total if total else 0
+    completion_tokens = sum(s["completion_tokens"] for s in scored) / total if total else 0
+    fast_cost = estimate_cost(CASCADE_FAST_MODEL, prompt_tokens, completion_tokens) or 0.0
+    large_cost = estimate_cost(CLASSIFIER_MODEL, prompt_tokens, completion_tokens) or 0.0
+    positives = sum(1 for s in scored if s["label"])
+
+    table = []
+    for threshold in thresholds:
+        kept = [s for s in scored if s["confidence"] is not None and s["confidence"] >= threshold]
+        escalated = total - len(kept)
+        correct = sum(1 for s in kept if s["answer"] == s["label"])
+        kept_positives = sum(1 for s in kept if s["label"])
+        found = sum(1 for s in kept if s["label"] and s["answer"]) + positives - kept_positives
+        table.append({
+            "threshold": threshold,
+            "escalation_rate": escalated / total if total else 0.0,
+            "fast_accuracy": correct / len(kept) if kept else 0.0,
+            "recall": found / positives if positives else 0.0,
+            "cost_per_post": fast_cost + (escalated / total if total else 0.0) * large_cost,
+        })
+    return table
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    report_cmd = commands.add_parser("report", help="Summarize recorded cascade decisions.")
+    report_cmd.add_argument("--days", type=float, help="Only include the last N days.")
+    tune_cmd = commands.add_parser("tune", help="Score the fast tier against the larger model's labels.")
+    tune_cmd.add_argument("--limit", type=int, default=200, help="Escalated posts to sample (default 200).")
+    tune_cmd.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    initialize_db()
+    if args.command == "report":
+        print_cascade_report(args.days)
+    elif args.command == "tune":
+        samples = [(content, bool(answer)) for _, content, answer in iter_escalated_labels()]
+        random.Random(args.seed).shuffle(samples)
+        samples = samples[:args.limit]
+        print(f"Scoring {len(samples)} posts labelled by {CLASSIFIER_MODEL} with {CASCADE_FAST_MODEL}...")
+        scored = score_fast_tier(samples)
+        shutdown_ledger()
+
+        print(f"\n{'threshold':>10}{'escalated':>11}{'fast acc':>10}{'recall':>9}{'$/post':>10}")
+        for row in threshold_table(scored):
+            marker = "  <- current" if row["threshold"] == CASCADE_CONFIDENCE_THRESHOLD else ""
+            print(f"{row['threshold']:>10.2f}{row['escalation_rate']:>11.1%}{row['fast_accuracy']:>10.1%}"
+                  f"{row['recall']:>9.1%}{row['cost_per_post']:>10.5f}{marker}")
+        full_cost = estimate_cost(CLASSIFIER_MODEL,
+                                  sum(s["prompt_tokens"] for s in scored) / max(1, len(scored)),
+                                  sum(s["completion_tokens"] for s in scored) / max(1, len(scored))) or 0.0
+        print(f"\n{CLASSIFIER_MODEL} only: {full_cost:.5f} $/post")
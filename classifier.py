@@ -0,0 +1,509 @@
+# classifier.py
+
+"""
+This module classifies Nextdoor posts with OpenAI.
+
+`classify_post` asks for a single structured JSON answer (is it a service
+request, which service, and a drafted comment) and caches the result in
+SQLite. It has no browser dependencies, so offline tools such as
+batch_classify.py can share the same prompt and parsing code.
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import math  # Logprobs to probabilities
+import time  # Per-tier latency
+import logging  # For structured logging
+import hashlib  # For classification cache keys
+import threading  # Guards lazy creation of the shared client
+from typing import Optional  # For optional fields in the classification schema
+
+# OpenAI API (the client is created lazily, see get_openai_client)
+from llm_client import RateLimitedClient
+from ledger import call_context, record_llm_call, record_cascade_decision
+from config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    CLASSIFIER_MODEL,
+    PREFILTER_ENABLED,
+    CASCADE_ENABLED,
+    CASCADE_FAST_MODEL,
+    CASCADE_CONFIDENCE_THRESHOLD,
+)
+
+# Cached results of earlier classifications, and posts whose classification failed
+from database import (
+    get_cached_classification,
+    store_cached_classification,
+    iter_posts_to_retry,
+    update_classifications,
+    PREFILTER_VERSION,
+)
+
+# Local first stage that rejects obvious non-requests
+from prefilter import passes_prefilter
+
+# Settings for the shared OpenAI client. The client itself (and the openai and
+# httpx packages it pulls in) is only built on first use, so tools that import
+# this module for its prompt and parsing code don't pay for it.
+# Retries are handled by the rate-limited wrapper, which every chat call goes through.
+_openai_settings = {"api_key": OPENAI_API_KEY, "base_url": OPENAI_BASE_URL, "limits": {}}
+_client = None
+_llm = None
+_client_lock = threading.Lock()
+
+
+def configure_openai(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, **limits):
+    """
+    Points the shared client at new settings, e.g. a local OpenAI-compatible stub.
+    The client is rebuilt on its next use.
+
+    Args:
+        api_key (str, optional): API key to send.
+        base_url (str, optional): API root such as "http://127.0.0.1:8765/v1". None uses OpenAI.
+        **limits: Overrides for RateLimitedClient (requests_per_minute, tokens_per_minute, ...).
+    """
+    global _client, _llm
+    with _client_lock:
+        _openai_settings.update(api_key=api_key, base_url=base_url, limits=limits)
+        _client = _llm = None
+
+
+def get_openai_client():
+    """
+    Returns the shared `OpenAI` client, creating it on first use.
+
+    Use it directly only for non-chat endpoints (files, batches); chat calls go through `get_llm`.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+
+                _client = OpenAI(api_key=_openai_settings["api_key"], base_url=_openai_settings["base_url"],
+                                 max_retries=0)
+    return _client
+
+
+def get_llm():
+    """Returns the shared RateLimitedClient around `get_openai_client()`, creating it on first use."""
+    global _llm
+    if _llm is None:
+        client = get_openai_client()
+        with _client_lock:
+            if _llm is None:
+                _llm = RateLimitedClient(client, on_call=record_llm_call, **_openai_settings["limits"])
+    return _llm
+
+# ---------------------------------------------------------------------------
+# 1. Classify a post using OpenAI (one structured request)
+# ---------------------------------------------------------------------------
+# Built by get_classification_schema on first use, so importing this module
+# (e.g. for batch_classify's export) doesn't load pydantic
+_schema = None
+
+
+def get_classification_schema():
+    """
+    Returns the pydantic model the model's JSON answer must match, defining it on first use.
+
+    Returns:
+        (type, type): The `PostClassification` model and pydantic's `ValidationError`.
+    """
+    global _schema
+    if _schema is None:
+        with _client_lock:
+            if _schema is None:
+                from pydantic import BaseModel, ValidationError
+
+                class PostClassification(BaseModel):
+                    """Schema the model's JSON answer must match."""
+                    is_service_request: bool
+                    service_type: Optional[str] = None
+                    comment: Optional[str] = None
+
+                _schema = (PostClassification, ValidationError)
+    return _schema
+
+
+CLASSIFY_SYSTEM_PROMPT = (
+    "You review Nextdoor posts for Moku, which offers lawn care, snow blowing, landscaping, "
+    "waste removal, power washing and similar outdoor services.\n"
+    "Reply with a JSON object with exactly these keys:\n"
+    "- is_service_request (boolean): true only if the post is asking for one of Moku's services.\n"
+    "- service_type (string or null): the type of service requested (e.g. 'lawn care', 'snow removal', 'landscaping').\n"
+    "- comment (string or null): if it is a request, a polite and professional comment offering our services "
+    "to the author. Include the author's first name and the type of service they are requesting, and our "
+    "contact information (808-987-6065 cj@mokunebraska.com). Keep it concise and friendly and do not sign off "
+    "with anything like Warm Regards or leave a name at the end. Use null if it is not a request."
+)
+
+# Derived from the prompt text, so editing the prompt invalidates cached results automatically
+CLASSIFY_PROMPT_VERSION = hashlib.sha256(CLASSIFY_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+# Which model(s) produce a classification; part of the cache key, so changing the cascade
+# (models or threshold) doesn't serve answers produced under the old routing
+CLASSIFIER_ROUTE = (
+    f"{CASCADE_FAST_MODEL}>{CLASSIFIER_MODEL}@{CASCADE_CONFIDENCE_THRESHOLD}" if CASCADE_ENABLED else CLASSIFIER_MODEL
+)
+
+
+def parse_classification(raw_text):
+    """
+    Validates the model's reply against `PostClassification`.
+
+    Tolerates extra text around the JSON object (e.g. a Markdown code fence).
+
+    Args:
+        raw_text (str): The message content returned by the model.
+
+    Returns:
+        PostClassification or None: The parsed result, or None if it doesn't match the schema.
+    """
+    if not raw_text:
+        return None
+    PostClassification, ValidationError = get_classification_schema()
+    try:
+        return PostClassification.model_validate_json(raw_text)
+    except ValidationError:
+        pass
+
+    # Retry on the outermost {...} block in case the model wrapped the JSON
+    first, last = raw_text.find("{"), raw_text.rfind("}")
+    if first == -1 or last <= first:
+        return None
+    try:
+        return PostClassification.model_validate_json(raw_text[first:last + 1])
+    except ValidationError:
+        return None
+
+
+def classification_cache_key(content, author):
+    """
+    Builds the cache key for a post: a hash of the normalized content, the author,
+    the model route and the prompt version.
+
+    The author is part of the key because the drafted comment addresses them by name.
+    Whitespace and case are normalized so trivially re-formatted copies still hit.
+    """
+    normalized = " ".join(content.split()).lower()
+    raw = "\x1f".join([normalized, (author or "").strip().lower(), CLASSIFIER_ROUTE, CLASSIFY_PROMPT_VERSION])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def build_classification_request(content, author, model=CLASSIFIER_MODEL, logprobs=False):
+    """
+    Builds the Chat Completions request body used to classify a post.
+
+    Shared by live classification and the offline batch files.
+
+    Args:
+        content (str): The text content of the Nextdoor post.
+        author (str): The name of the user who posted.
+        model (str, optional): Model to ask. Defaults to CLASSIFIER_MODEL.
+        logprobs (bool, optional): Also ask for token logprobs (used by the fast cascade tier).
+
+    Returns:
+        dict: Keyword arguments for `client.chat.completions.create`.
+    """
+    request = {
+        "model": model,
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": CLASSIFY_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Author: {author}\n\nPost:\n{content}"}
+        ],
+    }
+    if logprobs:
+        request.update(logprobs=True, top_logprobs=5)
+    return request
+
+
+def classification_to_result(result):
+    """Converts a parsed PostClassification into the (bool, message) pair `classify_post` returns."""
+    if not result.is_service_request:
+        return (False, None)
+    custom_message = result.comment.strip() if result.comment else None
+    logging.info(f"Service type: {result.service_type}")
+    return (True, custom_message)
+
+
+def answer_probability(response):
+    """
+    Reads the probability that `is_service_request` is true from a reply's logprobs.
+
+    Looks at the first `true`/`false` token of the JSON answer and normalizes the
+    probabilities of both spellings among its top alternatives.
+
+    Returns:
+        float or None: P(true), or None if the reply has no usable logprobs.
+    """
+    logprobs = getattr(response.choices[0], "logprobs", None)
+    for token in getattr(logprobs, "content", None) or []:
+        if token.token.strip().strip('"').lower() not in ("true", "false"):
+            continue
+        p_true = p_false = 0.0
+        for alternative in token.top_logprobs or [token]:
+            word = alternative.token.strip().strip('"').lower()
+            if word == "true":
+                p_true += math.exp(alternative.logprob)
+            elif word == "false":
+                p_false += math.exp(alternative.logprob)
+        return p_true / (p_true + p_false) if p_true + p_false else None
+    return None
+
+
+def send_classification_request(content, author, model, prompt_kind, logprobs=False):
+    """
+    Sends one structured classification request.
+
+    Returns:
+        (ChatCompletion, PostClassification or None, float): The response, its parsed
+        answer and the seconds the call took (including rate-limit waits).
+    """
+    started = time.perf_counter()
+    with call_context(prompt_kind=prompt_kind):
+        response = get_llm().chat_completion(**build_classification_request(content, author, model, logprobs))
+    latency = time.perf_counter() - started
+    return response, parse_classification(response.choices[0].message.content), latency
+
+
+def request_classification(content, author):
+    """
+    Sends the structured classification request and parses the reply.
+
+    With CASCADE_ENABLED, CASCADE_FAST_MODEL answers first. Its answer is used
+    when its probability (from logprobs) reaches CASCADE_CONFIDENCE_THRESHOLD;
+    otherwise the post is escalated to CLASSIFIER_MODEL. Every routed post is
+    recorded in the `cascade_decisions` table.
+
+    Args:
+        content (str): The text content of the Nextdoor post.
+        author (str): The name of the user who posted.
+
+    Returns:
+        (bool, str): (True, custom_message) if the post is requesting a service, otherwise (False, None).
+
+    Raises:
+        Exception: Any OpenAI error, so the caller can tell a failure from a "no".
+    """
+    if not CASCADE_ENABLED:
+        _, result, _ = send_classification_request(content, author, CLASSIFIER_MODEL, "classify")
+        if result is None:
+            logging.warning("Structured classification could not be parsed. Falling back to sequential prompts.")
+            return classify_post_sequential(content, author)
+        return classification_to_result(result)
+
+    # Tier 1: cheap model with a confidence signal
+    fast_result = confidence = None
+    fast_started = time.perf_counter()
+    try:
+        response, fast_result, _ = send_classification_request(
+            content, author, CASCADE_FAST_MODEL, "classify_fast", logprobs=True
+        )
+        p_true = answer_probability(response)
+        if fast_result is not None and p_true is not None:
+            confidence = p_true if fast_result.is_service_request else 1 - p_true
+    except Exception as e:
+        logging.warning(f"Fast classifier failed ({e}); escalating to {CLASSIFIER_MODEL}.")
+    fast_latency = time.perf_counter() - fast_started
+    fast_answer = fast_result.is_service_request if fast_result is not None else None
+
+    if confidence is not None and confidence >= CASCADE_CONFIDENCE_THRESHOLD:
+        record_cascade_decision(CASCADE_FAST_MODEL, fast_answer, confidence, False,
+                                CASCADE_FAST_MODEL, fast_answer, fast_latency)
+        return classification_to_result(fast_result)
+
+    # Tier 2: the larger model settles uncertain posts
+    shown = "n/a" if confidence is None else f"{confidence:.2f}"
+    logging.info(f"Fast classifier unsure (confidence {shown}); escalating to {CLASSIFIER_MODEL}.")
+    _, result, escalated_latency = send_classification_request(content, author, CLASSIFIER_MODEL, "classify_escalated")
+    if result is None:
+        logging.warning("Structured classification could not be parsed. Falling back to sequential prompts.")
+        is_service_request, custom_message = classify_post_sequential(content, author)
+    else:
+        is_service_request, custom_message = classification_to_result(result)
+    record_cascade_decision(CASCADE_FAST_MODEL, fast_answer, confidence, True,
+                            CLASSIFIER_MODEL, is_service_request, fast_latency, escalated_latency)
+    return (is_service_request, custom_message)
+
+
+def classify_post(content, author):
+    """
+    Uses OpenAI to classify whether a post is a service request.
+    The service type and a custom comment come back in the same JSON response.
+
+    Obvious non-requests are rejected by the local prefilter first, and results are
+    cached in SQLite, so content that was already classified with the same model
+    and prompt never reaches the API again.
+
+    Args:
+        content (str): The text content of the Nextdoor post.
+        author (str): The name of the user who posted.
+
+    Returns:
+        (bool, str): (True, custom_message) if the post is requesting a service, otherwise (False, None).
+        (None, None) if classification failed (API error, throttling, open circuit breaker),
+        so the post can be marked for retry instead of stored as a negative.
+    """
+    is_service_request, custom_message, _ = classify_post_versioned(content, author)
+    return (is_service_request, custom_message)
+
+
+def classify_post_versioned(content, author):
+    """
+    `classify_post`, plus the `classification_version` to store with the label.
+
+    Posts decided locally (empty, or rejected by the prefilter) get PREFILTER_VERSION,
+    so they are never taken for LLM labels; everything else gets CLASSIFY_PROMPT_VERSION.
+
+    Returns:
+        (bool, str, str): The `classify_post` result and its classification version.
+    """
+    if not content or not content.strip():
+        return (False, None, PREFILTER_VERSION)
+
+    if PREFILTER_ENABLED and not passes_prefilter(content):
+        logging.info("Prefilter rejected post; skipping OpenAI.")
+        return (False, None, PREFILTER_VERSION)
+
+    cache_key = classification_cache_key(content, author)
+    cached = get_cached_classification(cache_key)
+    if cached is not None:
+        logging.info("Classification cache hit.")
+        return (*cached, CLASSIFY_PROMPT_VERSION)
+
+    try:
+        is_service_request, custom_message = request_classification(content, author)
+    except Exception as e:
+        logging.error(f"Error classifying post: {e}")
+        return (None, None, None)
+
+    store_cached_classification(cache_key, CLASSIFIER_ROUTE, CLASSIFY_PROMPT_VERSION, is_service_request, custom_message)
+    return (is_service_request, custom_message, CLASSIFY_PROMPT_VERSION)
+
+
+# ---------------------------------------------------------------------------
+# 2. Fallback: classify with three sequential prompts
+# ---------------------------------------------------------------------------
+def classify_post_sequential(content, author):
+    """
+    Classifies a post with three separate prompts (yes/no, service type, comment).
+    Only used when the reply to the structured request in `request_classification` can't be parsed.
+
+    Args:
+        content (str): The text content of the Nextdoor post.
+        author (str): The name of the user who posted.
+
+    Returns:
+        (bool, str): (True, custom_message) if the post is requesting a service, otherwise (False, None).
+
+    Raises:
+        Exception: Any OpenAI error, so the caller can tell a failure from a "no".
+    """
+    # Step 1: Classify if the post is a service request
+    with call_context(prompt_kind="sequential_classify"):
+        classification_response = get_llm().chat_completion(
+            model=CLASSIFIER_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a classifier that determines if a post is requesting a service, make sure  "
+                        "that aligns with Moku's service list (lawn care, snow blowing, landscaping, waste removal, power washing, etc.).\n"
+                        "Answer only 'yes' or 'no'."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": f"Is this post a request for our services?\n\n{content}"
+                }
+            ]
+        )
+
+    classification = classification_response.choices[0].message.content.strip().lower()
+    if classification != "yes":
+        return (False, None)
+
+    # Step 2: Extract the type of service requested
+    with call_context(prompt_kind="sequential_service_type"):
+        service_extraction_response = get_llm().chat_completion(
+            model=CLASSIFIER_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a service extraction tool. Analyze the post and identify the type of service being requested. "
+                        "Respond with only the type of service (e.g., 'lawn care', 'snow removal', 'landscaping')."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": f"What type of service is being requested in this post?\n\n{content}"
+                }
+            ]
+        )
+
+    service_type = service_extraction_response.choices[0].message.content.strip()
+
+    # Step 3: Generate a custom comment
+    with call_context(prompt_kind="sequential_comment"):
+        custom_message_response = get_llm().chat_completion(
+            model=CLASSIFIER_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a helpful assistant that generates polite and professional comments "
+                        "offering services to users on Nextdoor. Include the user's first name and the type of service they are requesting. "
+                        "Keep the message concise and friendly and do not sign off with anything like Warm Regards or leave my name at the end"
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": (
+                        f"Generate a comment offering your services to {author}. "
+                        f"They are requesting help with {service_type}. "
+                        "Include your contact information (808-987-6065 cj@mokunebraska.com)."
+                    )
+                }
+            ]
+        )
+
+    custom_message = custom_message_response.choices[0].message.content.strip()
+    return (True, custom_message)
+
+
+# ---------------------------------------------------------------------------
+# 3. Retry posts whose classification failed
+# ---------------------------------------------------------------------------
+def retry_failed_classifications(limit=50):
+    """
+    Re-classifies posts stored with `service_request='retry'`.
+
+    Args:
+        limit (int, optional): Maximum number of posts to retry in one call.
+
+    Returns:
+        list[dict]: Posts that turned out to be service requests, with `link`,
+        `author` and `custom_message`, so their comments can go through approval.
+    """
+    updates = []
+    drafts = []
+    still_failing = 0
+    for post_id, link, author, content in iter_posts_to_retry(limit):
+        with call_context(link=link):
+            is_service_request, custom_message, version = classify_post_versioned(content, author)
+        if is_service_request is None:
+            still_failing += 1
+            continue
+        updates.append(("yes" if is_service_request else "no", version, post_id))
+        if is_service_request and custom_message:
+            drafts.append({"link": link, "author": author, "custom_message": custom_message})
+
+    update_classifications(updates)
+    if updates or still_failing:
+        logging.info(f"Retried classifications: {len(updates)} resolved, {still_failing} still failing.")
+    return drafts
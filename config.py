@@ -3,3 +3,41 @@ NEXTDOOR_EMAIL = "your email"
 NEXTDOOR_PASSWORD = "your password"
 OPENAI_API_KEY = "Your project API key"
 HEADLESS_MODE = False  # Set to True if you want to run the browser in headless mode
+CHROME_PROFILE_DIR = "chrome_profile"  # Chrome user-data dir kept between runs so the login is reused; None = fresh profile each launch
+DATABASE_PATH = "nextdoor_posts.db"  # SQLite file shared by every module that stores posts
+CLASSIFIER_MODEL = "gpt-4o"  # OpenAI model used by classify_post; must support JSON mode
+CASCADE_ENABLED = True  # Ask CASCADE_FAST_MODEL first and only escalate uncertain posts to CLASSIFIER_MODEL
+CASCADE_FAST_MODEL = "gpt-4o-mini"  # Cheap first-tier model; must support JSON mode and logprobs
+CASCADE_CONFIDENCE_THRESHOLD = 0.90  # Fast-tier answers below this probability are escalated (tune with `python cascade.py tune`)
+CLASSIFICATION_CACHE_TTL_DAYS = 30  # Cached classify_post results older than this are ignored
+CLASSIFICATION_CACHE_MAX_ENTRIES = 20000  # Least recently used cache entries beyond this are evicted
+CLASSIFIER_WORKERS = 4  # Threads classifying posts while the browser keeps scraping
+CLASSIFY_QUEUE_SIZE = 8  # Extracted posts allowed to wait for a classifier before scraping pauses
+NEAR_DUPLICATE_ENABLED = True  # Reuse the label and drafted comment of an earlier cross-post instead of classifying again
+NEAR_DUPLICATE_THRESHOLD = 0.7  # Estimated Jaccard similarity (word bigrams) at which two posts count as the same request
+PREFILTER_ENABLED = True  # Reject obvious non-requests locally before calling OpenAI
+PREFILTER_MODEL_PATH = "prefilter_model.json"  # Written by `python prefilter.py train`
+PREFILTER_THRESHOLD = 0.05  # Keyword-free posts below this probability are rejected locally
+OPENAI_REQUESTS_PER_MINUTE = 500  # Request budget shared by all classifier threads
+OPENAI_TOKENS_PER_MINUTE = 30000  # Token budget shared by all classifier threads
+OPENAI_MAX_CONCURRENT_REQUESTS = 4  # OpenAI calls allowed in flight at once
+OPENAI_MAX_RETRIES = 5  # Retries for throttled or transient OpenAI errors
+OPENAI_CIRCUIT_BREAKER_THRESHOLD = 5  # Consecutive failed calls before OpenAI calls are paused
+OPENAI_CIRCUIT_BREAKER_RESET_SECONDS = 60  # How long OpenAI calls stay paused
+OPENAI_BASE_URL = None  # Set to an OpenAI-compatible endpoint (e.g. a local stub) instead of api.openai.com
+HUMAN_DELAY_SCALE = 1.0  # Multiplier for the scraper's human-like pauses
+METRICS_TEXTFILE_PATH = "nextdoor_bot.prom"  # Per-run stage timings in Prometheus text format (node_exporter textfile collector)
+LLM_LEDGER_ENABLED = True  # Record every OpenAI call (tokens, latency, cost) in the llm_calls table
+LLM_PRICES_PER_MILLION_TOKENS = {  # USD per 1M (prompt, completion) tokens, used for the ledger's cost estimate
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+CRAWL_NEWEST_FIRST = True  # Search results list the newest posts first, so repeat crawls stop at posts already stored; set False to walk every feed in full
+CRAWL_KNOWN_STREAK_LIMIT = 10  # Stop harvesting a newest-first feed after this many already-stored posts in a row
+CRAWL_CHECKPOINT_MAX_AGE_HOURS = 6  # Older crawl checkpoints are discarded instead of resumed
+CRAWL_RESUME_ATTEMPTS = 2  # Times a failed crawl is resumed from its checkpoint before giving up on the query
+SELECTOR_MISS_WINDOW = 10  # Recent lookups per field used to decide that its selectors stopped matching
+SELECTOR_MISS_RATE = 0.8  # Share of those lookups that must find nothing before the field counts as exhausted
@@ -1,25 +1,206 @@
+import time
+import atexit
+import queue
 import sqlite3
 import logging
+import threading
+from array import array
+from datetime import datetime
+from concurrent.futures import Future
+
+from config import (
+    DATABASE_PATH,
+    CLASSIFICATION_CACHE_TTL_DAYS,
+    CLASSIFICATION_CACHE_MAX_ENTRIES,
+    NEAR_DUPLICATE_THRESHOLD,
+    CRAWL_CHECKPOINT_MAX_AGE_HOURS,
+)
+from utils import BloomFilter, post_time_to_epoch, minhash, minhash_bands, estimate_jaccard, configure_logging
+from metrics import span
+
+# ---------------------------------------------------------------------------
+# Connection management
+# ---------------------------------------------------------------------------
+# Each thread keeps one long-lived, pre-configured connection instead of
+# reconnecting on every call. sqlite3 caches prepared statements per
+# connection, so keeping the connection alive also keeps those statements.
+# Threads should call close_connection() before they exit; connections of
+# threads that exited without doing so are closed when the next one opens.
+_db_path = DATABASE_PATH
+_local = threading.local()
+_open_connections = {}  # connection -> thread that opened it
+_connections_lock = threading.Lock()
+_generation = 0  # Bumped by close_all_connections so other threads reconnect
+
+
+def configure_db(path):
+    """
+    Points all future connections at a different database file.
+
+    Connections that are already open are closed so every thread reconnects
+    to the new path on its next call.
+
+    Args:
+        path (str): Path to the SQLite database file.
+    """
+    global _db_path
+    close_all_connections()
+    known_links.reset()
+    _db_path = path
+    logging.info(f"Database path set to: {path}")
+
+
+def get_connection():
+    """
+    Returns this thread's shared connection, opening and configuring it on first use.
+
+    The connection runs in WAL mode with `synchronous=NORMAL`, so readers never
+    block the writer and commits don't wait for a full fsync.
+
+    Returns:
+        sqlite3.Connection: The calling thread's connection.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.generation == _generation:
+        return conn
+
+    conn = sqlite3.connect(_db_path, timeout=30, cached_statements=256, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    with _connections_lock:
+        dead = [c for c, thread in _open_connections.items() if not thread.is_alive()]
+        for c in dead:
+            del _open_connections[c]
+        _open_connections[conn] = threading.current_thread()
+        _local.generation = _generation
+    for c in dead:
+        try:
+            c.close()
+        except sqlite3.Error as e:
+            logging.warning(f"Error closing database connection: {e}")
+    _local.conn = conn
+    return conn
+
+
+def close_connection():
+    """Closes the calling thread's connection, if it has one."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    _local.conn = None
+    with _connections_lock:
+        _open_connections.pop(conn, None)
+    conn.close()
+
+
+def close_all_connections():
+    """Closes every connection opened by any thread (used on shutdown or path change)."""
+    global _generation
+    with _connections_lock:
+        connections = list(_open_connections)
+        _open_connections.clear()
+        _generation += 1
+    _local.conn = None
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logging.warning(f"Error closing database connection: {e}")
+
+
+# ---------------------------------------------------------------------------
+# In-memory index of stored links
+# ---------------------------------------------------------------------------
+# Above this many stored posts the index switches from an exact set to a
+# Bloom filter, trading a small false-positive rate for a fixed memory cost.
+BLOOM_THRESHOLD = 100_000
+
+
+class KnownLinkIndex:
+    """
+    Remembers which post links are already stored so `post_exists` can skip SQLite.
+
+    Small databases are held in an exact set, which answers every check on its
+    own. Large databases use a Bloom filter: a miss is definitive, and only
+    hits are confirmed with a query.
+    """
+
+    def __init__(self, bloom_threshold=BLOOM_THRESHOLD):
+        self.bloom_threshold = bloom_threshold
+        self.loaded = False
+        self.exact = True
+        self._links = set()
+        self._lock = threading.Lock()
+
+    def load(self, conn):
+        """Loads every stored link from `conn`, choosing a set or a Bloom filter by row count."""
+        count = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+        with self._lock:
+            if count > self.bloom_threshold:
+                # Leave headroom so the false-positive rate holds as the DB grows
+                self._links = BloomFilter(capacity=count * 2)
+                self.exact = False
+            else:
+                self._links = set()
+                self.exact = True
+            for (link,) in conn.execute("SELECT link FROM posts WHERE link IS NOT NULL"):
+                self._links.add(link)
+            self.loaded = True
+        logging.info(f"Loaded {count} known post links ({'set' if self.exact else 'Bloom filter'}).")
+
+    def add(self, link):
+        """Records a newly stored link."""
+        if not self.loaded:
+            return
+        with self._lock:
+            self._links.add(link)
+
+    def reset(self):
+        """Forgets everything; `post_exists` falls back to SQLite until the next load."""
+        with self._lock:
+            self._links = set()
+            self.exact = True
+            self.loaded = False
+
+    def __contains__(self, link):
+        return link in self._links
+
+
+known_links = KnownLinkIndex()
+
+
+def load_known_links():
+    """Builds the in-memory link index from the database. Called once at startup."""
+    try:
+        known_links.load(get_connection())
+    except sqlite3.Error as e:
+        known_links.reset()
+        logging.error(f"Error loading known links: {e}")
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 def initialize_db():
     """Ensures the `posts` table exists with the required structure."""
     try:
-        conn = sqlite3.connect("nextdoor_posts.db")
+        conn = get_connection()
         cursor = conn.cursor()
 
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS posts (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                link TEXT UNIQUE,  
+                link TEXT UNIQUE,
                 author TEXT,
                 location TEXT,
                 date TEXT,
                 content TEXT,
                 service_request TEXT DEFAULT 'no',  -- Stores AI classification ('yes' or 'no')
-                processed BOOLEAN DEFAULT FALSE  
+                processed BOOLEAN DEFAULT FALSE,
+                classification_version TEXT,
+                posted_at INTEGER,  -- Epoch seconds parsed from `date`; NULL if it couldn't be parsed
+                scraped_at INTEGER,  -- Epoch seconds when the post was stored
+                minhash BLOB,  -- MinHash signature of the content (see utils.minhash)
+                duplicate_of TEXT,  -- Link of the earlier post this one is a near-duplicate of
+                date_text TEXT  -- Byline date as scraped (e.g. "2 hr ago"), kept so `posted_at` can be re-parsed
             )
         """)
 
@@ -29,31 +210,384 @@ def initialize_db():
         if "service_request" not in columns:
             cursor.execute("ALTER TABLE posts ADD COLUMN service_request TEXT DEFAULT 'no'")
             logging.info("Added 'service_request' column to database.")
+        if "classification_version" not in columns:
+            # Prompt version behind `service_request`; NULL means never classified with the current schema
+            cursor.execute("ALTER TABLE posts ADD COLUMN classification_version TEXT")
+            logging.info("Added 'classification_version' column to database.")
+        backfill_timestamps = "posted_at" not in columns
+        if backfill_timestamps:
+            cursor.execute("ALTER TABLE posts ADD COLUMN posted_at INTEGER")
+            cursor.execute("ALTER TABLE posts ADD COLUMN scraped_at INTEGER")
+            logging.info("Added 'posted_at' and 'scraped_at' columns to database.")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_posted_at ON posts (posted_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_scraped_at ON posts (scraped_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_service_request_posted_at ON posts (service_request, posted_at)")
+        backfill_fingerprints = "minhash" not in columns
+        if backfill_fingerprints:
+            cursor.execute("ALTER TABLE posts ADD COLUMN minhash BLOB")
+            cursor.execute("ALTER TABLE posts ADD COLUMN duplicate_of TEXT")
+            logging.info("Added 'minhash' and 'duplicate_of' columns to database.")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_duplicate_of ON posts (duplicate_of)")
+        if "date_text" not in columns:
+            # NULL for rows stored before it existed; their raw byline text is lost
+            cursor.execute("ALTER TABLE posts ADD COLUMN date_text TEXT")
+            logging.info("Added 'date_text' column to database.")
+        # Single-column indexes also order by id, so filtered listings can page by id
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_processed ON posts (processed)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_service_request ON posts (service_request)")
+
+        # LSH band keys of canonical posts' MinHash signatures, for near-duplicate lookups
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS post_minhash_bands (
+                band INTEGER,
+                band_key INTEGER,
+                link TEXT,
+                PRIMARY KEY (band, band_key, link)
+            ) WITHOUT ROWID
+        """)
+
+        # Cache of classify_post results, keyed by content/model/prompt hash
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS classification_cache (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT,
+                prompt_version TEXT,
+                is_service_request BOOLEAN,
+                custom_message TEXT,
+                created_at REAL,
+                last_used_at REAL,
+                hits INTEGER DEFAULT 0
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_classification_cache_last_used ON classification_cache (last_used_at)")
+
+        # Drafted comments waiting for (or past) human review
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pending_comments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                link TEXT UNIQUE,
+                author TEXT,
+                comment TEXT,
+                status TEXT DEFAULT 'pending',  -- 'pending', 'approved', 'rejected', 'posted' or 'failed'
+                attempts INTEGER DEFAULT 0,
+                created_at REAL,
+                reviewed_at REAL,
+                posted_at REAL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pending_comments_status ON pending_comments (status, id)")
+
+        # Per-query high-water mark for incremental crawls
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS search_state (
+                query TEXT PRIMARY KEY,  -- Normalized search term
+                newest_link TEXT,        -- Top post of the feed on the last run
+                newest_seen_at REAL,
+                last_run_at REAL,
+                runs INTEGER DEFAULT 0,
+                last_new_posts INTEGER DEFAULT 0,
+                last_skipped INTEGER DEFAULT 0
+            )
+        """)
+
+        # Progress of an unfinished crawl, so a failed driver can resume it
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+                query TEXT PRIMARY KEY,  -- Normalized search term
+                phase TEXT,  -- 'harvest' while scrolling the feed, 'visit' while opening harvested posts
+                scroll_depth INTEGER DEFAULT 0,  -- Scrolls done on the results page
+                newest_link TEXT,
+                skipped INTEGER DEFAULT 0,
+                caught_up BOOLEAN DEFAULT FALSE,  -- Harvest reached the high-water mark within max_posts
+                updated_at REAL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_checkpoint_links (
+                query TEXT,
+                position INTEGER,  -- Feed order
+                link TEXT,
+                preview TEXT,
+                visited BOOLEAN DEFAULT FALSE,
+                PRIMARY KEY (query, link)
+            )
+        """)
+
+        # One row per search run, plus per-stage timing aggregates for it
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query TEXT,
+                started_at REAL,
+                finished_at REAL,
+                posts_queued INTEGER DEFAULT 0,
+                posts_saved INTEGER DEFAULT 0,
+                posts_skipped INTEGER DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stage_metrics (
+                run_id INTEGER REFERENCES runs (id),
+                stage TEXT,
+                count INTEGER,
+                total_seconds REAL,
+                p50_seconds REAL,
+                p95_seconds REAL,
+                max_seconds REAL,
+                PRIMARY KEY (run_id, stage)
+            )
+        """)
+
+        # Outcome of each query in an unattended batch (batch.py); timings live in `runs`
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS batch_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch_started_at REAL,  -- Identifies the batch
+                position INTEGER,
+                query TEXT,
+                max_posts INTEGER,
+                max_runtime INTEGER,
+                status TEXT,  -- 'ok', 'no_results', 'error' or 'skipped'
+                error TEXT,
+                run_id INTEGER REFERENCES runs (id),
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+
+        # One row per OpenAI API call (including retried attempts)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS llm_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL,
+                query TEXT,
+                link TEXT,
+                prompt_kind TEXT,
+                model TEXT,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                latency_ms REAL,
+                outcome TEXT,
+                cost_usd REAL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_created_at ON llm_calls (created_at)")
+
+        # One row per post routed through the model cascade
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cascade_decisions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL,
+                link TEXT,
+                fast_model TEXT,
+                fast_answer BOOLEAN,  -- NULL if the fast tier failed or its reply didn't parse
+                confidence REAL,
+                escalated BOOLEAN,
+                final_model TEXT,
+                final_answer BOOLEAN,
+                fast_latency_ms REAL,
+                escalated_latency_ms REAL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cascade_decisions_link ON cascade_decisions (link)")
+
+        # Hit/miss counts per candidate scraping selector (selector_registry.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS selector_stats (
+                field TEXT NOT NULL,
+                selector TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0,
+                last_hit_at REAL,
+                last_miss_at REAL,
+                PRIMARY KEY (field, selector)
+            ) WITHOUT ROWID
+        """)
+        # Lookups per field, and how many of them no candidate matched
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS selector_field_stats (
+                field TEXT PRIMARY KEY,
+                lookups INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0,
+                last_miss_at REAL
+            )
+        """)
 
         conn.commit()
         logging.info("Database initialized successfully.")
     except sqlite3.Error as e:
         logging.error(f"Error initializing database: {e}")
-    finally:
-        conn.close()
+        return
+
+    initialize_search_index()
+
+    if backfill_timestamps:
+        backfill_posted_at()
+    if backfill_fingerprints:
+        backfill_minhash()
+    load_known_links()
+
+
+def backfill_posted_at(batch_size=500):
+    """
+    Fills `posted_at` for rows stored before the column existed, by parsing their
+    'MM/DD/YY, HH:MM' `date` strings. Runs once, when the column is added.
+
+    `scraped_at` is left NULL for those rows since it was never recorded.
+
+    Returns:
+        int: Number of rows backfilled.
+    """
+    conn = get_connection()
+    last_id = 0
+    filled = 0
+    try:
+        while True:
+            rows = conn.execute(
+                "SELECT id, date FROM posts WHERE id > ? AND posted_at IS NULL ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            updates = [(epoch, post_id) for post_id, date in rows if (epoch := post_time_to_epoch(date)) is not None]
+            with conn:
+                conn.executemany("UPDATE posts SET posted_at = ? WHERE id = ?", updates)
+            filled += len(updates)
+    except sqlite3.Error as e:
+        logging.error(f"Error backfilling posted_at: {e}")
+    logging.info(f"Backfilled posted_at for {filled} posts.")
+    return filled
+
+
+def reparse_posted_at(batch_size=500):
+    """
+    Retries `posted_at` for rows where it is NULL, by parsing their raw `date_text`
+    again. Relative phrases ("2 hr ago") are resolved against `scraped_at`, the
+    time they were read. Run it after `utils.parse_post_time` learns a new format.
+
+    Returns:
+        int: Number of rows that now have a `posted_at`.
+    """
+    conn = get_connection()
+    last_id = 0
+    filled = 0
+    try:
+        while True:
+            rows = conn.execute(
+                """
+                SELECT id, date_text, scraped_at FROM posts
+                WHERE id > ? AND posted_at IS NULL AND date_text IS NOT NULL
+                ORDER BY id LIMIT ?
+                """,
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            updates = [
+                (epoch, post_id) for post_id, date_text, scraped_at in rows
+                if (epoch := post_time_to_epoch(
+                    date_text, datetime.fromtimestamp(scraped_at) if scraped_at else None
+                )) is not None
+            ]
+            with conn:
+                conn.executemany("UPDATE posts SET posted_at = ? WHERE id = ?", updates)
+            filled += len(updates)
+    except sqlite3.Error as e:
+        logging.error(f"Error re-parsing posted_at: {e}")
+    logging.info(f"Re-parsed posted_at for {filled} posts.")
+    return filled
+
+
+def backfill_minhash(batch_size=500):
+    """
+    Fingerprints and indexes rows stored before the `minhash` column existed.
+    Runs once, when the column is added.
+
+    Existing posts are all indexed as canonical; only posts saved from now on
+    are linked to an earlier near-duplicate.
+
+    Returns:
+        int: Number of rows fingerprinted.
+    """
+    conn = get_connection()
+    last_id = 0
+    filled = 0
+    try:
+        while True:
+            rows = conn.execute(
+                "SELECT id, link, content FROM posts WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            signatures = [(post_id, link, minhash(content)) for post_id, link, content in rows]
+            signatures = [row for row in signatures if row[2] is not None]
+            with conn:
+                conn.executemany("UPDATE posts SET minhash = ? WHERE id = ?",
+                                 [(pack_signature(signature), post_id) for post_id, _, signature in signatures])
+                _index_signatures(conn, [(link, signature) for _, link, signature in signatures])
+            filled += len(signatures)
+    except sqlite3.Error as e:
+        logging.error(f"Error backfilling MinHash signatures: {e}")
+    logging.info(f"Backfilled MinHash signatures for {filled} posts.")
+    return filled
+
+INSERT_POST_SQL = """
+    INSERT INTO posts (link, author, date, location, content, service_request, classification_version, posted_at,
+                       scraped_at, minhash, duplicate_of, date_text)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+QUEUE_COMMENT_SQL = "INSERT OR IGNORE INTO pending_comments (link, author, comment, created_at) VALUES (?, ?, ?, ?)"
+
+
+def pack_signature(signature):
+    """Encodes a MinHash signature for the `minhash` column (None stays None)."""
+    return array("I", signature).tobytes() if signature is not None else None
+
+
+def unpack_signature(blob):
+    """Decodes a `minhash` column value back into a signature tuple."""
+    return tuple(array("I", blob)) if blob else None
+
+
+def _index_signatures(conn, rows):
+    # rows: (link, signature) of canonical posts
+    conn.executemany(
+        "INSERT OR IGNORE INTO post_minhash_bands (band, band_key, link) VALUES (?, ?, ?)",
+        [(band, key, link) for link, signature in rows for band, key in minhash_bands(signature)],
+    )
 
 def post_exists(link):
-    """Checks if a post already exists in the database."""
+    """
+    Checks if a post already exists in the database.
+
+    Once `load_known_links` has run, the in-memory index answers directly;
+    SQLite is only queried to confirm a Bloom filter hit.
+    """
+    if known_links.loaded:
+        if link not in known_links:
+            logging.debug(f"Checking if post exists: {link} -> Not Found (index)")
+            return False
+        if known_links.exact:
+            logging.debug(f"Checking if post exists: {link} -> Found (index)")
+            return True
+
     try:
-        conn = sqlite3.connect("nextdoor_posts.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM posts WHERE link = ?", (link,))
+        cursor = get_connection().execute("SELECT 1 FROM posts WHERE link = ?", (link,))
         result = cursor.fetchone()
         exists = result is not None
-        logging.info(f"Checking if post exists: {link} -> {'Found' if exists else 'Not Found'}")
+        logging.debug(f"Checking if post exists: {link} -> {'Found' if exists else 'Not Found'}")
         return exists
     except sqlite3.Error as e:
         logging.error(f"Error checking if post exists: {e}")
         return False
-    finally:
-        conn.close()
 
-def save_post(link, author, date, location, content, service_request):
+def save_post(link, author, date, location, content, service_request, classification_version=None,
+              posted_at=None, scraped_at=None, signature=None, duplicate_of=None, date_text=None, draft=None):
     """
     Saves a new post to the database if it hasn’t already been seen.
 
@@ -63,54 +597,253 @@ def save_post(link, author, date, location, content, service_request):
         date (str): The post date.
         location (str): The post location.
         content (str): The post content.
-        service_request (str): "yes" if AI determines it's a service request, otherwise "no".
+        service_request (str): "yes" if AI determines it's a service request, "no" if not,
+            or "retry" if classification failed.
+        classification_version (str, optional): Prompt version that produced `service_request`.
+        posted_at (int, optional): Epoch seconds the post was made. Defaults to parsing `date`.
+        scraped_at (int, optional): Epoch seconds the post was scraped. Defaults to now.
+        signature (tuple, optional): MinHash signature of `content`. Computed if missing.
+        duplicate_of (str, optional): Link of the earlier post this one is a near-duplicate of.
+            Only posts without one are indexed for near-duplicate lookups.
+        date_text (str, optional): The byline date exactly as scraped, before `date` was derived from it.
+        draft (str, optional): Drafted comment to add to `pending_comments` in the same transaction,
+            so a stored service request never lacks its draft.
 
     Returns:
         bool: True if the post was saved, False if it was already seen.
     """
+    if posted_at is None:
+        posted_at = post_time_to_epoch(date)
+    if scraped_at is None:
+        scraped_at = int(time.time())
+    if signature is None:
+        signature = minhash(content)
+    conn = get_connection()
     try:
-        # Create a new connection for each save operation
-        conn = sqlite3.connect("nextdoor_posts.db")
-        cursor = conn.cursor()
+        with conn:
+            conn.execute(INSERT_POST_SQL, (link, author, date, location, content, service_request,
+                                           classification_version, posted_at, scraped_at,
+                                           pack_signature(signature), duplicate_of, date_text))
+            if signature is not None and duplicate_of is None:
+                _index_signatures(conn, [(link, signature)])
+            if draft:
+                conn.execute(QUEUE_COMMENT_SQL, (link, author, draft, time.time()))
 
-        cursor.execute("""
-            INSERT INTO posts (link, author, date, location, content, service_request) 
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (link, author, date, location, content, service_request))
-
-        conn.commit()
+        known_links.add(link)
         logging.info(f"Successfully saved post: {link} (Service Request: {service_request})")
         return True
 
     except sqlite3.IntegrityError:
+        known_links.add(link)
         logging.warning(f"Post already exists in the database: {link}")
         return False
     except sqlite3.OperationalError as e:
         logging.error(f"Database error: {e}")
         return False
-    finally:
-        # Ensure the connection is always closed
-        if conn:
-            conn.close()
+
+def save_posts_bulk(posts):
+    """
+    Saves many posts in a single transaction.
+
+    Links that are already stored (or repeated within `posts`) are skipped and
+    reported as False, exactly like `save_post` reports an `IntegrityError`.
+
+    Args:
+        posts (list): Rows of (link, author, date, location, content, service_request)
+            with optional trailing classification_version, posted_at, scraped_at,
+            signature, duplicate_of, date_text and draft. Missing values default as in `save_post`.
+
+    Returns:
+        list[bool]: One entry per row; True if that row was saved, False otherwise.
+    """
+    if not posts:
+        return []
+    now = int(time.time())
+    posts = [tuple(post) + (None,) * (13 - len(post)) for post in posts]
+    posts = [
+        post[:7] + (
+            post_time_to_epoch(post[2]) if post[7] is None else post[7],
+            now if post[8] is None else post[8],
+            minhash(post[4]) if post[9] is None else post[9],
+            post[10],
+            post[11],
+            post[12],
+        )
+        for post in posts
+    ]
+
+    conn = get_connection()
+    try:
+        with conn:
+            # Take the write lock up front so the duplicate check and the
+            # inserts see the same snapshot
+            conn.execute("BEGIN IMMEDIATE")
+
+            links = [post[0] for post in posts]
+            known = set()
+            for start in range(0, len(links), 500):
+                chunk = links[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = conn.execute(f"SELECT link FROM posts WHERE link IN ({placeholders})", chunk)
+                known.update(row[0] for row in cursor)
+
+            results = []
+            new_rows = []
+            for post in posts:
+                if post[0] in known:
+                    results.append(False)
+                else:
+                    known.add(post[0])
+                    new_rows.append(post)
+                    results.append(True)
+
+            conn.executemany(INSERT_POST_SQL, [post[:9] + (pack_signature(post[9]), post[10], post[11])
+                                               for post in new_rows])
+            _index_signatures(conn, [(post[0], post[9]) for post in new_rows if post[9] is not None and post[10] is None])
+            drafts = [(post[0], post[1], post[12], time.time()) for post in new_rows if post[12]]
+            conn.executemany(QUEUE_COMMENT_SQL, drafts)
+
+        for post, saved in zip(posts, results):
+            known_links.add(post[0])
+            if saved:
+                logging.info(f"Successfully saved post: {post[0]} (Service Request: {post[5]})")
+            else:
+                logging.warning(f"Post already exists in the database: {post[0]}")
+        if drafts:
+            logging.info(f"Queued {len(drafts)} drafted comments for review.")
+        return results
+
+    except sqlite3.Error as e:
+        logging.error(f"Database error while saving {len(posts)} posts: {e}")
+        return [False] * len(posts)
+
+def iter_posts_needing_classification(classification_version, include_current=False, batch_size=500):
+    """
+    Streams posts whose label is missing or came from a different prompt version.
+
+    Rows are read in keyset-paginated chunks, so memory stays bounded no matter
+    how many posts are stored.
+
+    Args:
+        classification_version (str): The current prompt version.
+        include_current (bool, optional): Also yield posts already classified with it.
+        batch_size (int, optional): Rows fetched per query.
+
+    Yields:
+        tuple: (id, author, content) for each post.
+    """
+    last_id = 0
+    while True:
+        try:
+            rows = get_connection().execute("""
+                SELECT id, author, content FROM posts
+                WHERE id > ?
+                  AND (? OR classification_version IS NULL OR classification_version != ?)
+                ORDER BY id
+                LIMIT ?
+            """, (last_id, include_current, classification_version, batch_size)).fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Error reading posts for classification: {e}")
+            return
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+# classification_version of labels that didn't come from the LLM. They are
+# stale for every prompt version and never used to train or evaluate anything.
+PREFILTER_VERSION = "prefilter"  # Rejected by the local prefilter
+KEYWORD_STANDIN_VERSION = "keyword-standin"  # Answered by batch_classify's offline `local` stand-in
+NON_LLM_VERSIONS = (PREFILTER_VERSION, KEYWORD_STANDIN_VERSION)
+
+
+def iter_labelled_posts(batch_size=500):
+    """
+    Streams every post with a 'yes' or 'no' label from the LLM, in keyset-paginated chunks.
+
+    Labels with a version in NON_LLM_VERSIONS (prefilter rejections, keyword stand-in answers) are skipped.
+
+    Yields:
+        tuple: (id, content, service_request) for each post.
+    """
+    last_id = 0
+    excluded = ", ".join("?" * len(NON_LLM_VERSIONS))
+    while True:
+        try:
+            rows = get_connection().execute(f"""
+                SELECT id, content, service_request FROM posts
+                WHERE id > ? AND service_request IN ('yes', 'no') AND content IS NOT NULL
+                  AND (classification_version IS NULL OR classification_version NOT IN ({excluded}))
+                ORDER BY id
+                LIMIT ?
+            """, (last_id, *NON_LLM_VERSIONS, batch_size)).fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Error reading labelled posts: {e}")
+            return
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def iter_posts_to_retry(limit=50):
+    """
+    Returns posts whose classification failed and was marked for retry.
+
+    Args:
+        limit (int, optional): Maximum number of posts to return.
+
+    Returns:
+        list[tuple]: (id, link, author, content) for each post, oldest first.
+    """
+    try:
+        return get_connection().execute(
+            "SELECT id, link, author, content FROM posts WHERE service_request = 'retry' ORDER BY id LIMIT ?",
+            (limit,),
+        ).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Error reading posts to retry: {e}")
+        return []
+
+
+def update_classifications(rows):
+    """
+    Writes new labels for existing posts in one transaction.
+
+    Args:
+        rows (list): Tuples of (service_request, classification_version, post_id).
+
+    Returns:
+        int: Number of posts updated.
+    """
+    if not rows:
+        return 0
+    try:
+        conn = get_connection()
+        with conn:
+            cursor = conn.executemany(
+                "UPDATE posts SET service_request = ?, classification_version = ? WHERE id = ?", rows
+            )
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logging.error(f"Error updating {len(rows)} classifications: {e}")
+        return 0
+
 def mark_post_processed(link):
     """Marks a post as processed, meaning it has been interacted with."""
     try:
-        conn = sqlite3.connect("nextdoor_posts.db")
-        cursor = conn.cursor()
-        cursor.execute("UPDATE posts SET processed = TRUE WHERE link = ?", (link,))
-        conn.commit()
+        conn = get_connection()
+        with conn:
+            conn.execute("UPDATE posts SET processed = TRUE WHERE link = ?", (link,))
         logging.info(f"Marked post as processed: {link}")
     except sqlite3.Error as e:
         logging.error(f"Error marking post as processed: {e}")
-    finally:
-        conn.close()
 
 def get_unprocessed_posts():
     """Retrieves all posts that haven't been processed yet."""
     try:
-        conn = sqlite3.connect("nextdoor_posts.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT link FROM posts WHERE processed = FALSE")
+        cursor = get_connection().execute("SELECT link FROM posts WHERE processed = FALSE")
         posts = cursor.fetchall()
         post_links = [post[0] for post in posts]
         logging.info(f"Found {len(post_links)} unprocessed posts.")
@@ -118,9 +851,1040 @@ def get_unprocessed_posts():
     except sqlite3.Error as e:
         logging.error(f"Error retrieving unprocessed posts: {e}")
         return []
-    finally:
-        conn.close()
+
+
+def get_posts_posted_since(since, service_request=None, limit=None):
+    """
+    Returns posts made at or after `since`, newest first, using the `posted_at` indexes.
+
+    Example: service requests from the last 48 hours:
+        get_posts_posted_since(time.time() - 48 * 3600, service_request="yes")
+
+    Args:
+        since (float): Epoch seconds.
+        service_request (str, optional): Only posts with this label ('yes', 'no' or 'retry').
+        limit (int, optional): Maximum number of posts.
+
+    Returns:
+        list[dict]: `id`, `link`, `author`, `location`, `content`, `service_request` and `posted_at`.
+    """
+    sql = "SELECT id, link, author, location, content, service_request, posted_at FROM posts WHERE posted_at >= ?"
+    params = [int(since)]
+    if service_request is not None:
+        sql += " AND service_request = ?"
+        params.append(service_request)
+    sql += " ORDER BY posted_at DESC LIMIT ?"
+    params.append(-1 if limit is None else limit)
+    try:
+        rows = get_connection().execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Error reading recent posts: {e}")
+        return []
+    keys = ("id", "link", "author", "location", "content", "service_request", "posted_at")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def find_near_duplicate(signature, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    Finds the stored, classified post most similar to a MinHash signature.
+
+    Only posts that share an LSH band key with `signature` are compared, so the
+    lookup reads a handful of rows instead of scanning the table.
+
+    Args:
+        signature (tuple): MinHash signature from `utils.minhash`.
+        threshold (float, optional): Minimum estimated Jaccard similarity.
+
+    Returns:
+        dict or None: `link`, `service_request`, `classification_version`,
+        `comment` (its queued draft, if any) and `similarity` of the best match.
+    """
+    if signature is None:
+        return None
+    bands = minhash_bands(signature)
+    placeholders = ",".join("(?, ?)" for _ in bands)
+    params = [value for band in bands for value in band]
+    try:
+        conn = get_connection()
+        rows = conn.execute(f"""
+            SELECT DISTINCT p.link, p.minhash, p.service_request, p.classification_version
+            FROM (VALUES {placeholders}) AS keys
+            JOIN post_minhash_bands b ON b.band = keys.column1 AND b.band_key = keys.column2
+            JOIN posts p ON p.link = b.link
+            WHERE p.service_request IN ('yes', 'no')
+        """, params).fetchall()
+        best = None
+        for link, blob, service_request, classification_version in rows:
+            similarity = estimate_jaccard(signature, unpack_signature(blob))
+            if similarity >= threshold and (best is None or similarity > best["similarity"]):
+                best = {"link": link, "service_request": service_request,
+                        "classification_version": classification_version, "similarity": similarity}
+        if best is not None:
+            row = conn.execute("SELECT comment FROM pending_comments WHERE link = ?", (best["link"],)).fetchone()
+            best["comment"] = row[0] if row else None
+        return best
+    except sqlite3.Error as e:
+        logging.error(f"Error looking up near-duplicates: {e}")
+        return None
+
+# ---------------------------------------------------------------------------
+# Full-text search
+# ---------------------------------------------------------------------------
+# posts_fts is an external-content FTS5 index: it stores only the index and
+# reads column values from `posts`. Triggers keep it in sync; updates that
+# don't touch the indexed columns (labels, processed) don't fire them.
+SEARCH_INDEX_SQL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        content, author, location,
+        content='posts', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts (rowid, content, author, location)
+        VALUES (new.id, new.content, new.author, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, content, author, location)
+        VALUES ('delete', old.id, old.content, old.author, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF content, author, location ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, content, author, location)
+        VALUES ('delete', old.id, old.content, old.author, old.location);
+        INSERT INTO posts_fts (rowid, content, author, location)
+        VALUES (new.id, new.content, new.author, new.location);
+    END
+    """,
+)
+
+
+def initialize_search_index():
+    """
+    Creates the `posts_fts` index and its triggers, and indexes existing posts
+    the first time. Search is disabled (with an error logged) if this SQLite
+    build lacks FTS5.
+    """
+    conn = get_connection()
+    try:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'").fetchone()
+        with conn:
+            for sql in SEARCH_INDEX_SQL:
+                conn.execute(sql)
+            if not exists:
+                conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+                logging.info("Built the full-text search index.")
+    except sqlite3.Error as e:
+        logging.error(f"Error creating the full-text search index: {e}")
+
+
+def _fts_query(text):
+    # Quote each word so punctuation can't break FTS5 syntax; a trailing * keeps prefix matching
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+SEARCH_RESULT_KEYS = ("id", "link", "author", "location", "date", "service_request", "processed", "snippet")
+
+
+def search_posts(text=None, service_request=None, processed=None, limit=20, after=None):
+    """
+    Returns one page of stored posts, best matches first, using keyset pagination.
+
+    With `text`, posts are matched against content, author and location and
+    ranked by bm25 (word stems match, so "mow" finds "mowing"; "land*" is a
+    prefix search). Without it, posts are listed newest first.
+
+    Pass the returned cursor as `after` to get the next page. Each page costs
+    the same however deep it is, since nothing is skipped with OFFSET.
+
+    Args:
+        text (str, optional): Words that must all appear.
+        service_request (str, optional): Only posts with this label ('yes', 'no' or 'retry').
+        processed (bool, optional): Only processed (True) or unprocessed (False) posts.
+        limit (int, optional): Page size.
+        after (tuple, optional): Cursor from the previous page.
+
+    Returns:
+        (list[dict], tuple or None): The page (`id`, `link`, `author`, `location`, `date`,
+        `service_request`, `processed`, `snippet`) and the cursor for the next page,
+        or None if this was the last one.
+    """
+    filters = []
+    params = []
+    if service_request is not None:
+        filters.append("p.service_request = ?")
+        params.append(service_request)
+    if processed is not None:
+        filters.append("p.processed = ?")
+        params.append(bool(processed))
+
+    match = _fts_query(text or "")
+    if match:
+        # rank and rowid go together in the cursor, so ties on rank stay in order
+        if after is not None:
+            filters.append("(f.rank > ? OR (f.rank = ? AND f.rowid > ?))")
+            params.extend([after[0], after[0], after[1]])
+        sql = f"""
+            SELECT p.id, p.link, p.author, p.location, p.date, p.service_request, p.processed,
+                   snippet(posts_fts, 0, '[', ']', '...', 12), f.rank
+            FROM posts_fts f JOIN posts p ON p.id = f.rowid
+            WHERE posts_fts MATCH ? {"".join(" AND " + f for f in filters)}
+            ORDER BY f.rank, f.rowid
+            LIMIT ?
+        """
+        params = [match] + params + [limit]
+    else:
+        if after is not None:
+            filters.append("p.id < ?")
+            params.append(after[0])
+        sql = f"""
+            SELECT p.id, p.link, p.author, p.location, p.date, p.service_request, p.processed,
+                   substr(p.content, 1, 80)
+            FROM posts p
+            {"WHERE " + " AND ".join(filters) if filters else ""}
+            ORDER BY p.id DESC
+            LIMIT ?
+        """
+        params.append(limit)
+
+    try:
+        rows = get_connection().execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Error searching posts: {e}")
+        return [], None
+    if len(rows) < limit:
+        cursor = None
+    elif match:
+        cursor = (rows[-1][-1], rows[-1][0])
+    else:
+        cursor = (rows[-1][0],)
+    return [dict(zip(SEARCH_RESULT_KEYS, row)) for row in rows], cursor
+
+# ---------------------------------------------------------------------------
+# Classification cache
+# ---------------------------------------------------------------------------
+classification_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_cache_stats_lock = threading.Lock()
+_purged_prompt_versions = set()
+
+
+def _count_cache_event(name, amount=1):
+    with _cache_stats_lock:
+        classification_cache_stats[name] += amount
+
+
+def get_cached_classification(cache_key, ttl_days=CLASSIFICATION_CACHE_TTL_DAYS):
+    """
+    Looks up a cached classify_post result and marks it as recently used.
+
+    Args:
+        cache_key (str): Key built from the post content, model and prompt version.
+        ttl_days (float, optional): Entries older than this are treated as missing.
+
+    Returns:
+        (bool, str) or None: The cached (is_service_request, custom_message), or None on a miss.
+    """
+    now = time.time()
+    try:
+        conn = get_connection()
+        row = conn.execute(
+            "SELECT is_service_request, custom_message FROM classification_cache WHERE cache_key = ? AND created_at >= ?",
+            (cache_key, now - ttl_days * 86400),
+        ).fetchone()
+        if row is None:
+            _count_cache_event("misses")
+            return None
+
+        with conn:
+            conn.execute(
+                "UPDATE classification_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?",
+                (now, cache_key),
+            )
+        _count_cache_event("hits")
+        return (bool(row[0]), row[1])
+    except sqlite3.Error as e:
+        logging.error(f"Error reading classification cache: {e}")
+        _count_cache_event("misses")
+        return None
+
+
+def store_cached_classification(cache_key, model, prompt_version, is_service_request, custom_message,
+                                max_entries=CLASSIFICATION_CACHE_MAX_ENTRIES, ttl_days=CLASSIFICATION_CACHE_TTL_DAYS):
+    """
+    Stores a classify_post result and trims the cache.
+
+    Expired entries, entries written by an older prompt for the same model, and the
+    least recently used entries beyond `max_entries` are deleted.
+
+    Args:
+        cache_key (str): Key built from the post content, model and prompt version.
+        model (str): Model that produced the result.
+        prompt_version (str): Version of the prompt that produced the result.
+        is_service_request (bool): The classification.
+        custom_message (str): The drafted comment, or None.
+        max_entries (int, optional): Upper bound on cached entries.
+        ttl_days (float, optional): Age after which entries are deleted.
+    """
+    now = time.time()
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO classification_cache
+                    (cache_key, model, prompt_version, is_service_request, custom_message, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (cache_key, model, prompt_version, is_service_request, custom_message, now, now))
+
+            removed = 0
+            if (model, prompt_version) not in _purged_prompt_versions:
+                removed += conn.execute(
+                    "DELETE FROM classification_cache WHERE model = ? AND prompt_version != ?",
+                    (model, prompt_version),
+                ).rowcount
+                _purged_prompt_versions.add((model, prompt_version))
+            removed += conn.execute(
+                "DELETE FROM classification_cache WHERE created_at < ?", (now - ttl_days * 86400,)
+            ).rowcount
+            removed += conn.execute("""
+                DELETE FROM classification_cache WHERE cache_key IN (
+                    SELECT cache_key FROM classification_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (max_entries,)).rowcount
+        if removed:
+            _count_cache_event("evictions", removed)
+    except sqlite3.Error as e:
+        logging.error(f"Error writing classification cache: {e}")
+
+
+def log_classification_cache_stats():
+    """Logs the hit/miss counters for this process."""
+    with _cache_stats_lock:
+        stats = dict(classification_cache_stats)
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / lookups if lookups else 0.0
+    logging.info(
+        f"Classification cache: {stats['hits']} hits, {stats['misses']} misses "
+        f"({hit_rate:.0%} hit rate), {stats['evictions']} evictions."
+    )
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Search state (incremental crawls)
+# ---------------------------------------------------------------------------
+def normalize_query(query):
+    """Collapses case and whitespace so 'Lawn  care' and 'lawn care' share one state row."""
+    return " ".join((query or "").lower().split())
+
+
+def get_search_state(query):
+    """
+    Reads the high-water mark stored for a search query.
+
+    Returns:
+        dict or None: `newest_link`, `newest_seen_at`, `last_run_at`, `runs`,
+        `last_new_posts` and `last_skipped`, or None if the query was never crawled.
+    """
+    try:
+        row = get_connection().execute(
+            """
+            SELECT newest_link, newest_seen_at, last_run_at, runs, last_new_posts, last_skipped
+            FROM search_state WHERE query = ?
+            """,
+            (normalize_query(query),),
+        ).fetchone()
+    except sqlite3.Error as e:
+        logging.error(f"Error reading search state: {e}")
+        return None
+    if row is None:
+        return None
+    return dict(zip(("newest_link", "newest_seen_at", "last_run_at", "runs", "last_new_posts", "last_skipped"), row))
+
+
+def update_search_state(query, newest_link, new_posts, skipped):
+    """
+    Records the outcome of a crawl for a search query.
+
+    Args:
+        query (str): The search term.
+        newest_link (str or None): Top post of the feed this run; None keeps the previous mark.
+        new_posts (int): New posts found this run.
+        skipped (int): Already-stored posts passed over this run.
+    """
+    now = time.time()
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO search_state (query, newest_link, newest_seen_at, last_run_at, runs, last_new_posts, last_skipped)
+                VALUES (?, ?, ?, ?, 1, ?, ?)
+                ON CONFLICT (query) DO UPDATE SET
+                    newest_link = COALESCE(excluded.newest_link, newest_link),
+                    newest_seen_at = CASE WHEN excluded.newest_link IS NULL THEN newest_seen_at ELSE excluded.newest_seen_at END,
+                    last_run_at = excluded.last_run_at,
+                    runs = runs + 1,
+                    last_new_posts = excluded.last_new_posts,
+                    last_skipped = excluded.last_skipped
+                """,
+                (normalize_query(query), newest_link, now, now, new_posts, skipped),
+            )
+    except sqlite3.Error as e:
+        logging.error(f"Error saving search state: {e}")
+
+
+def save_crawl_checkpoint(query, phase, scroll_depth, newest_link, skipped, links=(), caught_up=False):
+    """
+    Records the progress of a crawl that is still running.
+
+    Args:
+        query (str): The search term.
+        phase (str): 'harvest' or 'visit'.
+        scroll_depth (int): Scrolls done on the results page.
+        newest_link (str or None): Top post of the feed.
+        skipped (int): Already-stored posts passed over so far.
+        links (list, optional): Harvested (link, preview) pairs in feed order. Links
+            already in the checkpoint keep their visited flag.
+        caught_up (bool, optional): Whether the harvest got through every post above the high-water mark.
+    """
+    query = normalize_query(query)
+    conn = get_connection()
+    try:
+        with conn:
+            start = conn.execute(
+                "SELECT COUNT(*) FROM crawl_checkpoint_links WHERE query = ?", (query,)
+            ).fetchone()[0]
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO crawl_checkpoints
+                    (query, phase, scroll_depth, newest_link, skipped, caught_up, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (query, phase, scroll_depth, newest_link, skipped, caught_up, time.time()),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO crawl_checkpoint_links (query, position, link, preview) VALUES (?, ?, ?, ?)",
+                [(query, start + i, link, preview) for i, (link, preview) in enumerate(links)],
+            )
+    except sqlite3.Error as e:
+        logging.error(f"Error saving crawl checkpoint: {e}")
+
+
+def mark_checkpoint_visited(query, link):
+    """Marks a harvested post as handled, so a resumed crawl doesn't open it again."""
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "UPDATE crawl_checkpoint_links SET visited = TRUE WHERE query = ? AND link = ?",
+                (normalize_query(query), link),
+            )
+    except sqlite3.Error as e:
+        logging.error(f"Error updating crawl checkpoint: {e}")
+
+
+def get_crawl_checkpoint(query, max_age_hours=CRAWL_CHECKPOINT_MAX_AGE_HOURS):
+    """
+    Reads the checkpoint of an unfinished crawl. Checkpoints older than
+    `max_age_hours` are deleted instead, since the feed has moved on.
+
+    Returns:
+        dict or None: `phase`, `scroll_depth`, `newest_link`, `skipped`, `caught_up` and
+        `links` ((link, preview, visited) in feed order), or None if there is nothing to resume.
+    """
+    query = normalize_query(query)
+    try:
+        conn = get_connection()
+        row = conn.execute(
+            "SELECT phase, scroll_depth, newest_link, skipped, caught_up, updated_at FROM crawl_checkpoints WHERE query = ?",
+            (query,),
+        ).fetchone()
+        if row is None:
+            return None
+        if row[5] < time.time() - max_age_hours * 3600:
+            logging.info(f"Discarding the stale crawl checkpoint for '{query}'.")
+            clear_crawl_checkpoint(query)
+            return None
+        links = conn.execute(
+            "SELECT link, preview, visited FROM crawl_checkpoint_links WHERE query = ? ORDER BY position",
+            (query,),
+        ).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Error reading crawl checkpoint: {e}")
+        return None
+    checkpoint = dict(zip(("phase", "scroll_depth", "newest_link", "skipped", "caught_up"), row[:5]))
+    checkpoint["caught_up"] = bool(checkpoint["caught_up"])
+    checkpoint["links"] = [(link, preview, bool(visited)) for link, preview, visited in links]
+    return checkpoint
+
+
+def clear_crawl_checkpoint(query):
+    """Deletes the checkpoint of a crawl that finished."""
+    query = normalize_query(query)
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute("DELETE FROM crawl_checkpoint_links WHERE query = ?", (query,))
+            conn.execute("DELETE FROM crawl_checkpoints WHERE query = ?", (query,))
+    except sqlite3.Error as e:
+        logging.error(f"Error clearing crawl checkpoint: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Comment approval queue
+# ---------------------------------------------------------------------------
+def queue_comments(drafts):
+    """
+    Adds drafted comments to the approval queue. Links already queued are left alone.
+
+    Args:
+        drafts (list[dict]): Items with `link`, `author` and `custom_message`.
+
+    Returns:
+        int: Number of drafts newly queued.
+    """
+    rows = [(d["link"], d["author"], d["custom_message"], time.time()) for d in drafts if d.get("custom_message")]
+    if not rows:
+        return 0
+    conn = get_connection()
+    try:
+        with conn:
+            before = conn.total_changes
+            conn.executemany(QUEUE_COMMENT_SQL, rows)
+            queued = conn.total_changes - before
+        logging.info(f"Queued {queued} drafted comments for review.")
+        return queued
+    except sqlite3.Error as e:
+        logging.error(f"Error queueing drafted comments: {e}")
+        return 0
+
+
+def get_comments(status="pending", limit=None):
+    """
+    Reads queued comments with the given status, oldest first.
+
+    Returns:
+        list[dict]: `id`, `link`, `author`, `comment` and `attempts` for each comment.
+    """
+    try:
+        rows = get_connection().execute(
+            "SELECT id, link, author, comment, attempts FROM pending_comments WHERE status = ? ORDER BY id LIMIT ?",
+            (status, -1 if limit is None else limit),
+        ).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Error reading {status} comments: {e}")
+        return []
+    return [dict(zip(("id", "link", "author", "comment", "attempts"), row)) for row in rows]
+
+
+def review_comment(comment_id, approved, comment=None):
+    """
+    Records a reviewer's decision, optionally with an edited comment.
+
+    Only comments still pending are changed, so two reviewers can't both decide one draft.
+
+    Returns:
+        bool: True if the decision was recorded.
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            cursor = conn.execute(
+                """
+                UPDATE pending_comments SET status = ?, comment = COALESCE(?, comment), reviewed_at = ?
+                WHERE id = ? AND status = 'pending'
+                """,
+                ("approved" if approved else "rejected", comment, time.time(), comment_id),
+            )
+        return cursor.rowcount == 1
+    except sqlite3.Error as e:
+        logging.error(f"Error reviewing comment {comment_id}: {e}")
+        return False
+
+
+def record_comment_attempt(comment_id, posted, max_attempts=3):
+    """
+    Marks an approved comment as posted, or counts a failed attempt.
+
+    After `max_attempts` failures the comment is marked 'failed' and no longer retried.
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            if posted:
+                conn.execute(
+                    "UPDATE pending_comments SET status = 'posted', attempts = attempts + 1, posted_at = ? WHERE id = ?",
+                    (time.time(), comment_id),
+                )
+            else:
+                conn.execute(
+                    """
+                    UPDATE pending_comments
+                    SET attempts = attempts + 1,
+                        status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE status END
+                    WHERE id = ?
+                    """,
+                    (max_attempts, comment_id),
+                )
+    except sqlite3.Error as e:
+        logging.error(f"Error updating comment {comment_id}: {e}")
+
+
+def count_comments_by_status():
+    """Returns {status: count} for the approval queue."""
+    try:
+        return dict(get_connection().execute("SELECT status, COUNT(*) FROM pending_comments GROUP BY status").fetchall())
+    except sqlite3.Error as e:
+        logging.error(f"Error counting queued comments: {e}")
+        return {}
+
+
+# ---------------------------------------------------------------------------
+# LLM call ledger
+# ---------------------------------------------------------------------------
+LLM_CALL_COLUMNS = (
+    "created_at", "query", "link", "prompt_kind", "model",
+    "prompt_tokens", "completion_tokens", "latency_ms", "outcome", "cost_usd",
+)
+
+# Grouping expressions accepted by llm_call_report
+LLM_REPORT_GROUPS = {
+    "query": "COALESCE(query, '(none)')",
+    "day": "date(created_at, 'unixepoch', 'localtime')",
+    "prompt": "COALESCE(prompt_kind, '(unknown)')",
+    "model": "model",
+}
+
+
+def save_llm_calls(rows):
+    """
+    Appends ledger rows in one transaction.
+
+    Args:
+        rows (list[tuple]): Values in `LLM_CALL_COLUMNS` order.
+    """
+    if not rows:
+        return
+    conn = get_connection()
+    try:
+        with conn:
+            conn.executemany(
+                f"INSERT INTO llm_calls ({', '.join(LLM_CALL_COLUMNS)}) VALUES ({', '.join('?' * len(LLM_CALL_COLUMNS))})",
+                rows,
+            )
+    except sqlite3.Error as e:
+        logging.error(f"Error saving {len(rows)} LLM call records: {e}")
+
+
+def llm_call_report(group_by="query", since=None):
+    """
+    Aggregates the LLM call ledger.
+
+    Args:
+        group_by (str, optional): One of `LLM_REPORT_GROUPS` ("query", "day", "prompt", "model").
+        since (float, optional): Only include calls made after this epoch time.
+
+    Returns:
+        list[dict]: One row per group, most expensive first, with `group`, `calls`,
+        `failed`, `posts`, `prompt_tokens`, `completion_tokens`, `avg_latency_ms` and `cost_usd`.
+    """
+    group_expr = LLM_REPORT_GROUPS[group_by]
+    cursor = get_connection().execute(
+        f"""
+        SELECT {group_expr} AS grp,
+               COUNT(*),
+               SUM(outcome != 'ok'),
+               COUNT(DISTINCT link),
+               COALESCE(SUM(prompt_tokens), 0),
+               COALESCE(SUM(completion_tokens), 0),
+               AVG(latency_ms),
+               COALESCE(SUM(cost_usd), 0)
+        FROM llm_calls
+        WHERE created_at >= ?
+        GROUP BY grp
+        ORDER BY 8 DESC, 2 DESC
+        """,
+        (since or 0,),
+    )
+    keys = ("group", "calls", "failed", "posts", "prompt_tokens", "completion_tokens", "avg_latency_ms", "cost_usd")
+    return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+
+CASCADE_DECISION_COLUMNS = (
+    "created_at", "link", "fast_model", "fast_answer", "confidence", "escalated",
+    "final_model", "final_answer", "fast_latency_ms", "escalated_latency_ms",
+)
+
+
+def save_cascade_decisions(rows):
+    """
+    Appends model cascade decisions in one transaction.
+
+    Args:
+        rows (list[tuple]): Values in `CASCADE_DECISION_COLUMNS` order.
+    """
+    if not rows:
+        return
+    conn = get_connection()
+    try:
+        with conn:
+            conn.executemany(
+                f"INSERT INTO cascade_decisions ({', '.join(CASCADE_DECISION_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(CASCADE_DECISION_COLUMNS))})",
+                rows,
+            )
+    except sqlite3.Error as e:
+        logging.error(f"Error saving {len(rows)} cascade decisions: {e}")
+
+
+def iter_escalated_labels(batch_size=500):
+    """
+    Streams posts whose label came from the escalated (large) model, in keyset-paginated chunks.
+
+    Only the latest escalated decision per link is used. Labels the fast tier
+    kept, and labels from outside the cascade, are not included.
+
+    Yields:
+        tuple: (decision_id, content, final_answer) for each post.
+    """
+    last_id = 0
+    while True:
+        try:
+            rows = get_connection().execute("""
+                SELECT d.id, p.content, d.final_answer
+                FROM cascade_decisions d
+                JOIN posts p ON p.link = d.link
+                WHERE d.id > ? AND d.escalated AND d.final_answer IS NOT NULL AND p.content IS NOT NULL
+                  AND d.id = (SELECT MAX(id) FROM cascade_decisions
+                              WHERE link = d.link AND escalated AND final_answer IS NOT NULL)
+                ORDER BY d.id
+                LIMIT ?
+            """, (last_id, batch_size)).fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Error reading escalated labels: {e}")
+            return
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def cascade_report(since=None):
+    """
+    Summarizes the model cascade per fast-tier model.
+
+    Args:
+        since (float, optional): Only include decisions made after this epoch time.
+
+    Returns:
+        list[dict]: `fast_model`, `posts`, `escalated`, `compared`
+        (escalations with a fast answer), `agreed`, `avg_fast_latency_ms` and
+        `avg_escalated_latency_ms`.
+    """
+    cursor = get_connection().execute(
+        """
+        SELECT fast_model,
+               COUNT(*),
+               SUM(escalated),
+               SUM(escalated AND fast_answer IS NOT NULL),
+               SUM(escalated AND fast_answer = final_answer),
+               AVG(fast_latency_ms),
+               AVG(escalated_latency_ms)
+        FROM cascade_decisions
+        WHERE created_at >= ?
+        GROUP BY fast_model
+        ORDER BY 2 DESC
+        """,
+        (since or 0,),
+    )
+    keys = ("fast_model", "posts", "escalated", "compared", "agreed",
+            "avg_fast_latency_ms", "avg_escalated_latency_ms")
+    return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+
+# ---------------------------------------------------------------------------
+# Run metrics
+# ---------------------------------------------------------------------------
+def save_run_metrics(run, summary):
+    """
+    Stores a finished run and its per-stage timings.
+
+    Args:
+        run (metrics.RunMetrics): The finished run.
+        summary (dict): Output of `metrics.summarize(run)`.
+
+    Returns:
+        int | None: The new `runs.id`, or None if it could not be stored.
+    """
+    try:
+        conn = get_connection()
+        with conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO runs (query, started_at, finished_at, posts_queued, posts_saved, posts_skipped)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (run.query, run.started_at, run.finished_at,
+                 run.counters.get("posts_queued", 0), run.counters.get("posts_saved", 0),
+                 run.counters.get("posts_skipped", 0)),
+            )
+            run_id = cursor.lastrowid
+            conn.executemany(
+                """
+                INSERT INTO stage_metrics (run_id, stage, count, total_seconds, p50_seconds, p95_seconds, max_seconds)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(run_id, stage, stats["count"], stats["total"], stats["p50"], stats["p95"], stats["max"])
+                 for stage, stats in summary.items()],
+            )
+        return run_id
+    except sqlite3.Error as e:
+        logging.error(f"Error saving run metrics: {e}")
+        return None
+
+
+BATCH_RESULT_COLUMNS = (
+    "batch_started_at", "position", "query", "max_posts", "max_runtime", "status", "error", "run_id",
+    "started_at", "finished_at",
+)
+
+
+def save_batch_result(result):
+    """
+    Stores the outcome of one batch query.
+
+    Args:
+        result (dict): Values for BATCH_RESULT_COLUMNS; missing ones are stored as NULL.
+    """
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                f"INSERT INTO batch_results ({', '.join(BATCH_RESULT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(BATCH_RESULT_COLUMNS))})",
+                [result.get(column) for column in BATCH_RESULT_COLUMNS],
+            )
+    except sqlite3.Error as e:
+        logging.error(f"Error saving batch result for '{result.get('query')}': {e}")
+
+
+# ---------------------------------------------------------------------------
+# Selector statistics
+# ---------------------------------------------------------------------------
+def get_selector_stats():
+    """
+    Loads the stored hit/miss counts of every scraping selector.
+
+    Returns:
+        dict: (field, selector) -> (hits, misses).
+    """
+    try:
+        rows = get_connection().execute("SELECT field, selector, hits, misses FROM selector_stats").fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Error loading selector stats: {e}")
+        return {}
+    return {(field, selector): (hits, misses) for field, selector, hits, misses in rows}
+
+
+def save_selector_stats(selector_rows, field_rows):
+    """
+    Adds buffered selector counts to the stored totals in one transaction.
+
+    Args:
+        selector_rows (list[tuple]): (field, selector, hits, misses, last_hit_at, last_miss_at) increments.
+        field_rows (list[tuple]): (field, lookups, misses, last_miss_at) increments.
+    """
+    try:
+        conn = get_connection()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO selector_stats (field, selector, hits, misses, last_hit_at, last_miss_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (field, selector) DO UPDATE SET
+                    hits = hits + excluded.hits,
+                    misses = misses + excluded.misses,
+                    last_hit_at = COALESCE(excluded.last_hit_at, last_hit_at),
+                    last_miss_at = COALESCE(excluded.last_miss_at, last_miss_at)
+                """,
+                selector_rows,
+            )
+            conn.executemany(
+                """
+                INSERT INTO selector_field_stats (field, lookups, misses, last_miss_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (field) DO UPDATE SET
+                    lookups = lookups + excluded.lookups,
+                    misses = misses + excluded.misses,
+                    last_miss_at = COALESCE(excluded.last_miss_at, last_miss_at)
+                """,
+                field_rows,
+            )
+    except sqlite3.Error as e:
+        logging.error(f"Error saving selector stats: {e}")
+
+
+def selector_report():
+    """
+    Summarizes selector lookups per field.
+
+    Returns:
+        list[dict]: One row per field with `field`, `lookups`, `misses` (lookups no
+        candidate matched), `last_miss_at` and `selectors`, a list of dicts with
+        `selector`, `hits`, `misses`, `last_hit_at` and `last_miss_at`.
+    """
+    conn = get_connection()
+    fields = {
+        field: {"field": field, "lookups": lookups, "misses": misses, "last_miss_at": last_miss_at, "selectors": []}
+        for field, lookups, misses, last_miss_at in conn.execute(
+            "SELECT field, lookups, misses, last_miss_at FROM selector_field_stats ORDER BY field"
+        )
+    }
+    keys = ("selector", "hits", "misses", "last_hit_at", "last_miss_at")
+    for field, *values in conn.execute(
+        "SELECT field, selector, hits, misses, last_hit_at, last_miss_at FROM selector_stats ORDER BY field, hits DESC"
+    ):
+        row = fields.setdefault(field, {"field": field, "lookups": 0, "misses": 0, "last_miss_at": None, "selectors": []})
+        row["selectors"].append(dict(zip(keys, values)))
+    return list(fields.values())
+
+
+# ---------------------------------------------------------------------------
+# Write-behind buffer for new posts
+# ---------------------------------------------------------------------------
+class PostWriter:
+    """
+    Buffers new posts and saves them from a background thread with `save_posts_bulk`.
+
+    A batch is committed once `batch_size` rows are waiting or the oldest
+    waiting row is `flush_interval_ms` old, whichever comes first. Each
+    submitted row gets a Future that resolves to the same True/False that
+    `save_post` would have returned.
+    """
+
+    def __init__(self, batch_size=25, flush_interval_ms=500):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="post-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, link, author, date, location, content, service_request, classification_version=None,
+               posted_at=None, signature=None, duplicate_of=None, date_text=None, draft=None):
+        """
+        Queues a post for saving and returns immediately. Arguments are as for `save_post`.
+
+        Returns:
+            Future: Resolves to True if the post was saved, False if it was already stored.
+        """
+        if self._closed:
+            raise RuntimeError("PostWriter is closed")
+        future = Future()
+        row = (link, author, date, location, content, service_request, classification_version, posted_at,
+               int(time.time()), signature, duplicate_of, date_text, draft)
+        self._queue.put(("row", row, future))
+        return future
+
+    def flush(self, timeout=None):
+        """Blocks until every row submitted so far has been committed."""
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(("flush", None, done))
+        done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Flushes outstanding rows and stops the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        done = threading.Event()
+        self._queue.put(("stop", None, done))
+        done.wait(timeout)
+        self._thread.join(timeout)
+
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if not pending else max(0, deadline - time.monotonic())
+            try:
+                kind, row, waiter = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                kind = None
+
+            if kind == "row":
+                if not pending:
+                    deadline = time.monotonic() + self.flush_interval
+                pending.append((row, waiter))
+                if len(pending) < self.batch_size and time.monotonic() < deadline:
+                    continue
+            elif kind in ("flush", "stop"):
+                self._write(pending)
+                pending = []
+                if kind == "stop":
+                    close_connection()
+                    waiter.set()
+                    return
+                waiter.set()
+                continue
+
+            # Batch full or flush interval elapsed
+            self._write(pending)
+            pending = []
+
+    def _write(self, pending):
+        if not pending:
+            return
+        try:
+            with span("save"):
+                results = save_posts_bulk([row for row, _ in pending])
+        except Exception as e:
+            logging.error(f"Post writer failed to save {len(pending)} posts: {e}")
+            results = [False] * len(pending)
+        for (_, future), saved in zip(pending, results):
+            future.set_result(saved)
+
+
+_post_writer = None
+_post_writer_lock = threading.Lock()
+
+
+def get_post_writer():
+    """Returns the shared PostWriter, starting it on first use."""
+    global _post_writer
+    with _post_writer_lock:
+        if _post_writer is None:
+            _post_writer = PostWriter()
+        return _post_writer
+
+
+def shutdown_post_writer():
+    """Flushes and stops the shared PostWriter. Safe to call more than once."""
+    global _post_writer
+    with _post_writer_lock:
+        writer, _post_writer = _post_writer, None
+    if writer is not None:
+        logging.info("Flushing buffered posts to the database...")
+        writer.close()
+
+
+# Never lose buffered rows on a normal interpreter exit
+atexit.register(shutdown_post_writer)
 
 if __name__ == "__main__":
+    configure_logging()
     initialize_db()
-    logging.info("Database setup complete!")
\ No newline at end of file
+    reparse_posted_at()
+    logging.info("Database setup complete!")
@@ -0,0 +1,270 @@
+# ledger.py
+
+"""
+A ledger of every OpenAI call: which post and search it was for, which
+prompt, which model, how many tokens, how long it took, whether it worked
+and roughly what it cost. Model cascade decisions (see classifier.py) are
+recorded through the same buffered writer.
+
+RateLimitedClient reports each API attempt to `record_llm_call`. Callers
+describe the work with `call_context(link=..., prompt_kind=...)`; the search
+query comes from the current metrics run. Rows are buffered and written by
+a background thread, so recording never waits on SQLite.
+
+Usage:
+    python ledger.py report [--by query|day|prompt|model] [--days 30]
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import time  # Call timestamps and flush intervals
+import queue  # Hand-off to the writer thread
+import atexit  # Flush buffered rows on exit
+import logging  # For structured logging
+import argparse  # Command-line interface
+import threading  # Writer thread and per-thread call context
+from contextlib import contextmanager
+
+from config import LLM_LEDGER_ENABLED, LLM_PRICES_PER_MILLION_TOKENS
+from database import (
+    initialize_db,
+    save_llm_calls,
+    save_cascade_decisions,
+    close_connection,
+    llm_call_report,
+    LLM_REPORT_GROUPS,
+)
+from metrics import current_query
+from utils import configure_logging
+
+
+# ---------------------------------------------------------------------------
+# 1. Call context and cost
+# ---------------------------------------------------------------------------
+_context = threading.local()
+
+
+@contextmanager
+def call_context(**fields):
+    """
+    Attaches `link` and/or `prompt_kind` to every call made in this thread inside the block.
+
+    Contexts nest; inner values win and the outer ones are restored afterwards.
+    """
+    previous = getattr(_context, "fields", {})
+    _context.fields = dict(previous, **fields)
+    try:
+        yield
+    finally:
+        _context.fields = previous
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """
+    Estimates the USD cost of a call from LLM_PRICES_PER_MILLION_TOKENS.
+
+    Dated model names (e.g. "gpt-4o-2024-08-06") use the price of their longest known prefix.
+
+    Returns:
+        float or None: Estimated cost, or None for an unknown model.
+    """
+    matches = [name for name in LLM_PRICES_PER_MILLION_TOKENS if (model or "").startswith(name)]
+    if not matches:
+        return None
+    prompt_price, completion_price = LLM_PRICES_PER_MILLION_TOKENS[max(matches, key=len)]
+    return ((prompt_tokens or 0) * prompt_price + (completion_tokens or 0) * completion_price) / 1_000_000
+
+
+# ---------------------------------------------------------------------------
+# 2. Buffered writer
+# ---------------------------------------------------------------------------
+class LedgerWriter:
+    """
+    Buffers ledger rows and writes them from a background thread.
+
+    A batch is written once `batch_size` rows are waiting or the oldest one is
+    `flush_interval_ms` old. Each row carries the function that saves it
+    (`save_llm_calls` or `save_cascade_decisions`).
+    """
+
+    def __init__(self, batch_size=50, flush_interval_ms=2000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="llm-ledger", daemon=True)
+        self._thread.start()
+
+    def record(self, row, save=save_llm_calls):
+        """
+        Queues one row.
+
+        Args:
+            row (tuple): Values in the column order `save` expects.
+            save (callable, optional): Bulk writer for the row's table. Defaults to `save_llm_calls`.
+        """
+        if not self._closed:
+            self._queue.put(("row", (save, row)))
+
+    def close(self, timeout=None):
+        """Writes outstanding rows and stops the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(("stop", None))
+        self._thread.join(timeout)
+
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if not pending else max(0, deadline - time.monotonic())
+            try:
+                kind, row = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                kind = None
+
+            if kind == "row":
+                if not pending:
+                    deadline = time.monotonic() + self.flush_interval
+                pending.append(row)
+                if len(pending) < self.batch_size and time.monotonic() < deadline:
+                    continue
+
+            self._write(pending)
+            pending = []
+            if kind == "stop":
+                close_connection()
+                return
+
+    def _write(self, pending):
+        batches = {}
+        for save, row in pending:
+            batches.setdefault(save, []).append(row)
+        for save, rows in batches.items():
+            save(rows)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_ledger_writer():
+    """Returns the shared LedgerWriter, starting it on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LedgerWriter()
+        return _writer
+
+
+def shutdown_ledger():
+    """Writes buffered ledger rows and stops the writer. Safe to call more than once."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+atexit.register(shutdown_ledger)
+
+
+def record_llm_call(request, response, latency, error=None):
+    """
+    `on_call` hook for RateLimitedClient: queues one ledger row for an API attempt.
+
+    Args:
+        request (dict): The Chat Completions request.
+        response (ChatCompletion or None): The response, if the call succeeded.
+        latency (float): Seconds the call took.
+        error (Exception, optional): The error, if the call failed.
+    """
+    if not LLM_LEDGER_ENABLED:
+        return
+    fields = getattr(_context, "fields", {})
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    model = getattr(response, "model", None) or request.get("model")
+    get_ledger_writer().record((
+        time.time(),
+        current_query(),
+        fields.get("link"),
+        fields.get("prompt_kind"),
+        model,
+        prompt_tokens,
+        completion_tokens,
+        latency * 1000,
+        "ok" if error is None else type(error).__name__,
+        estimate_cost(model, prompt_tokens, completion_tokens) if usage is not None else None,
+    ))
+
+
+def record_cascade_decision(fast_model, fast_answer, confidence, escalated, final_model, final_answer,
+                            fast_latency, escalated_latency=None):
+    """
+    Queues one model cascade decision for the post in the current call context.
+
+    Args:
+        fast_model (str): First-tier model.
+        fast_answer (bool or None): Its answer, or None if it failed or didn't parse.
+        confidence (float or None): Probability the fast model gave its answer.
+        escalated (bool): Whether the post went on to `final_model`.
+        final_model (str): Model whose answer was used.
+        final_answer (bool): The answer used.
+        fast_latency (float): Seconds spent on the fast tier.
+        escalated_latency (float, optional): Seconds spent on the escalated call.
+    """
+    if not LLM_LEDGER_ENABLED:
+        return
+    get_ledger_writer().record((
+        time.time(),
+        getattr(_context, "fields", {}).get("link"),
+        fast_model,
+        fast_answer,
+        confidence,
+        escalated,
+        final_model,
+        final_answer,
+        fast_latency * 1000,
+        escalated_latency * 1000 if escalated_latency is not None else None,
+    ), save=save_cascade_decisions)
+
+
+# ---------------------------------------------------------------------------
+# 3. Report
+# ---------------------------------------------------------------------------
+def print_report(group_by="query", days=None):
+    """Prints ledger totals grouped by search query, day, prompt or model."""
+    since = time.time() - days * 86400 if days else None
+    rows = llm_call_report(group_by, since)
+    if not rows:
+        print("No LLM calls recorded.")
+        return rows
+
+    print(f"{group_by:<32}{'calls':>7}{'failed':>8}{'posts':>7}{'prompt tok':>12}{'compl tok':>11}"
+          f"{'avg ms':>9}{'cost $':>10}{'$/post':>9}")
+    for row in rows:
+        per_post = row["cost_usd"] / row["posts"] if row["posts"] else 0.0
+        print(f"{str(row['group'])[:31]:<32}{row['calls']:>7}{row['failed']:>8}{row['posts']:>7}"
+              f"{row['prompt_tokens']:>12}{row['completion_tokens']:>11}{row['avg_latency_ms'] or 0:>9.0f}"
+              f"{row['cost_usd']:>10.4f}{per_post:>9.4f}")
+    total_cost = sum(row["cost_usd"] for row in rows)
+    print(f"{'total':<32}{sum(row['calls'] for row in rows):>7}{'':>47}{total_cost:>10.4f}")
+    return rows
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    report_cmd = commands.add_parser("report", help="Aggregate recorded calls.")
+    report_cmd.add_argument("--by", choices=sorted(LLM_REPORT_GROUPS), default="query")
+    report_cmd.add_argument("--days", type=float, help="Only include the last N days.")
+    args = parser.parse_args()
+
+    initialize_db()
+    if args.command == "report":
+        print_report(args.by, args.days)
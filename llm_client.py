@@ -0,0 +1,243 @@
+# llm_client.py
+
+"""
+A rate-limit-aware wrapper around the OpenAI client.
+
+All model calls go through RateLimitedClient.chat_completion, which:
+ - spends from requests-per-minute and tokens-per-minute token buckets,
+ - caps the number of requests in flight,
+ - retries throttling and transient errors with jittered exponential
+   backoff, honouring the server's Retry-After hint, and
+ - trips a circuit breaker after repeated failures so a dead API doesn't
+   stall every classifier thread.
+
+With several classifier threads sharing one wrapper, throughput stays near
+the quota without bursts of 429s.
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import time  # Monotonic clock for buckets and backoff
+import random  # Backoff jitter
+import logging  # For structured logging
+import threading  # Buckets and breaker are shared across classifier threads
+
+from config import (
+    OPENAI_REQUESTS_PER_MINUTE,
+    OPENAI_TOKENS_PER_MINUTE,
+    OPENAI_MAX_CONCURRENT_REQUESTS,
+    OPENAI_MAX_RETRIES,
+    OPENAI_CIRCUIT_BREAKER_THRESHOLD,
+    OPENAI_CIRCUIT_BREAKER_RESET_SECONDS,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+
+# ---------------------------------------------------------------------------
+# 1. Token bucket
+# ---------------------------------------------------------------------------
+class TokenBucket:
+    """
+    Refills `per_minute` units per minute, up to one minute's worth.
+
+    Args:
+        per_minute (float): Refill rate and capacity.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Blocks until `amount` units are available, then spends them."""
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, amount):
+        """Charges (positive) or refunds (negative) units after the fact, e.g. actual vs estimated tokens."""
+        with self._lock:
+            self._refill()
+            self.available = min(self.capacity, self.available - amount)
+
+
+# ---------------------------------------------------------------------------
+# 2. Circuit breaker
+# ---------------------------------------------------------------------------
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for `reset_seconds`.
+
+    After that one trial call is let through (half-open); its success closes
+    the breaker, its failure opens it again.
+    """
+
+    def __init__(self, threshold, reset_seconds):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpenError if calls are currently blocked."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_seconds or self._trial_in_flight:
+                raise CircuitOpenError("OpenAI circuit breaker is open")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logging.error(f"🚫 OpenAI failed {self.failures} times in a row; pausing calls for {self.reset_seconds}s.")
+                self.opened_at = time.monotonic()
+
+
+# ---------------------------------------------------------------------------
+# 3. Rate-limited client
+# ---------------------------------------------------------------------------
+def _retry_after_seconds(error):
+    """Reads the Retry-After hint from an API error response, if there is one."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+def _is_retryable(error):
+    # Only reached after a call failed, so the client has already loaded openai
+    from openai import APIConnectionError, APIStatusError, InternalServerError, RateLimitError
+
+    if isinstance(error, RateLimitError):
+        # Running out of credit won't fix itself with a retry
+        return getattr(error, "code", None) != "insufficient_quota"
+    if isinstance(error, (APIConnectionError, InternalServerError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return False
+
+
+def estimate_tokens(request):
+    """Rough token estimate for a chat request (about 4 characters per token, plus the reply)."""
+    prompt_chars = sum(len(message.get("content") or "") for message in request.get("messages", []))
+    return prompt_chars // 4 + request.get("max_tokens", 300)
+
+
+class RateLimitedClient:
+    """
+    Wraps an `OpenAI` client with rate limiting, retries and a circuit breaker.
+
+    Args:
+        client (OpenAI): The underlying client. Its own retries should be disabled (`max_retries=0`).
+        on_call (callable, optional): `on_call(request, response, latency, error)`, called after
+            every API attempt (e.g. `ledger.record_llm_call`). `response` is None when it failed.
+    """
+
+    def __init__(self, client,
+                 requests_per_minute=OPENAI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=OPENAI_TOKENS_PER_MINUTE,
+                 max_concurrent=OPENAI_MAX_CONCURRENT_REQUESTS,
+                 max_retries=OPENAI_MAX_RETRIES,
+                 base_delay=1.0,
+                 max_delay=60.0,
+                 on_call=None):
+        self.client = client
+        self.on_call = on_call
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.in_flight = threading.BoundedSemaphore(max_concurrent)
+        self.breaker = CircuitBreaker(OPENAI_CIRCUIT_BREAKER_THRESHOLD, OPENAI_CIRCUIT_BREAKER_RESET_SECONDS)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def chat_completion(self, **request):
+        """
+        Calls `client.chat.completions.create(**request)` within the budget.
+
+        Returns:
+            ChatCompletion: The API response.
+
+        Raises:
+            CircuitOpenError: If the breaker is open.
+            openai.APIError: If the call failed and retries are exhausted or pointless.
+        """
+        estimated = estimate_tokens(request)
+        attempt = 0
+        while True:
+            # Retries of an admitted call don't need to pass the breaker again
+            if attempt == 0:
+                self.breaker.before_call()
+            self.requests.acquire()
+            self.tokens.acquire(estimated)
+            started = time.perf_counter()
+            try:
+                with self.in_flight:
+                    response = self.client.chat.completions.create(**request)
+            except Exception as e:
+                self._report(request, None, time.perf_counter() - started, e)
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                retry_after = _retry_after_seconds(e)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                attempt += 1
+                logging.warning(f"⚠️ OpenAI call failed ({type(e).__name__}); retry {attempt}/{self.max_retries} in {delay:.1f}s.")
+                time.sleep(delay)
+                continue
+
+            self._report(request, response, time.perf_counter() - started)
+            self.breaker.record_success()
+            usage = getattr(response, "usage", None)
+            if usage is not None and usage.total_tokens:
+                self.tokens.adjust(usage.total_tokens - estimated)
+            return response
+
+    def _report(self, request, response, latency, error=None):
+        if self.on_call is None:
+            return
+        try:
+            self.on_call(request, response, latency, error)
+        except Exception as e:
+            logging.warning(f"on_call hook failed: {e}")
@@ -5,13 +5,188 @@ import random
 import sqlite3
 import logging
 
-from nextdoor_login import login_to_nextdoor
-from nextdoor_scrape import search_nextdoor, parse_posts
-from config import NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD, OPENAI_API_KEY
-from database import initialize_db, post_exists, save_post
+from nextdoor_login import login_to_nextdoor, NEXTDOOR_HOME_URL
+from nextdoor_scrape import search_nextdoor, parse_posts, post_approved_comments, driver_alive, verify_login
+from review_comments import review_pending_comments
+from classifier import retry_failed_classifications
+from config import NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD, OPENAI_API_KEY, CRAWL_RESUME_ATTEMPTS, CRAWL_NEWEST_FIRST
+from database import (
+    initialize_db,
+    post_exists,
+    save_post,
+    shutdown_post_writer,
+    log_classification_cache_stats,
+    save_run_metrics,
+    queue_comments,
+    count_comments_by_status,
+    get_crawl_checkpoint,
+)
+from prefilter import log_prefilter_stats
+from ledger import shutdown_ledger
+from metrics import start_run, finish_run, span, summarize, format_summary, write_prometheus_textfile
+from utils import human_pause, configure_logging
+
+def report_run_metrics():
+    """
+    Stores, exports and logs the stage timings of the search that just finished.
+
+    Returns:
+        (RunMetrics, int): The finished run and its `runs.id`, or (None, None) if no run was active.
+    """
+    run = finish_run()
+    if run is None:
+        return None, None
+    summary = summarize(run)
+    run_id = save_run_metrics(run, summary)
+    try:
+        write_prometheus_textfile(run, summary)
+    except OSError as e:
+        logging.warning(f"Could not write metrics textfile: {e}")
+    logging.info(format_summary(run, summary))
+    return run, run_id
+
+
+def review_and_post_queued_comments(driver):
+    """
+    Offers to review queued drafts (they can also be reviewed from another
+    terminal with `python review_comments.py`), then posts every approved one.
+    """
+    pending = count_comments_by_status().get("pending", 0)
+    if pending:
+        answer = input(f"\n📝 {pending} drafted comments await review. Review them now? (yes/no): ").strip().lower()
+        if answer == "yes":
+            review_pending_comments()
+    post_approved_comments(driver)
+
+
+def run_search(driver, search_query, max_posts=50, max_runtime=1200, review=True, newest_first=CRAWL_NEWEST_FIRST):
+    """
+    Runs one search end to end: search, parse and classify the new posts, retry
+    failed classifications, post approved comments and record the run metrics.
+
+    Args:
+        driver (WebDriver): A logged-in Selenium WebDriver.
+        search_query (str): The term to search on Nextdoor.
+        max_posts (int, optional): Maximum number of posts to extract.
+        max_runtime (int, optional): Maximum runtime of the crawl in seconds.
+        review (bool, optional): Offer to review queued drafts before posting approved comments.
+            Unattended runs pass False and only post what was already approved.
+        newest_first (bool, optional): Whether the results are newest first, so the crawl can
+            stop at posts stored by earlier runs (see `parse_posts`).
+
+    Returns:
+        (str, RunMetrics, int): "ok", "no_results" (the search failed or found nothing) or
+        "error" (the browser session was lost, during the search or the crawl; see
+        `recover_driver`), plus the finished run
+        and its `runs.id`.
+    """
+    start_run(search_query)
+    try:
+        checkpoint = get_crawl_checkpoint(search_query)
+        if checkpoint and checkpoint["phase"] == "visit":
+            # Harvested posts are opened by URL, so there is no need to search again
+            logging.info(f"Resuming the crawl for '{search_query}' from its checkpoint.")
+            search_ok = True
+        else:
+            logging.info(f"Searching Nextdoor for '{search_query}'...")
+            with span("search"):
+                search_ok = search_nextdoor(driver, search_query)
+        if not search_ok and not driver_alive(driver):
+            # search_nextdoor swallows WebDriver errors; a dead browser is not an empty search
+            logging.error("Browser session lost during the search.")
+            status = "error"
+        elif not search_ok:
+            logging.warning("Search failed or no results found.")
+            status = "no_results"
+        else:
+            logging.info("Search results are now displayed.")
+            # Parse the posts
+            result = parse_posts(
+                driver,
+                max_posts=max_posts,
+                max_runtime=max_runtime,
+                verify_links=True,  # Optional: Add logic for link verification if needed
+                search_query=search_query,
+                newest_first=newest_first,
+            )
+            if result is None:
+                status = "error"
+            else:
+                logging.info("Post extraction complete.")
+                log_classification_cache_stats()
+                log_prefilter_stats()
+
+                # Give posts whose classification failed earlier another try
+                queue_comments(retry_failed_classifications())
+                if review:
+                    review_and_post_queued_comments(driver)
+                else:
+                    post_approved_comments(driver)
+                status = "ok"
+    finally:
+        run, run_id = report_run_metrics()
+    return status, run, run_id
+
+
+def recover_driver(driver, login=None):
+    """
+    Gets a logged-in driver back after a failed crawl.
+
+    The current browser is kept when it still responds and `verify_login`
+    passes on the news feed; only otherwise is it closed and replaced by a new
+    session, which costs a full browser start and login.
+
+    Args:
+        driver (WebDriver): The driver the crawl failed on.
+        login (callable, optional): Returns a new logged-in driver or None. Defaults to
+            `login_to_nextdoor` with the configured credentials.
+
+    Returns:
+        WebDriver or None: A usable driver, or None if logging in again failed.
+    """
+    if driver is not None and driver_alive(driver):
+        try:
+            driver.get(NEXTDOOR_HOME_URL)
+            human_pause(2, 4)
+            if verify_login(driver):
+                logging.info("Browser session is still usable; no re-login needed.")
+                return driver
+        except Exception as e:
+            logging.warning(f"Could not check the existing browser session: {e}")
+
+    logging.info("Starting a new browser session...")
+    if driver is not None:
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.debug(f"Error closing the browser: {e}")
+    time.sleep(5)
+    if login is None:
+        return login_to_nextdoor(NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD)
+    return login()
+
+
+def run_search_with_resume(driver, search_query, max_posts=50, max_runtime=1200, review=True, login=None,
+                           attempts=CRAWL_RESUME_ATTEMPTS, newest_first=CRAWL_NEWEST_FIRST):
+    """
+    Runs `run_search`, and when the browser session is lost, recovers the driver
+    and resumes the crawl from its checkpoint, up to `attempts` more times.
+
+    Returns:
+        (WebDriver, str, RunMetrics, int): The driver to keep using (None if it could not be
+        recovered) and the last `run_search` result.
+    """
+    status, run, run_id = run_search(driver, search_query, max_posts, max_runtime, review, newest_first)
+    for attempt in range(attempts):
+        if status != "error":
+            break
+        logging.error(f"Crawl for '{search_query}' failed; recovering (attempt {attempt + 1}/{attempts})...")
+        driver = recover_driver(driver, login)
+        if driver is None:
+            break
+        status, run, run_id = run_search(driver, search_query, max_posts, max_runtime, review, newest_first)
+    return driver, status, run, run_id
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 def main():
     # 1) Initialize the database (create tables/columns if missing)
@@ -49,42 +224,33 @@ def main():
         max_posts = int(input("Enter the maximum number of posts to extract (default 50): ") or 50)
         max_runtime = int(input("Enter the maximum runtime in seconds (default 1200): ") or 1200)
 
-        logging.info(f"Searching Nextdoor for '{search_query}'...")
-        if search_nextdoor(driver, search_query):
-            logging.info("Search results are now displayed.")
-            # Parse the posts
-            result = parse_posts(
-                driver,
-                max_posts=max_posts,
-                max_runtime=max_runtime,
-                verify_links=True  # Optional: Add logic for link verification if needed
-            )
-
-            if result is None:
-                logging.error("An error occurred. Restarting bot...")
-                driver.quit()
-                time.sleep(5)
-                # Re-init driver if you want to keep going
-                driver = login_to_nextdoor(NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD)
-                if driver is None:
-                    logging.error("Could not re-initialize driver. Exiting.")
-                    break
-                continue
-            else:
-                logging.info("Post extraction complete.")
-        else:
-            logging.warning("Search failed or no results found. Try again.")
+        driver, status, _, _ = run_search_with_resume(driver, search_query, max_posts, max_runtime)
+        if driver is None:
+            logging.error("Could not re-initialize driver. Exiting.")
+            break
+        if status == "error":
+            logging.error(f"Giving up on '{search_query}' for now; its checkpoint is kept for the next run.")
+        elif status == "no_results":
+            logging.warning("Try another search term.")
 
     # Close everything gracefully
-    logging.info("Closing browser session...")
-    driver.quit()
+    shutdown_post_writer()
+    shutdown_ledger()
+    if driver is not None:
+        logging.info("Closing browser session...")
+        driver.quit()
     logging.info("Script execution completed.")
 
 
 if __name__ == "__main__":
+    configure_logging()
     try:
         main()
     except KeyboardInterrupt:
         logging.info("\nScript interrupted by user. Closing session...")
     except Exception as e:
-        logging.error(f"Unexpected error occurred: {e}")
\ No newline at end of file
+        logging.error(f"Unexpected error occurred: {e}")
+    finally:
+        # Commit any posts still sitting in the write-behind buffers
+        shutdown_post_writer()
+        shutdown_ledger()
\ No newline at end of file
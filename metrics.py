@@ -0,0 +1,176 @@
+# metrics.py
+
+"""
+Lightweight per-stage timing for scrape runs.
+
+Wrap a stage in `with span("classification"):` and its duration is added to
+the current run (one run per search). Spans are cheap when no run is active.
+At the end of a run, `summarize` gives count/p50/p95/max per stage; main.py
+stores the summary in the `runs`/`stage_metrics` tables, writes it to a
+Prometheus textfile and logs it.
+
+Stages recorded by the bot: search, feed_fetch, detail_load, extraction,
+classification, save and comment. `pause` covers every human-like sleep; those
+sleeps also count towards the stage they happen in, so `pause` shows how much
+of search/detail_load/comment time was deliberate waiting.
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import os  # Atomic textfile replace
+import math  # Nearest-rank percentiles
+import time  # Span timing
+import threading  # Spans are recorded from worker threads too
+from contextlib import contextmanager
+
+from config import METRICS_TEXTFILE_PATH
+
+
+class RunMetrics:
+    """Durations per stage plus free-form counters for one run."""
+
+    def __init__(self, query):
+        self.query = query
+        self.started_at = time.time()
+        self.finished_at = None
+        self.durations = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.durations.setdefault(stage, []).append(seconds)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+
+_current_run = None
+
+
+def start_run(query):
+    """Starts collecting spans for a new run and makes it the current one."""
+    global _current_run
+    _current_run = RunMetrics(query)
+    return _current_run
+
+
+def finish_run():
+    """Stops the current run and returns it (or None if no run was active)."""
+    global _current_run
+    run, _current_run = _current_run, None
+    if run is not None:
+        run.finished_at = time.time()
+    return run
+
+
+@contextmanager
+def span(stage):
+    """Times the enclosed block as `stage` in the current run."""
+    run = _current_run
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.record(stage, time.perf_counter() - start)
+
+
+def current_query():
+    """Returns the search query of the current run, or None outside a run."""
+    run = _current_run
+    return run.query if run is not None else None
+
+
+def count(name, amount=1):
+    """Adds to a counter (e.g. posts_saved) on the current run."""
+    run = _current_run
+    if run is not None:
+        run.count(name, amount)
+
+
+def _percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(run):
+    """
+    Aggregates a run's spans.
+
+    Returns:
+        dict: stage -> {count, total, p50, p95, max} in seconds.
+    """
+    with run._lock:
+        durations = {stage: sorted(values) for stage, values in run.durations.items()}
+    return {
+        stage: {
+            "count": len(values),
+            "total": sum(values),
+            "p50": _percentile(values, 0.50),
+            "p95": _percentile(values, 0.95),
+            "max": values[-1],
+        }
+        for stage, values in durations.items() if values
+    }
+
+
+def format_summary(run, summary):
+    """Renders a run summary as a small table for the log."""
+    elapsed = (run.finished_at or time.time()) - run.started_at
+    lines = [f"Run summary for '{run.query}' ({elapsed:.1f}s): "
+             + ", ".join(f"{name}={value}" for name, value in sorted(run.counters.items()))]
+    lines.append(f"  {'stage':<16}{'count':>7}{'total':>10}{'p50':>9}{'p95':>9}{'max':>9}")
+    for stage, stats in sorted(summary.items(), key=lambda item: -item[1]["total"]):
+        lines.append(
+            f"  {stage:<16}{stats['count']:>7}{stats['total']:>9.2f}s"
+            f"{stats['p50']:>8.2f}s{stats['p95']:>8.2f}s{stats['max']:>8.2f}s"
+        )
+    return "\n".join(lines)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def write_prometheus_textfile(run, summary, path=METRICS_TEXTFILE_PATH):
+    """
+    Writes the run's metrics in Prometheus text format (for node_exporter's textfile collector).
+
+    The file is replaced atomically so a scrape never sees a half-written file.
+    """
+    query = _escape_label(run.query)
+    lines = [
+        "# HELP nextdoor_stage_duration_seconds Stage durations in the last run.",
+        "# TYPE nextdoor_stage_duration_seconds summary",
+    ]
+    for stage, stats in sorted(summary.items()):
+        labels = f'query="{query}",stage="{stage}"'
+        lines.append(f'nextdoor_stage_duration_seconds{{{labels},quantile="0.5"}} {stats["p50"]:.6f}')
+        lines.append(f'nextdoor_stage_duration_seconds{{{labels},quantile="0.95"}} {stats["p95"]:.6f}')
+        lines.append(f'nextdoor_stage_duration_seconds{{{labels},quantile="1"}} {stats["max"]:.6f}')
+        lines.append(f"nextdoor_stage_duration_seconds_sum{{{labels}}} {stats['total']:.6f}")
+        lines.append(f"nextdoor_stage_duration_seconds_count{{{labels}}} {stats['count']}")
+
+    lines.append("# HELP nextdoor_run_counter Counters recorded in the last run.")
+    lines.append("# TYPE nextdoor_run_counter gauge")
+    for name, value in sorted(run.counters.items()):
+        lines.append(f'nextdoor_run_counter{{query="{query}",name="{_escape_label(name)}"}} {value}')
+
+    elapsed = (run.finished_at or time.time()) - run.started_at
+    lines.append("# HELP nextdoor_run_duration_seconds Wall time of the last run.")
+    lines.append("# TYPE nextdoor_run_duration_seconds gauge")
+    lines.append(f'nextdoor_run_duration_seconds{{query="{query}"}} {elapsed:.3f}')
+    lines.append("# HELP nextdoor_run_finished_timestamp_seconds When the last run finished.")
+    lines.append("# TYPE nextdoor_run_finished_timestamp_seconds gauge")
+    lines.append(f"nextdoor_run_finished_timestamp_seconds {run.finished_at or time.time():.0f}")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as textfile:
+        textfile.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
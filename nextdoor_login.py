@@ -1,19 +1,67 @@
-from config import NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD, HEADLESS_MODE
+from config import NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD, HEADLESS_MODE, CHROME_PROFILE_DIR
+import os
 import time
 import random
-import undetected_chromedriver as uc
-from selenium.webdriver.chrome.options import Options
-from selenium_stealth import stealth
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+NEXTDOOR_HOME_URL = "https://nextdoor.com/news_feed/"
+
+# How long the last login_to_nextdoor call took, and whether it reused a saved session
+last_startup = {"seconds": None, "reused_session": None}
+
+
+def profile_user_agent(profile_dir, user_agent_list):
+    """
+    Returns the user agent stored with a persisted profile, picking and storing
+    one on first use, so the saved cookies keep being sent with the same browser identity.
+    """
+    path = os.path.join(profile_dir, "user_agent.txt")
+    try:
+        with open(path, encoding="utf-8") as f:
+            user_agent = f.read().strip()
+        if user_agent:
+            return user_agent
+    except OSError:
+        pass
+    user_agent = random.choice(user_agent_list)
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(user_agent)
+    except OSError as e:
+        logging.warning(f"Could not store the profile's user agent: {e}")
+    return user_agent
+
+
+def _startup_done(start, reused_session):
+    last_startup["seconds"] = time.perf_counter() - start
+    last_startup["reused_session"] = reused_session
+    how = "reused the saved session" if reused_session else "logged in"
+    logging.info(f"Browser ready in {last_startup['seconds']:.1f}s ({how}).")
+
+
+def login_to_nextdoor(user_email, user_password, user_agent_list=None, headless=HEADLESS_MODE,
+                      profile_dir=CHROME_PROFILE_DIR):
+    """
+    Initializes a Chrome WebDriver with stealth settings and logs into Nextdoor.
+
+    With `profile_dir`, Chrome keeps its user-data directory (and so its cookies)
+    there between runs. If the saved session is still logged in, the login form,
+    its typing delays and any 2FA prompt are skipped entirely. Only one browser
+    can use a profile directory at a time, so the browser is quit whenever this
+    returns None or raises; a leaked Chrome would keep the profile locked.
+    Startup time is logged and kept in `last_startup`.
+    """
+    # The browser stack is imported here, not at module level, so importing this
+    # module (e.g. for NEXTDOOR_HOME_URL) doesn't load Selenium and undetected_chromedriver
+    import undetected_chromedriver as uc
+    from selenium.webdriver.chrome.options import Options
+    from selenium_stealth import stealth
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
 
-def login_to_nextdoor(user_email, user_password, user_agent_list=None, headless=HEADLESS_MODE):
-    """Initializes a Chrome WebDriver with stealth settings and logs into Nextdoor."""
     logging.info("Initializing browser...")
+    start = time.perf_counter()
 
     if user_agent_list is None or len(user_agent_list) == 0:
         user_agent_list = [
@@ -21,7 +69,10 @@ def login_to_nextdoor(user_email, user_password, user_agent_list=None, headless=
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36",
             "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
         ]
-    random_user_agent = random.choice(user_agent_list)
+    if profile_dir:
+        random_user_agent = profile_user_agent(profile_dir, user_agent_list)
+    else:
+        random_user_agent = random.choice(user_agent_list)
 
     chrome_options = Options()
     chrome_options.add_argument("--start-maximized")
@@ -35,8 +86,10 @@ def login_to_nextdoor(user_email, user_password, user_agent_list=None, headless=
     if headless:
         chrome_options.add_argument("--headless")
 
+    driver = None
     try:
-        driver = uc.Chrome(options=chrome_options, headless=headless)
+        user_data_dir = os.path.abspath(profile_dir) if profile_dir else None
+        driver = uc.Chrome(options=chrome_options, headless=headless, user_data_dir=user_data_dir)
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         stealth(
             driver,
@@ -50,13 +103,30 @@ def login_to_nextdoor(user_email, user_password, user_agent_list=None, headless=
         logging.info("Browser stealth mode activated.")
     except Exception as e:
         logging.error(f"Error initializing undetected_chromedriver: {e}")
+        if driver is not None:
+            driver.quit()
         return None
 
-    logging.info("Attempting to log in...")
-    driver.get("https://nextdoor.com/login/")
-    time.sleep(3)
+    if profile_dir:
+        logging.info("Checking the saved browser session...")
+        try:
+            driver.get(NEXTDOOR_HOME_URL)
+            time.sleep(2)
+            if check_login_success(driver, attempts=2, delay=2):
+                _startup_done(start, reused_session=True)
+                return driver
+            logging.info("Saved session is not logged in.")
+        except Exception as e:
+            logging.warning(f"Could not check the saved session ({e}); logging in instead.")
+        except BaseException:
+            driver.quit()
+            raise
 
     try:
+        logging.info("Attempting to log in...")
+        driver.get("https://nextdoor.com/login/")
+        time.sleep(3)
+
         logging.info("Entering email...")
         email_input = driver.find_element(By.NAME, "email")
         email_input.send_keys(user_email)
@@ -73,6 +143,7 @@ def login_to_nextdoor(user_email, user_password, user_agent_list=None, headless=
 
         if check_login_success(driver, attempts=3, delay=4):
             logging.info("Login successful!")
+            _startup_done(start, reused_session=False)
             return driver
         else:
             while True:
@@ -80,6 +151,7 @@ def login_to_nextdoor(user_email, user_password, user_agent_list=None, headless=
                 if user_input == "yes":
                     if check_login_success(driver):
                         logging.info("Login successful after 2FA!")
+                        _startup_done(start, reused_session=False)
                         return driver
                     else:
                         logging.warning("Still can't find search bar, maybe 2FA isn't done yet...")
@@ -93,9 +165,14 @@ def login_to_nextdoor(user_email, user_password, user_agent_list=None, headless=
         logging.error(f"Error during login: {e}")
         driver.quit()
         return None
+    except BaseException:
+        # Ctrl+C at the 2FA prompt, for instance
+        driver.quit()
+        raise
 
 def check_login_success(driver, attempts=3, delay=3):
     """Checks if login was successful by detecting the search bar."""
+    from selenium.webdriver.common.by import By
     from selenium.common.exceptions import NoSuchElementException
 
     for attempt in range(attempts):
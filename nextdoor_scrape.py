@@ -5,13 +5,10 @@ This module holds all the functions needed to:
  1) Search Nextdoor
  2) Extract elements from posts
  3) Convert relative timestamps
- 4) Classify posts
- 5) Parse multiple posts.
+ 4) Parse multiple posts
+ 5) Post comments approved in the review queue (see review_comments.py).
 
-Make sure you:
- - Import or define your "post_exists" and "save_post" functions (database logic)
-   if needed, or import them from another module.
- - Define or import "client" for classify_post if it's not in this file.
+Post classification lives in classifier.py and database logic in database.py.
 """
 
 # -----------------------------
@@ -21,16 +18,42 @@ import time  # For sleep, measuring runtime
 import random  # For random sleep intervals
 import sqlite3  # Potentially used if referencing a DB directly
 import logging  # For structured logging
+from dataclasses import dataclass  # For the extracted post record
+
+# For parsing detail pages locally from one page snapshot
+from bs4 import BeautifulSoup
 
 # For date/time conversion of post timestamps
-from utils import convert_relative_time_to_absolute
+from utils import convert_relative_time_to_absolute, post_time_to_epoch, human_pause
+
+# For DB logic (checking existence, saving new posts, the comment approval queue)
+from database import (
+    post_exists,
+    get_post_writer,
+    get_comments,
+    record_comment_attempt,
+    get_search_state,
+    update_search_state,
+    find_near_duplicate,
+    save_crawl_checkpoint,
+    mark_checkpoint_visited,
+    get_crawl_checkpoint,
+    clear_crawl_checkpoint,
+)
+from config import CRAWL_KNOWN_STREAK_LIMIT
+
+# Classifies and saves posts on worker threads while the browser keeps scraping
+from pipeline import ClassificationPipeline
 
-# For DB logic (checking existence, saving new posts)
-from database import post_exists, save_post
+# Candidate selectors per field, tried best hit rate first
+from selector_registry import ordered_selectors, selector_exhausted, record_lookup, flush_selector_stats
 
-# OpenAI API
-from openai import OpenAI, RateLimitError, APIError
-from config import OPENAI_API_KEY
+# Per-stage timing for the current run
+import metrics
+from metrics import span
+
+# Post classification (OpenAI)
+from classifier import classify_post_versioned, CLASSIFY_PROMPT_VERSION
 
 # Selenium imports
 from selenium.webdriver.common.by import By  # For locating elements
@@ -49,25 +72,22 @@ from selenium.common.exceptions import (
     JavascriptException
 )
 
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-
 # ---------------------------------------------------------------------------
 # 1. Search Nextdoor
 # ---------------------------------------------------------------------------
 def search_nextdoor(driver, search_query):
     """
-    Searches Nextdoor for the given query and applies 'Most Recent' filter.
+    Searches Nextdoor for the given query and switches to the 'Posts' tab.
+
+    No sort order is selected here; the results are in Nextdoor's default order.
+    Whether that is newest first is set by CRAWL_NEWEST_FIRST (see `parse_posts`).
 
     Args:
         driver (WebDriver): Selenium WebDriver instance.
         search_query (str): The term to search on Nextdoor.
 
     Returns:
-        bool: True if search and filtering were successful, False otherwise.
+        bool: True if the search ran and the 'Posts' tab was opened, False otherwise.
     """
     if not search_query:
         logging.warning("No search term entered. Exiting search.")
@@ -79,20 +99,20 @@ def search_nextdoor(driver, search_query):
 
     try:
         # Random sleep to simulate human typing delays
-        time.sleep(random.randint(1, 3))
+        human_pause(1, 3)
 
         # Find the search bar and click it
         search_bar = driver.find_element(By.ID, "search-input-field")
         search_bar.click()
-        time.sleep(random.randint(1, 3))
+        human_pause(1, 3)
 
         # Enter the search query
         search_bar.send_keys(search_query)
-        time.sleep(random.randint(1, 3))
+        human_pause(1, 3)
 
         # Press ENTER
         search_bar.send_keys(Keys.RETURN)
-        time.sleep(random.randint(3, 5))
+        human_pause(3, 5)
 
         logging.info("✅ Search executed successfully!")
         search_successful = True  # Mark success
@@ -109,7 +129,7 @@ def search_nextdoor(driver, search_query):
                     EC.element_to_be_clickable((By.CSS_SELECTOR, "a[data-testid='tab-posts']"))
                 )
                 posts_button.click()
-                time.sleep(3)
+                human_pause(3, 3)
                 logging.info("✅ Filter applied: Now viewing only 'Posts'.")
                 return True
             except Exception as e:
@@ -122,257 +142,447 @@ def search_nextdoor(driver, search_query):
 # ---------------------------------------------------------------------------
 # 2. Extract elements safely
 # ---------------------------------------------------------------------------
-def extract_element_text(driver, selectors, default_text="Unknown"):
+def extract_element_text(driver, field, default_text="Unknown"):
     """
-    Extracts text from an element safely, handling exceptions like missing elements or timeouts.
+    Extracts a field's text with live WebDriver lookups, trying its registered
+    selectors best hit rate first (see selector_registry).
+
+    A candidate that raises (e.g. a stale element) is retried after a one-second
+    pause; one that simply matches nothing is not. Once every candidate has
+    missed, the lookup gives up immediately instead of sleeping through retries.
 
     Args:
         driver (WebDriver): Selenium WebDriver instance.
-        selectors (list): List of CSS selectors for the element to extract.
+        field (str): Field name in SELECTOR_CANDIDATES.
         default_text (str, optional): Default text to return if extraction fails. Defaults to "Unknown".
 
     Returns:
         str: Extracted text or default value if element is not found.
     """
     retries = 3
+    candidates = ordered_selectors(field)
+    missed = []
     for attempt in range(retries):
-        for selector in selectors:
+        failed = []
+        for selector in candidates:
             try:
-                logging.info(f"Attempting to extract text using selector: {selector}")
                 elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    text = elements[0].text.strip()
-                    logging.info(f"Extracted text: {text}")
-                    return text if text else default_text
             except Exception as e:
                 logging.warning(f"Attempt {attempt+1}: Could not extract '{selector}', error: {e}")
+                failed.append(selector)
+                continue
+            if elements:
+                record_lookup(field, missed, selector)
+                text = elements[0].text.strip()
+                return text if text else default_text
+            missed.append(selector)
+        if not failed:
+            break
+        candidates = failed
         time.sleep(1)
-    logging.warning(f"Giving up on extraction, returning default text.")
+    record_lookup(field, missed)
+    logging.warning(f"Giving up on extracting '{field}', returning default text.")
     return default_text
 
 
-# ---------------------------------------------------------------------------
-# 3. Classify a post using OpenAI (Simple 'yes'/'no' approach)
-# ---------------------------------------------------------------------------
-def classify_post(content, author):
+# Detail-page fields (selectors in selector_registry) and the value used when
+# none of their selectors match
+POST_FIELD_DEFAULTS = {
+    "author": "Unknown Author",
+    "location": "Unknown Location",
+    "date": "Unknown Date",
+    "content": "Content not found",
+}
+
+
+@dataclass
+class PostRecord:
+    """The fields extracted from a post's detail page."""
+    link: str
+    author: str
+    location: str
+    date: str
+    content: str
+
+
+def extract_text_from_soup(soup, field, default_text="Unknown"):
     """
-    Uses OpenAI to classify whether a post is a service request.
-    If 'yes', extracts the type of service and generates a custom message.
+    Returns the text of the first element matching one of a field's registered
+    selectors in an already-parsed page, and records which selector matched.
 
     Args:
-        content (str): The text content of the Nextdoor post.
-        author (str): The name of the user who posted.
+        soup (BeautifulSoup): Parsed page.
+        field (str): Field name in SELECTOR_CANDIDATES; its selectors are tried best hit rate first.
+        default_text (str, optional): Returned when nothing matches or the match is empty.
 
     Returns:
-        (bool, str): (True, custom_message) if the post is requesting a service, otherwise (False, None).
+        str: Extracted text or the default.
     """
-    if not content or not content.strip():
-        return (False, None)
+    missed = []
+    for selector in ordered_selectors(field):
+        try:
+            element = soup.select_one(selector)
+        except Exception as e:
+            logging.warning(f"Invalid selector '{selector}': {e}")
+            element = None
+        if element is not None:
+            record_lookup(field, missed, selector)
+            text = " ".join(element.get_text(" ", strip=True).split())
+            return text if text else default_text
+        missed.append(selector)
+    record_lookup(field, missed)
+    return default_text
 
-    try:
-        # Step 1: Classify if the post is a service request
-        classification_response = client.chat.completions.create(
-            model="gpt-4",  # or "gpt-3.5-turbo"
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a classifier that determines if a post is requesting a service, make sure  "
-                        "that aligns with Moku's service list (lawn care, snow blowing, landscaping, waste removal, power washing, etc.).\n"
-                        "Answer only 'yes' or 'no'."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": f"Is this post a request for our services?\n\n{content}"
-                }
-            ]
-        )
 
-        classification = classification_response.choices[0].message.content.strip().lower()
-        if classification != "yes":
-            return (False, None)
-
-        # Step 2: Extract the type of service requested
-        service_extraction_response = client.chat.completions.create(
-            model="gpt-4",  # or "gpt-3.5-turbo"
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a service extraction tool. Analyze the post and identify the type of service being requested. "
-                        "Respond with only the type of service (e.g., 'lawn care', 'snow removal', 'landscaping')."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": f"What type of service is being requested in this post?\n\n{content}"
-                }
-            ]
-        )
+def extract_post_details(driver, link):
+    """
+    Extracts every detail-page field from a single `page_source` snapshot.
 
-        service_type = service_extraction_response.choices[0].message.content.strip()
-
-        # Step 3: Generate a custom comment
-        custom_message_response = client.chat.completions.create(
-            model="gpt-4",  # or "gpt-3.5-turbo"
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a helpful assistant that generates polite and professional comments "
-                        "offering services to users on Nextdoor. Include the user's first name and the type of service they are requesting. "
-                        "Keep the message concise and friendly and do not sign off with anything like Warm Regards or leave my name at the end"
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        f"Generate a comment offering your services to {author}. "
-                        f"They are requesting help with {service_type}. "
-                        "Include your contact information (808-987-6065 cj@mokunebraska.com)."
-                    )
-                }
-            ]
-        )
+    The page is fetched once and parsed locally with BeautifulSoup, so a missing
+    field costs nothing extra instead of several WebDriver calls and retry sleeps.
 
-        custom_message = custom_message_response.choices[0].message.content.strip()
-        return (True, custom_message)
+    Args:
+        driver (WebDriver): Selenium WebDriver instance showing the post.
+        link (str): The post URL.
 
-    except Exception as e:
-        logging.error(f"Error classifying post: {e}")
-        return (False, None)
+    Returns:
+        PostRecord: The extracted post, with per-field defaults for anything missing.
+    """
+    soup = BeautifulSoup(driver.page_source, "html.parser")
+    fields = {
+        name: extract_text_from_soup(soup, name, default_text)
+        for name, default_text in POST_FIELD_DEFAULTS.items()
+    }
+    missing = [name for name, default_text in POST_FIELD_DEFAULTS.items() if fields[name] == default_text]
+    if missing:
+        logging.warning(f"Could not extract {', '.join(missing)} for {link}")
+    return PostRecord(link=link, **fields)
+
+
+# ---------------------------------------------------------------------------
+# 3. Harvest the search feed
+# ---------------------------------------------------------------------------
+# Returns the link and preview text of every card on the page in one round trip.
+# arguments[0] and arguments[1] are the card and link selectors in the order to try;
+# each card also reports which of them matched, for the selector statistics.
+FEED_HARVEST_SCRIPT = """
+var cardSelectors = arguments[0], linkSelectors = arguments[1];
+for (var i = 0; i < cardSelectors.length; i++) {
+    var cards = document.querySelectorAll(cardSelectors[i]);
+    if (!cards.length) continue;
+    return Array.from(cards).map(function (card) {
+        var href = null, linkSelector = null;
+        for (var j = 0; j < linkSelectors.length && href === null; j++) {
+            var link = card.querySelector(linkSelectors[j]);
+            if (link) {
+                href = link.href;
+                linkSelector = linkSelectors[j];
+            }
+        }
+        return {href: href, preview: (card.innerText || "").slice(0, 1000),
+                card_selector: cardSelectors[i], link_selector: linkSelector};
+    });
+}
+return [];
+"""
+
+
+def _record_feed_lookups(cards, seen_links, card_selectors, link_selectors):
+    """Records which feed card selector matched, and which link selector matched in each card not seen before."""
+    card_selector = cards[0].get("card_selector") if cards else None
+    if card_selector in card_selectors:
+        record_lookup("feed_card", card_selectors[:card_selectors.index(card_selector)], card_selector)
+    else:
+        record_lookup("feed_card", card_selectors)
+    for card in cards:
+        if card.get("href") in seen_links:
+            continue
+        link_selector = card.get("link_selector")
+        if link_selector in link_selectors:
+            record_lookup("feed_link", link_selectors[:link_selectors.index(link_selector)], link_selector)
+        else:
+            record_lookup("feed_link", link_selectors)
+
+
+def harvest_feed(driver, max_new, deadline, max_idle_scrolls=2, high_water_link=None,
+                 known_streak_limit=CRAWL_KNOWN_STREAK_LIMIT, seen_links=None, start_scrolls=0, on_scroll=None):
+    """
+    Scrolls the search results and collects links to posts that aren't stored yet.
+
+    Each scroll costs one `execute_script` call that returns every card's link and
+    preview text. Links already seen in this crawl or stored in the database are
+    dropped before anything is opened.
+
+    When the feed is known to list the newest posts first, harvesting can stop as
+    soon as it reaches `high_water_link` (the top post of the previous run for this
+    query) or `known_streak_limit` already-stored posts in a row, so a repeat search
+    only walks the posts added since the last run. On a feed in any other order,
+    pass neither (`known_streak_limit=0`): a stored post says nothing about the
+    posts below it.
+
+    Args:
+        driver (WebDriver): Selenium WebDriver instance showing search results.
+        max_new (int): Stop once this many new links are collected.
+        deadline (float): `time.time()` value after which harvesting stops.
+        max_idle_scrolls (int, optional): Stop after this many scrolls in a row reveal no unseen cards.
+        high_water_link (str, optional): Stop when this link is reached.
+        known_streak_limit (int, optional): Stop after this many stored posts in a row; 0 disables.
+        seen_links (set, optional): Links to treat as already collected (when resuming a harvest).
+        start_scrolls (int, optional): Scroll this many times before collecting, to get back to
+            where an interrupted harvest stopped.
+        on_scroll (callable, optional): `on_scroll(scroll_depth, new_posts, skipped, newest_link)`,
+            called before every scroll; used to checkpoint progress.
+
+    Returns:
+        (list, int, str): New (link, preview) pairs in feed order, the number of known
+        links skipped, and the link at the top of the feed (None if the feed was empty).
+    """
+    seen_links = set(seen_links or ())
+    new_posts = []
+    skipped = 0
+    known_streak = 0
+    idle_scrolls = 0
+    newest_link = None
+    stop_reason = None
+
+    scroll_depth = start_scrolls
+    if start_scrolls:
+        logging.info(f"Scrolling back to depth {start_scrolls} of the results...")
+        for _ in range(start_scrolls):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            human_pause(1, 2)
+
+    while len(new_posts) < max_new and time.time() < deadline:
+        card_selectors, link_selectors = ordered_selectors("feed_card"), ordered_selectors("feed_link")
+        with span("feed_fetch"):
+            cards = driver.execute_script(FEED_HARVEST_SCRIPT, card_selectors, link_selectors) or []
+        _record_feed_lookups(cards, seen_links, card_selectors, link_selectors)
+        unseen = [card for card in cards if card.get("href") and card["href"] not in seen_links]
+        logging.info(f"Found {len(cards)} posts on the page ({len(unseen)} not seen in this crawl).")
+
+        for card in unseen:
+            link = card["href"]
+            seen_links.add(link)
+            if newest_link is None:
+                newest_link = link
+            if link == high_water_link:
+                skipped += 1
+                stop_reason = "reached the newest post from the last run"
+                break
+            if post_exists(link):
+                skipped += 1
+                known_streak += 1
+                if known_streak_limit and known_streak >= known_streak_limit:
+                    stop_reason = f"{known_streak} already-stored posts in a row"
+                    break
+                continue
+            known_streak = 0
+            new_posts.append((link, card.get("preview") or ""))
+            if len(new_posts) >= max_new:
+                break
+
+        if stop_reason:
+            logging.info(f"Stopping early: {stop_reason}.")
+            break
+        if len(new_posts) >= max_new:
+            break
+        idle_scrolls = 0 if unseen else idle_scrolls + 1
+        if idle_scrolls >= max_idle_scrolls:
+            logging.info("No new posts found, stopping scrolling.")
+            break
+
+        if on_scroll is not None:
+            on_scroll(scroll_depth, new_posts, skipped, newest_link)
+        logging.info("Scrolling down to load more posts...")
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        scroll_depth += 1
+        human_pause(3, 6)
+
+    logging.info(f"Harvested {len(new_posts)} new post links; skipped {skipped} already stored.")
+    return new_posts, skipped, newest_link
 
 
 # ---------------------------------------------------------------------------
 # 4. Parse multiple posts from search results
 # ---------------------------------------------------------------------------
-def parse_posts(driver, max_posts=50, max_runtime=1200, verify_links=False):
+def parse_posts(driver, max_posts=50, max_runtime=1200, verify_links=False, search_query=None, newest_first=False):
     """
     Extracts posts from the search results page, processes each post, and saves them.
-    If a post is identified as a service request, generates a custom comment and prompts the user for approval.
+
+    The feed is harvested first (see `harvest_feed`), then only the new links are
+    opened, so runtime grows with the number of new posts rather than the length
+    of the results page. Classification and saving run on a ClassificationPipeline
+    while the browser moves on. Each service request's drafted comment is added to
+    the `pending_comments` queue as its post is saved, so it can be reviewed while
+    the crawl is still running; nothing here waits on a human.
 
     Args:
         driver (WebDriver): Selenium WebDriver instance.
         max_posts (int, optional): Maximum number of posts to extract. Defaults to 50.
         max_runtime (int, optional): Maximum runtime in seconds before stopping. Defaults to 1200.
         verify_links (bool, optional): Unused in current logic, but can be used if you want additional link checks.
+        search_query (str, optional): The query being crawled. When given, progress is
+            checkpointed (scroll depth, harvested and visited links), and an unfinished
+            checkpoint for the query is resumed instead of starting over.
+        newest_first (bool, optional): Whether the results are sorted newest first. Only then
+            does the harvest stop early, at the query's high-water mark in `search_state` or
+            after CRAWL_KNOWN_STREAK_LIMIT stored posts in a row, and only then is the mark
+            updated. Without it the whole feed is walked. Callers pass CRAWL_NEWEST_FIRST.
 
     Returns:
-        bool: True if the parsing completed successfully, False otherwise.
+        bool or None: True if the parsing completed, None if the browser session was lost
+        (the checkpoint is kept so the next call for the query resumes it).
     """
     logging.info("Extracting posts from the search results...")
 
     start_time = time.time()
-    processed_posts = 0
-    seen_posts = set()  # Track processed post links
-
-    while processed_posts < max_posts and (time.time() - start_time) < max_runtime:
+    deadline = start_time + max_runtime
+    queued_posts = 0
+    pipeline = ClassificationPipeline(classify_post_versioned, get_post_writer(),
+                                      classification_version=CLASSIFY_PROMPT_VERSION, find_duplicate=find_near_duplicate)
+
+    checkpoint = get_crawl_checkpoint(search_query) if search_query else None
+    state = get_search_state(search_query) if search_query else None
+    high_water_link = state["newest_link"] if state and newest_first else None
+    aborted = False
+
+    if checkpoint and checkpoint["phase"] == "visit":
+        # The feed was fully harvested before the failure; open the posts not handled yet
+        new_posts = [(link, preview) for link, preview, visited in checkpoint["links"] if not visited]
+        skipped, newest_link, caught_up = checkpoint["skipped"], checkpoint["newest_link"], checkpoint["caught_up"]
+        logging.info(f"Resuming '{search_query}' from its checkpoint: {len(new_posts)} harvested posts left to open.")
+    else:
+        # Either a fresh crawl or a harvest that was interrupted while scrolling
+        resumed = [(link, preview) for link, preview, _ in checkpoint["links"]] if checkpoint else []
+        scroll_depth = checkpoint["scroll_depth"] if checkpoint else 0
+        prior_skipped = checkpoint["skipped"] if checkpoint else 0
+        prior_newest = checkpoint["newest_link"] if checkpoint else None
+        if checkpoint:
+            logging.info(f"Resuming the harvest for '{search_query}' at scroll depth {scroll_depth} "
+                         f"with {len(resumed)} posts already collected.")
+
+        # What the harvest had collected at its last scroll, in case it fails part way
+        progress = {"harvested": [], "skipped": 0, "newest_link": None}
+
+        def save_progress(depth, harvested, harvest_skipped, harvest_newest):
+            nonlocal scroll_depth
+            scroll_depth = depth
+            progress.update(harvested=list(harvested), skipped=harvest_skipped, newest_link=harvest_newest)
+            if search_query:
+                save_crawl_checkpoint(search_query, "harvest", depth, prior_newest or harvest_newest,
+                                      prior_skipped + harvest_skipped, resumed + harvested)
+
+        harvest_failed = False
         try:
-            logging.info("Fetching post elements...")
-            post_elements = driver.find_elements(By.CSS_SELECTOR, "div[data-testid^='dwell-tracker-searchFeedItem']")
-            post_count = len(post_elements)
-            logging.info(f"Found {post_count} posts on the page.")
-
-            new_posts_found = False
-
-            for i in range(post_count):
-                try:
-                    # Refresh elements each loop to avoid stale references
-                    post_elements = driver.find_elements(By.CSS_SELECTOR, "div[data-testid^='dwell-tracker-searchFeedItem']")
-                    if i >= len(post_elements):
-                        logging.warning(f"Skipping post {i+1}: Index out of range.")
-                        continue
-
-                    logging.info(f"Processing post {i+1} of {post_count}...")
-
-                    # Extract post link
-                    link_element = post_elements[i].find_element(By.CSS_SELECTOR, "a.BaseLink__kjvg670")
-                    post_link = link_element.get_attribute("href")
-
-                    # Skip if we've already processed this link
-                    if post_link in seen_posts:
-                        logging.warning(f"Skipping post {i+1}: Already processed.")
-                        continue
-
-                    seen_posts.add(post_link)
-                    new_posts_found = True
-
-                    # Check if post already exists in DB
-                    if post_exists(post_link):
-                        logging.warning(f"Skipping duplicate post: {post_link}")
-                        continue
-
-                    logging.info("Clicking on post...")
-                    driver.execute_script("arguments[0].click();", link_element)
-                    time.sleep(random.randint(2, 5))
-
-                    # Wait for content to load
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.blocks-uj7zvs span div span span"))
-                    )
-
-                    # Extract post details
-                    author = extract_element_text(driver, ["a._3I7vNNNM.E7NPJ3WK"], "Unknown Author")
-                    location = extract_element_text(driver, ["a.post-byline-redesign.post-byline-truncated"], "Unknown Location")
-                    date = extract_element_text(driver, ["a.post-byline-redesign:not(.post-byline-truncated)"], "Unknown Date")
-                    content = extract_element_text(driver, ["div.blocks-uj7zvs span div span span"], "Content not found")
-
-                    absolute_date = convert_relative_time_to_absolute(date)
-
-                    logging.info(f"Author: {author}")
-                    logging.info(f"Location: {location}")
-                    logging.info(f"Date: {absolute_date}")
-                    logging.info(f"Content: {content[:100]}...")
-
-                    # Classify the post and generate a custom comment
-                    is_service_request, custom_message = classify_post(content, author)
-                    service_request_label = "yes" if is_service_request else "no"
-                    logging.info(f"Service Request? {'Yes' if is_service_request else 'No'}")
-
-                    # Save the post
-                    if save_post(post_link, author, absolute_date, location, content, service_request_label):
-                        processed_posts += 1
-                        logging.info(f"Post saved! Total processed: {processed_posts}/{max_posts}")
-
-                        # If it's a service request, prompt the user to approve the comment
-                        if is_service_request and custom_message:
-                            if prompt_for_approval(custom_message):
-                                logging.info("Posting the comment...")
-                                post_comment(driver, custom_message)
-                            else:
-                                logging.info("Comment not posted.")
-
-                        if processed_posts >= max_posts:
-                            logging.info(f"Reached max posts limit ({max_posts}). Stopping extraction.")
-                            return True
-
-                    logging.info("Returning to search results page...")
-                    driver.back()
-                    time.sleep(random.randint(2, 5))
-
-                except (StaleElementReferenceException, NoSuchElementException, TimeoutException) as e:
-                    logging.warning(f"Skipping post {i+1} due to element issues: {e}")
-                    continue
-                except Exception as e:
-                    logging.error(f"Error processing post {i+1}: {e}")
-                    continue
-
-            # If no new posts were found, we can stop scrolling
-            if not new_posts_found:
-                logging.info("No new posts found, stopping scrolling.")
-                break
-
-            logging.info("Scrolling down to load more posts...")
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(random.randint(3, 6))
-
+            harvested, skipped, newest_link = harvest_feed(
+                driver, max_posts - len(resumed), deadline, high_water_link=high_water_link,
+                known_streak_limit=CRAWL_KNOWN_STREAK_LIMIT if newest_first else 0,
+                seen_links={link for link, _ in resumed}, start_scrolls=scroll_depth,
+                on_scroll=save_progress,
+            )
         except Exception as e:
             logging.error(f"General error in post parsing: {e}")
+            # Keep every link collected up to the last scroll; only the rest of the feed is lost
+            harvested, skipped, newest_link = progress["harvested"], progress["skipped"], progress["newest_link"]
+            harvest_failed = True
+            aborted = not driver_alive(driver)
+        new_posts = resumed + harvested
+        skipped += prior_skipped
+        newest_link = prior_newest or newest_link
+
+        # The mark only moves once everything above the old one was harvested and opened
+        caught_up = (not aborted and not harvest_failed and len(new_posts) < max_posts
+                     and time.time() < deadline)
+        if search_query and not aborted:
+            save_crawl_checkpoint(search_query, "visit", scroll_depth, newest_link, skipped, new_posts, caught_up)
+
+    metrics.count("posts_skipped", skipped)
+    if state:
+        logging.info(f"Incremental crawl for '{search_query}': {len(new_posts)} new posts, "
+                     f"{skipped} already stored skipped (last run found {state['last_new_posts']}).")
+
+    for i, (post_link, preview) in enumerate([] if aborted else new_posts):
+        if time.time() >= deadline:
+            logging.info(f"Reached max runtime ({max_runtime}s). Stopping extraction.")
+            caught_up = False
             break
-
+        try:
+            logging.info(f"Processing post {i+1} of {len(new_posts)}...")
+            with span("detail_load"):
+                driver.get(post_link)
+                human_pause(2, 5)
+
+                # Wait for content to load. Once no content selector matches any more,
+                # waiting would only time out, so the snapshot is taken right away.
+                if not selector_exhausted("content"):
+                    try:
+                        WebDriverWait(driver, 10).until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, ", ".join(ordered_selectors("content"))))
+                        )
+                    except TimeoutException:
+                        logging.warning(f"Content of post {i+1} did not appear; extracting what loaded.")
+
+            # Extract post details from one page snapshot
+            with span("extraction"):
+                post = extract_post_details(driver, post_link)
+                if post.content == POST_FIELD_DEFAULTS["content"] and preview:
+                    post.content = preview
+                absolute_date = convert_relative_time_to_absolute(post.date)
+                posted_at = post_time_to_epoch(post.date)
+
+            logging.info(f"Author: {post.author}")
+            logging.info(f"Location: {post.location}")
+            logging.info(f"Date: {absolute_date}")
+            logging.info(f"Content: {post.content[:100]}...")
+
+            # Hand the post to the classifier pool (blocks while the queue is full).
+            # Links were already checked against the DB, so count it now and
+            # reconcile with the writer's results once the pipeline drains.
+            pipeline.submit({
+                "link": post.link,
+                "author": post.author,
+                "date": absolute_date,
+                "location": post.location,
+                "content": post.content,
+                "posted_at": posted_at,
+                "date_text": post.date,
+            })
+            queued_posts += 1
+            metrics.count("posts_queued")
+            logging.info(f"Post queued! Total queued: {queued_posts}/{max_posts}")
+
+        except (StaleElementReferenceException, NoSuchElementException, TimeoutException) as e:
+            # Left unvisited, so a resumed crawl opens it again, and the mark
+            # doesn't move past a post that was never stored
+            logging.warning(f"Skipping post {i+1} due to element issues: {e}")
+            caught_up = False
+        except Exception as e:
+            logging.error(f"Error processing post {i+1}: {e}")
+            caught_up = False
+            if not driver_alive(driver):
+                aborted = True
+                break
+        else:
+            # Only a post handed to the pipeline counts as handled
+            if search_query:
+                mark_checkpoint_visited(search_query, post_link)
+
+    # Let in-flight classifications finish before reporting
+    results = pipeline.drain()
+    flush_selector_stats()
+    processed_posts = sum(1 for result in results if result["saved"])
+    metrics.count("posts_saved", processed_posts)
     logging.info(f"Completed parsing. {processed_posts}/{max_posts} new posts extracted.")
+    if search_query and not aborted:
+        update_search_state(search_query, newest_link if caught_up and newest_first else None,
+                            processed_posts, skipped)
+        clear_crawl_checkpoint(search_query)
+    if aborted:
+        logging.error("Browser session lost. Progress is checkpointed; the crawl resumes on the next run of this query.")
+        return None
     return True
+
+
 # ---------------------------------------------------------------------------
 # 5. Post a comment if a service request is identified 
 # ---------------------------------------------------------------------------
@@ -384,7 +594,7 @@ def post_comment(driver, comment_text):
     try:
         logging.info("📜 Scrolling to the bottom of the page...")
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(random.uniform(1, 2))
+        human_pause(1, 2)
 
         # Step 1: Locate the form
         logging.info("🔎 Searching for the correct comment form...")
@@ -396,7 +606,7 @@ def post_comment(driver, comment_text):
 
         # Step 2: Click the form to ensure it's active
         driver.execute_script("arguments[0].click();", comment_form)
-        time.sleep(random.uniform(0.5, 1.5))
+        human_pause(0.5, 1.5)
 
         # Step 3: Locate the textarea inside the form
         logging.info("🔎 Searching for the textarea inside the form...")
@@ -405,17 +615,17 @@ def post_comment(driver, comment_text):
         # Step 4: Click inside the textarea to ensure activation
         logging.info("🖱 Clicking inside the textarea...")
         comment_box.click()
-        time.sleep(random.uniform(0.5, 1.5))
+        human_pause(0.5, 1.5)
 
         # Step 5: Type the comment
         logging.info("⌨️ Typing comment: " + comment_text)
         for char in comment_text:
             comment_box.send_keys(char)
-            time.sleep(random.uniform(0.05, 0.15))  # Mimic human typing
+            human_pause(0.05, 0.15)  # Mimic human typing
 
         # Step 6: Trigger an input event to enable the submit button
         driver.execute_script("arguments[0].dispatchEvent(new Event('input', { bubbles: true }));", comment_box)
-        time.sleep(random.uniform(1, 2))
+        human_pause(1, 2)
 
         # Step 7: Locate and click the submit button inside the form
         logging.info("🚀 Searching for submit button...")
@@ -425,11 +635,11 @@ def post_comment(driver, comment_text):
         if submit_button.get_attribute("aria-disabled") == "true":
             logging.warning("⚠️ Submit button is still disabled! Trying another input event...")
             driver.execute_script("arguments[0].dispatchEvent(new Event('input', { bubbles: true }));", comment_box)
-            time.sleep(random.uniform(1, 2))
+            human_pause(1, 2)
 
         logging.info("✅ Clicking submit button...")
         submit_button.click()
-        time.sleep(random.uniform(3, 5))
+        human_pause(3, 5)
 
         logging.info("✅ Comment posted successfully!")
         return True
@@ -451,24 +661,48 @@ def post_comment(driver, comment_text):
     
 
 # ---------------------------------------------------------------------------
-# 6. Prompt user to approval drafted comment 
+# 6. Post comments approved in the review queue
 # ---------------------------------------------------------------------------
-def prompt_for_approval(comment):
+def post_approved_comments(driver, limit=None):
     """
-    Prompts the user in the terminal to approve or reject a comment.
+    Posts every approved comment in the `pending_comments` queue.
+
+    Review happens elsewhere (`python review_comments.py`, or between searches in
+    main.py); this only posts what a human already approved, navigating straight
+    to each stored link.
 
     Args:
-        comment (str): The comment to be approved.
+        driver (WebDriver): Selenium WebDriver instance.
+        limit (int, optional): Maximum number of comments to post in this batch.
 
     Returns:
-        bool: True if the user approves, False otherwise.
+        int: Number of comments posted.
     """
-    print("\nGenerated Comment:")
-    print(comment)
-    response = input("\nDo you want to post this comment? (yes/no): ").strip().lower()
-    return response == "yes"
-
-
+    approved = get_comments("approved", limit)
+    if not approved:
+        return 0
+
+    logging.info(f"Posting {len(approved)} approved comments...")
+    posted = 0
+    for item in approved:
+        logging.info(f"Posting the comment for {item['author']}: {item['link']}")
+        with span("comment"):
+            driver.get(item["link"])
+            human_pause(2, 5)
+            success = post_comment(driver, item["comment"])
+        record_comment_attempt(item["id"], success)
+        posted += success
+    logging.info(f"Posted {posted}/{len(approved)} approved comments.")
+    return posted
+
+
+def driver_alive(driver):
+    """Returns True if the browser behind `driver` still responds."""
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
 
 
 def verify_login(driver):
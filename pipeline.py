@@ -0,0 +1,171 @@
+# pipeline.py
+
+"""
+This module moves post classification off the browser thread.
+
+The Selenium loop in `parse_posts` extracts a post and hands it to a
+ClassificationPipeline, which classifies and saves it on a pool of worker
+threads while the browser moves on to the next post. The input queue is
+bounded, so a slow model pushes back on the scraper instead of piling up
+posts in memory.
+
+Cross-posts (the same request posted in several neighborhoods with small
+edits) are caught by MinHash similarity before classification: they reuse
+the earlier post's label and drafted comment and are linked to it through
+`duplicate_of` instead of costing another model call.
+
+A service request's drafted comment is saved with its post, in the same
+write, so it can be reviewed while the crawl is still running.
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import queue  # Bounded hand-off between the browser thread and the workers
+import logging  # For structured logging
+import threading  # Worker threads
+
+from config import CLASSIFIER_WORKERS, CLASSIFY_QUEUE_SIZE, NEAR_DUPLICATE_ENABLED, NEAR_DUPLICATE_THRESHOLD
+from metrics import span, count
+from ledger import call_context
+from database import close_connection
+from utils import minhash, MinHashIndex
+
+_STOP = object()  # Sentinel that tells a worker to exit
+
+
+class ClassificationPipeline:
+    """
+    Classifies and saves extracted posts on a pool of worker threads.
+
+    Args:
+        classify (callable): `classify(content, author) -> (bool, str)`, e.g. `classify_post`, or
+            `-> (bool, str, version)`, e.g. `classify_post_versioned`, to store that version instead.
+            A result of (None, None) means classification failed.
+        post_writer (PostWriter): Writer that saves classified posts.
+        workers (int, optional): Number of classification threads.
+        queue_size (int, optional): Posts that may wait for a worker before `submit` blocks.
+        classification_version (str, optional): Prompt version stored with each label.
+        find_duplicate (callable, optional): `find_duplicate(signature)` returning a stored
+            near-duplicate (see `database.find_near_duplicate`) or None. Posts classified earlier
+            in this run are always checked when NEAR_DUPLICATE_ENABLED is set.
+    """
+
+    def __init__(self, classify, post_writer, workers=CLASSIFIER_WORKERS, queue_size=CLASSIFY_QUEUE_SIZE,
+                 classification_version=None, find_duplicate=None):
+        self.classify = classify
+        self.post_writer = post_writer
+        self.classification_version = classification_version
+        self.find_duplicate = find_duplicate
+        self._seen = MinHashIndex()  # Posts classified in this run, whose rows may not be saved yet
+        self._seen_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._results = []
+        self._results_lock = threading.Lock()
+        self._drained = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"classifier-{n}", daemon=True)
+            for n in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, post):
+        """
+        Queues an extracted post for classification, blocking while the queue is full.
+
+        Args:
+            post (dict): Post fields: link, author, date, location and content, plus optional
+                posted_at (epoch seconds) and date_text (the byline date as scraped).
+        """
+        if self._drained:
+            raise RuntimeError("ClassificationPipeline has already been drained")
+        self._queue.put(post)
+
+    def drain(self):
+        """
+        Waits for every queued post to be classified and saved, then stops the workers.
+
+        Returns:
+            list[dict]: One entry per submitted post with its fields plus
+            `is_service_request`, `custom_message`, `duplicate_of` (link of the earlier
+            post whose result was reused, or None) and `saved`.
+        """
+        if not self._drained:
+            self._drained = True
+            logging.info("Waiting for queued posts to finish classification...")
+            for _ in self._workers:
+                self._queue.put(_STOP)
+            for worker in self._workers:
+                worker.join()
+            self.post_writer.flush()
+
+        results = []
+        for result in self._results:
+            result["saved"] = result.pop("save_future").result()
+            results.append(result)
+        self._results = []
+        return results
+
+    def _work(self):
+        try:
+            while True:
+                post = self._queue.get()
+                if post is _STOP:
+                    return
+                try:
+                    self._process(post)
+                except Exception as e:
+                    logging.error(f"Error classifying post {post.get('link')}: {e}")
+        finally:
+            # Cache lookups, near-duplicate searches and the ledger open a connection on this thread
+            close_connection()
+
+    def _near_duplicate(self, signature):
+        """Returns (link, label, classification_version, comment) of an earlier near-duplicate, or None."""
+        with self._seen_lock:
+            match = self._seen.nearest(signature, NEAR_DUPLICATE_THRESHOLD)
+        if match is not None:
+            return (match[0],) + match[1]
+        if self.find_duplicate is not None:
+            stored = self.find_duplicate(signature)
+            if stored is not None:
+                return (stored["link"], stored["service_request"] == "yes", stored["classification_version"],
+                        stored["comment"])
+        return None
+
+    def _process(self, post):
+        signature = minhash(post["content"]) if NEAR_DUPLICATE_ENABLED else None
+        duplicate = self._near_duplicate(signature) if signature is not None else None
+        if duplicate is not None:
+            duplicate_of, is_service_request, classification_version, custom_message = duplicate
+            count("near_duplicates")
+            logging.info(f"Near-duplicate of {duplicate_of}; reusing its classification ({post['link']})")
+        else:
+            duplicate_of = None
+            with span("classification"), call_context(link=post["link"]):
+                is_service_request, custom_message, *version = self.classify(post["content"], post["author"])
+            classification_version = version[0] if version else self.classification_version
+            if is_service_request is not None and signature is not None:
+                with self._seen_lock:
+                    self._seen.add(post["link"], signature, (is_service_request, classification_version, custom_message))
+
+        if is_service_request is None:
+            # Classification failed: store the post for a later retry, not as a negative
+            service_request_label = "retry"
+            classification_version = None
+            logging.warning(f"Classification failed; marking post for retry ({post['link']})")
+        else:
+            service_request_label = "yes" if is_service_request else "no"
+            logging.info(f"Service Request? {'Yes' if is_service_request else 'No'} ({post['link']})")
+
+        # A near-duplicate's draft is already queued under the post it duplicates
+        draft = custom_message if is_service_request and not duplicate_of else None
+        save_future = self.post_writer.submit(
+            post["link"], post["author"], post["date"], post["location"], post["content"], service_request_label,
+            classification_version, post.get("posted_at"), signature, duplicate_of, post.get("date_text"), draft
+        )
+        result = dict(post, is_service_request=is_service_request, custom_message=custom_message,
+                      duplicate_of=duplicate_of, save_future=save_future)
+        with self._results_lock:
+            self._results.append(result)
@@ -0,0 +1,281 @@
+# prefilter.py
+
+"""
+A cheap local first stage in front of the LLM classifier.
+
+Most search hits plainly aren't asking for lawn care, snow removal,
+landscaping, waste removal or power washing. The prefilter scores each
+post with:
+ - seed phrases from Moku's service list, and
+ - a naive Bayes n-gram model trained on the `service_request` labels
+   already stored in the posts table.
+
+A post is only rejected locally when it has no seed phrase AND a trained
+model gives it a low probability; without a trained model everything goes to
+the LLM. Rejections are stored with `classification_version` PREFILTER_VERSION,
+so they are never mistaken for LLM labels when training or evaluating.
+
+Usage:
+    python prefilter.py train
+    python prefilter.py evaluate [--threshold 0.05] [--folds 5]
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import re  # Tokenization
+import json  # Model file format
+import math  # Log-odds
+import logging  # For structured logging
+import argparse  # Command-line interface
+import threading  # Guards the lazily loaded model
+
+from config import PREFILTER_MODEL_PATH, PREFILTER_THRESHOLD
+from database import initialize_db, iter_labelled_posts, PREFILTER_VERSION
+from utils import configure_logging
+
+# Words and two-word phrases that signal one of Moku's services, matched against
+# the same tokens the model uses. A trailing * matches any word with that prefix
+# ("mow*" matches "mowing"). Generic asks such as "recommend" or "looking for"
+# are left to the model; as seeds they would forward nearly every post.
+SERVICE_KEYWORDS = (
+    "lawn", "lawns", "mow*", "grass", "yard", "yards", "weed*", "sod", "aerat*", "edging",
+    "snow", "shovel*", "plow*", "plough*", "ice dam", "ice dams", "driveway", "driveways",
+    "landscap*", "mulch*", "shrub", "shrubs", "bush", "bushes", "hedge*", "tree", "trees",
+    "stump", "stumps", "garden", "gardening", "leaves", "leaf",
+    "clean up", "cleanup",
+    "waste", "junk", "haul*", "dump", "debris", "trash", "removal",
+    "power wash", "power washing", "pressure wash", "pressure washing", "powerwash*", "pressurewash*",
+    "siding", "deck", "decks", "handyman",
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text):
+    """Returns the unigrams and bigrams of `text` as a set."""
+    words = _TOKEN_RE.findall((text or "").lower())
+    grams = set(words)
+    grams.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return grams
+
+
+def seed_hits(text):
+    """Returns the seed phrases that appear in `text` as whole words (or word prefixes for "stem*")."""
+    grams = tokenize(text)
+    words = [gram for gram in grams if " " not in gram]
+    hits = []
+    for keyword in SERVICE_KEYWORDS:
+        if keyword.endswith("*"):
+            if any(word.startswith(keyword[:-1]) for word in words):
+                hits.append(keyword)
+        elif keyword in grams:
+            hits.append(keyword)
+    return hits
+
+
+class PrefilterModel:
+    """
+    Naive Bayes log-odds over n-grams, plus the seed phrase check.
+
+    Args:
+        weights (dict, optional): Log-odds contribution of each n-gram.
+        prior (float, optional): Log-odds of a service request before seeing any text.
+    """
+
+    def __init__(self, weights=None, prior=0.0):
+        self.weights = weights or {}
+        self.prior = prior
+
+    @property
+    def trained(self):
+        return bool(self.weights)
+
+    @classmethod
+    def train(cls, samples, min_count=2):
+        """
+        Fits the model on labelled posts.
+
+        Args:
+            samples (iterable): (content, is_service_request) pairs.
+            min_count (int, optional): Ignore n-grams seen in fewer posts than this.
+
+        Returns:
+            PrefilterModel: The trained model.
+        """
+        counts = {True: {}, False: {}}
+        docs = {True: 0, False: 0}
+        for content, label in samples:
+            docs[label] += 1
+            for gram in tokenize(content):
+                counts[label][gram] = counts[label].get(gram, 0) + 1
+
+        if not docs[True] or not docs[False]:
+            logging.warning("Prefilter needs both 'yes' and 'no' labels to train; using seed phrases only.")
+            return cls()
+
+        vocabulary = {
+            gram for gram in set(counts[True]) | set(counts[False])
+            if counts[True].get(gram, 0) + counts[False].get(gram, 0) >= min_count
+        }
+        weights = {}
+        for gram in vocabulary:
+            # Bernoulli document frequencies with Laplace smoothing
+            p_yes = (counts[True].get(gram, 0) + 1) / (docs[True] + 2)
+            p_no = (counts[False].get(gram, 0) + 1) / (docs[False] + 2)
+            weights[gram] = math.log(p_yes / p_no)
+
+        prior = math.log(docs[True] / docs[False])
+        logging.info(f"Trained prefilter on {docs[True]} 'yes' and {docs[False]} 'no' posts ({len(weights)} n-grams).")
+        return cls(weights, prior)
+
+    def probability(self, content):
+        """Estimated probability that `content` is a service request (0.5 if untrained)."""
+        if not self.trained:
+            return 0.5
+        score = self.prior + sum(self.weights.get(gram, 0.0) for gram in tokenize(content))
+        score = max(-50.0, min(50.0, score))
+        return 1 / (1 + math.exp(-score))
+
+    def should_forward(self, content, threshold=PREFILTER_THRESHOLD):
+        """
+        Decides whether a post needs the LLM.
+
+        Returns:
+            bool: False only for confident negatives (no seed phrase and a low score from a
+            trained model). An untrained model forwards everything.
+        """
+        if not self.trained or seed_hits(content):
+            return True
+        return self.probability(content) >= threshold
+
+    def save(self, path=PREFILTER_MODEL_PATH):
+        with open(path, "w", encoding="utf-8") as model_file:
+            json.dump({"prior": self.prior, "weights": self.weights}, model_file)
+        logging.info(f"Saved prefilter model to {path}.")
+
+    @classmethod
+    def load(cls, path=PREFILTER_MODEL_PATH):
+        """Loads a saved model, or returns an untrained (seed phrases only) model if there is none."""
+        try:
+            with open(path, encoding="utf-8") as model_file:
+                data = json.load(model_file)
+            return cls(data.get("weights"), data.get("prior", 0.0))
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load prefilter model from {path}: {e}")
+            return cls()
+
+
+# ---------------------------------------------------------------------------
+# Shared model used by classify_post
+# ---------------------------------------------------------------------------
+_model = None
+_model_lock = threading.Lock()
+prefilter_stats = {"forwarded": 0, "rejected": 0}
+
+
+def get_prefilter_model():
+    """Returns the shared model, loading it from PREFILTER_MODEL_PATH on first use."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = PrefilterModel.load()
+        return _model
+
+
+def passes_prefilter(content):
+    """
+    Returns True if a post should be sent to the LLM, counting the decision.
+    """
+    forward = get_prefilter_model().should_forward(content)
+    with _model_lock:
+        prefilter_stats["forwarded" if forward else "rejected"] += 1
+    return forward
+
+
+def log_prefilter_stats():
+    """Logs how many posts the prefilter forwarded to the LLM and how many it rejected."""
+    with _model_lock:
+        stats = dict(prefilter_stats)
+    total = stats["forwarded"] + stats["rejected"]
+    saved = stats["rejected"] / total if total else 0.0
+    logging.info(f"Prefilter: {stats['forwarded']} forwarded, {stats['rejected']} rejected ({saved:.0%} of API calls saved).")
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Training and evaluation against stored labels
+# ---------------------------------------------------------------------------
+def load_samples():
+    """Reads (content, is_service_request) pairs for every post labelled by the LLM."""
+    return [(content, label == "yes") for _, content, label in iter_labelled_posts()]
+
+
+def evaluate(samples, threshold=PREFILTER_THRESHOLD, folds=5):
+    """
+    Cross-validates the prefilter against stored labels.
+
+    Recall is the share of stored service requests the prefilter forwards;
+    a rejected request is a missed lead, so recall matters most.
+
+    Args:
+        samples (list): (content, is_service_request) pairs.
+        threshold (float, optional): Probability below which keyword-free posts are rejected.
+        folds (int, optional): Number of cross-validation folds.
+
+    Returns:
+        dict: precision, recall, forwarded, rejected, total and api_calls_saved (fraction).
+    """
+    folds = max(1, min(folds, len(samples)))
+    tp = fp = fn = tn = 0
+    for fold in range(folds):
+        train = [s for i, s in enumerate(samples) if folds == 1 or i % folds != fold]
+        test = [s for i, s in enumerate(samples) if folds == 1 or i % folds == fold]
+        model = PrefilterModel.train(train)
+        for content, label in test:
+            forward = model.should_forward(content, threshold)
+            if forward and label:
+                tp += 1
+            elif forward:
+                fp += 1
+            elif label:
+                fn += 1
+            else:
+                tn += 1
+
+    total = tp + fp + fn + tn
+    rejected = fn + tn
+    return {
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "forwarded": tp + fp,
+        "rejected": rejected,
+        "total": total,
+        "api_calls_saved": rejected / total if total else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("train", help="Train on stored labels and save the model.")
+    evaluate_cmd = commands.add_parser("evaluate", help="Report precision/recall against stored labels.")
+    evaluate_cmd.add_argument("--threshold", type=float, default=PREFILTER_THRESHOLD)
+    evaluate_cmd.add_argument("--folds", type=int, default=5)
+    args = parser.parse_args()
+
+    initialize_db()
+    samples = load_samples()
+
+    if args.command == "train":
+        PrefilterModel.train(samples).save()
+    elif args.command == "evaluate":
+        report = evaluate(samples, threshold=args.threshold, folds=args.folds)
+        print(f"Labelled posts:   {report['total']}")
+        print(f"Precision:        {report['precision']:.1%}")
+        print(f"Recall:           {report['recall']:.1%}")
+        print(f"Forwarded to LLM: {report['forwarded']}")
+        print(f"Rejected locally: {report['rejected']} ({report['api_calls_saved']:.1%} of API calls saved)")
@@ -0,0 +1,99 @@
+# review_comments.py
+
+"""
+Human review of drafted comments, separate from the crawl.
+
+`parse_posts` queues every drafted comment in the `pending_comments` table
+instead of blocking on input(). Review them here, in a second terminal while
+the bot keeps scraping, or between searches in main.py. Approved comments are
+posted by the bot (`post_approved_comments`) after the next search.
+
+Usage:
+    python review_comments.py            # review pending drafts
+    python review_comments.py --list     # show queue counts and pending drafts
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import logging  # For structured logging
+import argparse  # Command-line interface
+
+from database import initialize_db, get_comments, review_comment, count_comments_by_status
+from utils import configure_logging
+
+
+def prompt_for_review(item):
+    """
+    Shows a drafted comment and asks the reviewer what to do with it.
+
+    Args:
+        item (dict): Queued comment with `author`, `link` and `comment`.
+
+    Returns:
+        (str, str): The decision ("approve", "reject", "skip" or "quit") and the
+        comment text to post (edited, or the original).
+    """
+    print(f"\nService request from {item['author']}: {item['link']}")
+    print("\nGenerated Comment:")
+    print(item["comment"])
+    while True:
+        response = input("\nPost this comment? (yes/no/edit/skip/quit): ").strip().lower()
+        if response in ("yes", "y"):
+            return "approve", item["comment"]
+        if response in ("no", "n"):
+            return "reject", item["comment"]
+        if response in ("edit", "e"):
+            edited = input("New comment: ").strip()
+            if edited:
+                return "approve", edited
+        elif response in ("skip", "s", ""):
+            return "skip", item["comment"]
+        elif response in ("quit", "q"):
+            return "quit", item["comment"]
+
+
+def review_pending_comments(reviewer=prompt_for_review, limit=None):
+    """
+    Walks the reviewer through pending drafts and records each decision.
+
+    Args:
+        reviewer (callable, optional): `reviewer(item) -> (decision, comment)`. Defaults to `prompt_for_review`.
+        limit (int, optional): Maximum number of drafts to show.
+
+    Returns:
+        dict: How many drafts were approved, rejected and skipped.
+    """
+    counts = {"approved": 0, "rejected": 0, "skipped": 0}
+    for item in get_comments("pending", limit):
+        decision, comment = reviewer(item)
+        if decision == "quit":
+            break
+        if decision == "skip":
+            counts["skipped"] += 1
+            continue
+        approved = decision == "approve"
+        edited = comment if comment != item["comment"] else None
+        if review_comment(item["id"], approved, edited):
+            counts["approved" if approved else "rejected"] += 1
+        else:
+            logging.warning(f"Comment {item['id']} was already reviewed elsewhere.")
+    logging.info(f"Review finished: {counts['approved']} approved, {counts['rejected']} rejected, {counts['skipped']} skipped.")
+    return counts
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--list", action="store_true", help="Show the queue without reviewing.")
+    parser.add_argument("--limit", type=int, help="Review at most this many drafts.")
+    args = parser.parse_args()
+
+    initialize_db()
+    if args.list:
+        counts = count_comments_by_status()
+        print(", ".join(f"{status}: {count}" for status, count in sorted(counts.items())) or "Queue is empty.")
+        for item in get_comments("pending", args.limit):
+            print(f"\n[{item['id']}] {item['author']} - {item['link']}\n{item['comment']}")
+    else:
+        review_pending_comments(limit=args.limit)
@@ -0,0 +1,77 @@
+# search.py
+
+"""
+Searches stored posts through the full-text index (see database.search_posts).
+
+Words are matched against post content, author and location, best matches
+first; without words, posts are listed newest first. Results are paged with
+keyset pagination, so paging stays fast however many posts are stored.
+
+Usage:
+    python search.py lawn mowing                  # ranked matches
+    python search.py "snow removal" --label yes   # only service requests
+    python search.py --unprocessed                # newest unprocessed posts
+    python search.py gutter* --after 1.5,42       # continue from a printed cursor
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import sys  # Interactive paging only when attached to a terminal
+import logging  # For structured logging
+import argparse  # Command-line interface
+
+from database import initialize_db, search_posts
+from utils import configure_logging
+
+
+def parse_cursor(text):
+    """Parses a cursor printed by `format_cursor` ("rank,id" or "id")."""
+    parts = text.split(",")
+    if len(parts) == 2:
+        return float(parts[0]), int(parts[1])
+    return (int(parts[0]),)
+
+
+def format_cursor(cursor):
+    """Formats a search_posts cursor for the --after option."""
+    return ",".join(repr(value) for value in cursor)
+
+
+def print_page(posts):
+    """Prints one page of search results."""
+    for post in posts:
+        status = "processed" if post["processed"] else "unprocessed"
+        print(f"\n[{post['id']}] {post['author']} - {post['location']} - {post['date']} "
+              f"(service request: {post['service_request']}, {status})")
+        print(f"  {post['link']}")
+        print(f"  {' '.join((post['snippet'] or '').split())}")
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("words", nargs="*", help="Words to search for; end a word with * for a prefix match.")
+    parser.add_argument("--label", choices=("yes", "no", "retry"), help="Only posts with this service_request label.")
+    status = parser.add_mutually_exclusive_group()
+    status.add_argument("--processed", dest="processed", action="store_true", default=None,
+                        help="Only processed posts.")
+    status.add_argument("--unprocessed", dest="processed", action="store_false", help="Only unprocessed posts.")
+    parser.add_argument("--limit", type=int, default=20, help="Results per page (default 20).")
+    parser.add_argument("--after", type=parse_cursor, help="Cursor printed at the end of the previous page.")
+    args = parser.parse_args()
+
+    initialize_db()
+    text = " ".join(args.words)
+    cursor = args.after
+    while True:
+        posts, cursor = search_posts(text, args.label, args.processed, args.limit, cursor)
+        if not posts:
+            print("No matching posts.")
+            break
+        print_page(posts)
+        if cursor is None:
+            break
+        print(f"\nNext page: --after {format_cursor(cursor)}")
+        if not sys.stdin.isatty() or input("Enter for more, q to quit: ").strip().lower().startswith("q"):
+            break
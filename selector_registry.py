@@ -0,0 +1,235 @@
+# selector_registry.py
+
+"""
+Central registry of the CSS selectors the scraper depends on.
+
+Nextdoor's hashed class names change with its front-end builds, so each field
+has several candidate selectors. Lookups try the candidate with the best hit
+rate first, and every lookup records which candidate matched. The counts are
+buffered in memory and persisted in `selector_stats`, so the order carries
+over between runs. Once at least SELECTOR_MISS_RATE of a field's last
+SELECTOR_MISS_WINDOW lookups found nothing, the field counts as exhausted and
+parse_posts stops waiting for it. A field that is sometimes legitimately
+absent (a post without a location) doesn't trip this; a layout change does.
+
+Lookups where no candidate matched are counted per field, both in the run
+metrics (`selector_miss_<field>`, exported to the Prometheus textfile) and in
+`selector_field_stats`, so a site change shows up as a metric instead of
+as slow crawls.
+
+Usage:
+    python selector_registry.py report
+"""
+
+# -----------------------------
+# IMPORTS
+# -----------------------------
+import time  # Last hit/miss timestamps
+import atexit  # Persist buffered counts on exit
+import logging  # For structured logging
+import argparse  # Command-line interface
+import threading  # Counts are shared by every caller in the process
+from collections import deque  # Recent lookup outcomes per field
+
+import metrics
+from config import SELECTOR_MISS_WINDOW, SELECTOR_MISS_RATE
+from database import initialize_db, get_selector_stats, save_selector_stats, selector_report
+from utils import configure_logging
+
+# Candidate selectors per field, in declaration order. The first one is the
+# selector the scraper has always used; the rest rely on attributes that
+# survive a class-name change. Declaration order breaks ties in hit rate.
+# Author and location have no fallback yet: profile and neighborhood links
+# also appear in the page header and navigation, so an unscoped href match
+# would return the wrong text instead of missing.
+SELECTOR_CANDIDATES = {
+    # Post detail page
+    "author": ["a._3I7vNNNM.E7NPJ3WK"],
+    "location": ["a.post-byline-redesign.post-byline-truncated"],
+    "date": ["a.post-byline-redesign:not(.post-byline-truncated)", "time"],
+    "content": [
+        "div.blocks-uj7zvs span div span span",
+        "div[class^='blocks-'] span div span span",
+        "[data-testid='post-body']",
+    ],
+    # Search results feed
+    "feed_card": ["div[data-testid^='dwell-tracker-searchFeedItem']", "div[data-testid*='searchFeedItem']"],
+    "feed_link": ["a.BaseLink__kjvg670", "a[href*='/p/']"],
+}
+
+
+# ---------------------------------------------------------------------------
+# 1. Registry
+# ---------------------------------------------------------------------------
+class SelectorRegistry:
+    """
+    Orders candidate selectors by hit rate and counts hits and misses.
+
+    Stored counts are loaded on first use. New counts are kept in memory until
+    `flush()`, so recording a lookup never waits on SQLite.
+
+    Args:
+        candidates (dict): Field name -> candidate selectors.
+        miss_window (int, optional): Recent lookups per field considered by `exhausted`.
+        miss_rate (float, optional): Share of those lookups that must have missed.
+    """
+
+    def __init__(self, candidates=SELECTOR_CANDIDATES, miss_window=SELECTOR_MISS_WINDOW,
+                 miss_rate=SELECTOR_MISS_RATE):
+        self.candidates = {field: list(selectors) for field, selectors in candidates.items()}
+        self.miss_window = miss_window
+        self.miss_rate = miss_rate
+        self._stats = None  # (field, selector) -> [hits, misses], stored plus unflushed
+        self._pending = {}  # (field, selector) -> [hits, misses, last_hit_at, last_miss_at]
+        self._pending_fields = {}  # field -> [lookups, misses, last_miss_at]
+        self._recent = {}  # field -> whether each of its last `miss_window` lookups missed
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._stats is None:
+            self._stats = {key: list(counts) for key, counts in get_selector_stats().items()}
+
+    def ordered(self, field):
+        """
+        Returns the candidates for `field`, most reliable first.
+
+        Candidates are ranked by their smoothed hit rate, (hits + 1) / (hits + misses + 2),
+        so a candidate that was never tried ranks between ones that work and ones that don't.
+        """
+        with self._lock:
+            self._load()
+
+            def rank(item):
+                position, selector = item
+                hits, misses = self._stats.get((field, selector), (0, 0))
+                return -(hits + 1) / (hits + misses + 2), position
+
+            return [selector for _, selector in sorted(enumerate(self.candidates[field]), key=rank)]
+
+    def _exhausted(self, field):
+        recent = self._recent.get(field, ())
+        return len(recent) >= self.miss_window and sum(recent) >= self.miss_rate * len(recent)
+
+    def exhausted(self, field):
+        """True once at least `miss_rate` of the field's last `miss_window` lookups found nothing."""
+        with self._lock:
+            return self._exhausted(field)
+
+    def _count(self, field, selector, hit, now):
+        # Index 0/2 are hits and last hit time, 1/3 misses and last miss time
+        self._stats.setdefault((field, selector), [0, 0])[0 if hit else 1] += 1
+        pending = self._pending.setdefault((field, selector), [0, 0, None, None])
+        pending[0 if hit else 1] += 1
+        pending[2 if hit else 3] = now
+
+    def record(self, field, missed, hit=None):
+        """
+        Records one lookup of `field`.
+
+        Args:
+            field (str): Field looked up.
+            missed (list): Candidates that matched nothing.
+            hit (str, optional): The candidate that matched, or None if none did.
+        """
+        now = time.time()
+        with self._lock:
+            self._load()
+            for selector in missed:
+                self._count(field, selector, False, now)
+            if hit:
+                self._count(field, hit, True, now)
+
+            field_counts = self._pending_fields.setdefault(field, [0, 0, None])
+            field_counts[0] += 1
+            was_exhausted = self._exhausted(field)
+            self._recent.setdefault(field, deque(maxlen=self.miss_window)).append(not hit)
+            now_exhausted = self._exhausted(field)
+            if hit:
+                return
+            field_counts[1] += 1
+            field_counts[2] = now
+
+        metrics.count(f"selector_miss_{field}")
+        if now_exhausted and not was_exhausted:
+            logging.warning(f"⚠️ No selector for '{field}' matched in {sum(self._recent[field])} of the last "
+                            f"{self.miss_window} lookups; the page layout may have changed "
+                            f"(see `python selector_registry.py report`).")
+
+    def flush(self):
+        """Adds the buffered counts to `selector_stats` and `selector_field_stats`."""
+        with self._lock:
+            selector_rows = [(field, selector, *counts) for (field, selector), counts in self._pending.items()]
+            field_rows = [(field, *counts) for field, counts in self._pending_fields.items()]
+            self._pending = {}
+            self._pending_fields = {}
+        if selector_rows or field_rows:
+            save_selector_stats(selector_rows, field_rows)
+
+
+_registry = SelectorRegistry()
+
+
+def ordered_selectors(field):
+    """Candidates for `field`, most reliable first (see SelectorRegistry.ordered)."""
+    return _registry.ordered(field)
+
+
+def selector_exhausted(field):
+    """True once most of the field's recent lookups found nothing (see SelectorRegistry.exhausted)."""
+    return _registry.exhausted(field)
+
+
+def record_lookup(field, missed, hit=None):
+    """Records one lookup of `field` (see SelectorRegistry.record)."""
+    _registry.record(field, missed, hit)
+
+
+def flush_selector_stats():
+    """Persists the buffered hit/miss counts."""
+    _registry.flush()
+
+
+# Never lose buffered counts on a normal interpreter exit
+atexit.register(flush_selector_stats)
+
+
+# ---------------------------------------------------------------------------
+# 2. Report
+# ---------------------------------------------------------------------------
+def _format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp)) if timestamp else "never"
+
+
+def print_report():
+    """Prints each field's lookups and misses, then its candidates in the order they are tried."""
+    fields = selector_report()
+    if not fields:
+        print("No selector lookups recorded.")
+        return fields
+
+    for field in fields:
+        miss_rate = field["misses"] / field["lookups"] if field["lookups"] else 0.0
+        print(f"\n{field['field']}: {field['lookups']} lookups, {field['misses']} found nothing "
+              f"({miss_rate:.0%}), last miss {_format_time(field['last_miss_at'])}")
+        stored = {row["selector"]: row for row in field["selectors"]}
+        order = _registry.ordered(field["field"]) if field["field"] in _registry.candidates else []
+        for selector in order + [s for s in stored if s not in order]:
+            row = stored.get(selector, {"hits": 0, "misses": 0, "last_hit_at": None})
+            tried = row["hits"] + row["misses"]
+            rate = f"{row['hits'] / tried:>6.0%}" if tried else f"{'-':>6}"
+            note = "" if selector in order else "  (no longer registered)"
+            print(f"  {rate}  {row['hits']:>7} hits {row['misses']:>7} misses  "
+                  f"last hit {_format_time(row['last_hit_at'])}  {selector}{note}")
+    return fields
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("report", help="Hit rates per field and candidate selector.")
+    args = parser.parse_args()
+
+    initialize_db()
+    if args.command == "report":
+        print_report()
@@ -9,11 +9,104 @@ and generally improve code quality.
 # -----------------------------
 # IMPORTS
 # -----------------------------
+import re  # Used to parse timestamps
+import math  # Used to size the Bloom filter
+import time  # Used for human-like pauses
+import random  # Used for human-like pauses
+import logging  # Used to configure logging for command-line entry points
+import hashlib  # Used to hash Bloom filter entries and MinHash shingles
 from datetime import datetime, timedelta  # Used for time calculations
 
+from config import HUMAN_DELAY_SCALE
+from metrics import span
+
 # ---------------------------------------------------------------------------
 # 1. Convert relative time to absolute
 # ---------------------------------------------------------------------------
+# Relative phrases such as "3 hr ago", "an hour ago", "1 wk" or "2 mos ago":
+# (pattern for the unit, seconds per unit). Months and years are approximate.
+_AMOUNT = r"\b(\d+|an?|one)\s*"
+RELATIVE_TIME_UNITS = (
+    (re.compile(_AMOUNT + r"(?:s|secs?|seconds?)\b", re.I), 1),
+    (re.compile(_AMOUNT + r"(?:m|mins?|minutes?)\b", re.I), 60),
+    (re.compile(_AMOUNT + r"(?:h|hrs?|hours?)\b", re.I), 3600),
+    (re.compile(_AMOUNT + r"(?:d|days?)\b", re.I), 86400),
+    (re.compile(_AMOUNT + r"(?:w|wks?|weeks?)\b", re.I), 7 * 86400),
+    (re.compile(_AMOUNT + r"(?:mos?|months?)\b", re.I), 30 * 86400),
+    (re.compile(_AMOUNT + r"(?:y|yrs?|years?)\b", re.I), 365 * 86400),
+)
+
+# Phrases without a number, and how long ago they mean
+RELATIVE_TIME_PHRASES = (
+    (re.compile(r"\bjust now\b|\bnow\b|\bmoments? ago\b", re.I), 0),
+    (re.compile(r"\btoday\b", re.I), 0),
+    (re.compile(r"\byesterday\b", re.I), 86400),
+)
+
+# Absolute formats, including the 'MM/DD/YY, HH:MM' strings stored in posts.date.
+# Formats without a year are taken as the most recent such date.
+ABSOLUTE_TIME_FORMATS = (
+    "%m/%d/%y, %H:%M",
+    "%m/%d/%y",
+    "%m/%d/%Y",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+    "%b %d, %Y",
+    "%B %d, %Y",
+    "%b %d at %I:%M %p",
+    "%b %d",
+    "%B %d",
+)
+
+
+def parse_post_time(text, now=None):
+    """
+    Parses a Nextdoor timestamp ("5 min ago", "1 wk ago", "Yesterday", "Feb 16",
+    "02/16/25, 22:35", ...) into a datetime.
+
+    Args:
+        text (str): Timestamp text, possibly with extra byline text around it.
+        now (datetime, optional): Reference time for relative phrases. Defaults to now.
+
+    Returns:
+        datetime or None: The parsed time, or None if the text isn't recognized.
+    """
+    now = now or datetime.now()
+    text = " ".join((text or "").replace("\u00b7", " ").split())
+    if not text:
+        return None
+
+    for fmt in ABSOLUTE_TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if "%y" not in fmt.lower():
+            parsed = parsed.replace(year=now.year)
+            if parsed > now:
+                parsed = parsed.replace(year=now.year - 1)
+        return parsed
+
+    for pattern, seconds in RELATIVE_TIME_UNITS:
+        match = pattern.search(text)
+        if match:
+            amount = match.group(1).lower()
+            amount = 1 if amount in ("a", "an", "one") else int(amount)
+            return now - timedelta(seconds=amount * seconds)
+
+    for pattern, seconds in RELATIVE_TIME_PHRASES:
+        if pattern.search(text):
+            return now - timedelta(seconds=seconds)
+    return None
+
+
+def post_time_to_epoch(text, now=None):
+    """Returns `parse_post_time(text, now)` as integer epoch seconds, or None if unrecognized."""
+    parsed = parse_post_time(text, now)
+    return int(parsed.timestamp()) if parsed is not None else None
+
+
 def convert_relative_time_to_absolute(relative_time):
     """
     Converts relative timestamps (e.g., '1 hr ago', '2 days ago')
@@ -25,22 +118,13 @@ def convert_relative_time_to_absolute(relative_time):
     Returns:
         str: The converted date/time in 'MM/DD/YY, HH:MM' format.
     """
-
     # 1) Get the current time
     current_time = datetime.now()
 
     try:
-        # 2) Check the format of the relative time
-        if "min ago" in relative_time:
-            minutes = int(relative_time.split()[0])
-            absolute_time = current_time - timedelta(minutes=minutes)
-        elif "hr ago" in relative_time:
-            hours = int(relative_time.split()[0])
-            absolute_time = current_time - timedelta(hours=hours)
-        elif "day ago" in relative_time or "days ago" in relative_time:
-            days = int(relative_time.split()[0])
-            absolute_time = current_time - timedelta(days=days)
-        else:
+        # 2) Parse anything listed in the format tables above
+        absolute_time = parse_post_time(relative_time, current_time)
+        if absolute_time is None:
             # 3) If we don't recognize the format, default to now
             print(f"⚠️ Unrecognized date format: {relative_time}. Using current time.")
             return current_time.strftime("%m/%d/%y, %H:%M")
@@ -54,8 +138,193 @@ def convert_relative_time_to_absolute(relative_time):
         return current_time.strftime("%m/%d/%y, %H:%M")
 
 
+# ---------------------------------------------------------------------------
+# 2. Bloom filter for fast membership checks
+# ---------------------------------------------------------------------------
+class BloomFilter:
+    """
+    A fixed-size Bloom filter over strings.
+
+    `item in bloom` is False only if the item was never added; a True answer
+    may be a false positive (at roughly `error_rate` once `capacity` items are in).
+
+    Args:
+        capacity (int): Number of items the filter is sized for.
+        error_rate (float): Target false-positive rate at full capacity.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, int(capacity))
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: two 64-bit halves of one digest give all k positions
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        """Adds an item to the filter."""
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+# ---------------------------------------------------------------------------
+# 3. Human-like pauses
+# ---------------------------------------------------------------------------
+# Multiplier applied to every human_pause; offline benchmarks set it to 0
+_human_delay_scale = HUMAN_DELAY_SCALE
+
+
+def set_human_delay_scale(scale):
+    """
+    Scales all human-like pauses (1.0 = normal, 0 = no waiting).
+
+    Args:
+        scale (float): Multiplier for the pause length.
+    """
+    global _human_delay_scale
+    _human_delay_scale = scale
+
+
+def human_pause(low, high):
+    """
+    Sleeps for a random time between `low` and `high` seconds to mimic a person.
 
+    Args:
+        low (float): Shortest pause in seconds.
+        high (float): Longest pause in seconds.
+    """
+    if _human_delay_scale > 0:
+        with span("pause"):
+            time.sleep(random.uniform(low, high) * _human_delay_scale)
 
 
+# ---------------------------------------------------------------------------
+# 4. Near-duplicate fingerprints (MinHash)
+# ---------------------------------------------------------------------------
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16  # 16 bands of 4 rows: pairs above ~0.5 Jaccard usually share a band
+_MINHASH_PRIME = (1 << 61) - 1
+_MINHASH_TOKEN_RE = re.compile(r"[a-z0-9']+")
+# Fixed seed, so signatures stored in the database stay comparable across runs
+_minhash_rng = random.Random(20240216)
+_MINHASH_PARAMS = [
+    (_minhash_rng.randrange(1, _MINHASH_PRIME), _minhash_rng.randrange(0, _MINHASH_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
 
 
+def minhash(text, min_tokens=5):
+    """
+    Computes a MinHash signature of the word bigrams in `text`.
+
+    The share of equal positions in two signatures estimates the Jaccard
+    similarity of the two posts' bigram sets, so a cross-post with a few words
+    changed scores ~0.8 while unrelated posts score ~0.
+
+    Args:
+        text (str): Post content.
+        min_tokens (int, optional): Shorter texts get no signature; they match too easily.
+
+    Returns:
+        tuple[int] or None: MINHASH_PERMUTATIONS 32-bit values, or None if the text is too short.
+    """
+    tokens = _MINHASH_TOKEN_RE.findall((text or "").lower())
+    if len(tokens) < min_tokens:
+        return None
+    shingles = {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for shingle in shingles
+    ]
+    return tuple(
+        min((a * h + b) % _MINHASH_PRIME for h in hashes) & 0xFFFFFFFF
+        for a, b in _MINHASH_PARAMS
+    )
+
+
+def estimate_jaccard(signature_a, signature_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / len(signature_a)
+
+
+def minhash_bands(signature, bands=MINHASH_BANDS):
+    """
+    Hashes each band of a signature into an index key.
+
+    Returns:
+        list: (band number, 56-bit key) pairs; two signatures sharing a pair are candidates.
+    """
+    rows = len(signature) // bands
+    keys = []
+    for band in range(bands):
+        chunk = ",".join(map(str, signature[band * rows:(band + 1) * rows]))
+        keys.append((band, int.from_bytes(hashlib.blake2b(chunk.encode("ascii"), digest_size=7).digest(), "little")))
+    return keys
+
+
+class MinHashIndex:
+    """
+    In-memory near-duplicate lookup over MinHash signatures (LSH banding).
+
+    Each signature is filed under its band keys, so a lookup only compares
+    against signatures that share a band instead of scanning everything.
+    """
+
+    def __init__(self, bands=MINHASH_BANDS):
+        self.bands = bands
+        self.buckets = {}
+        self.items = {}
+
+    def add(self, key, signature, value=None):
+        """Indexes `signature` under `key`, with an optional payload."""
+        if signature is None or key in self.items:
+            return
+        self.items[key] = (signature, value)
+        for band_key in minhash_bands(signature, self.bands):
+            self.buckets.setdefault(band_key, []).append(key)
+
+    def nearest(self, signature, threshold):
+        """
+        Finds the most similar indexed signature with estimated Jaccard >= `threshold`.
+
+        Returns:
+            (key, value, similarity) or None.
+        """
+        if signature is None:
+            return None
+        best = None
+        for band_key in minhash_bands(signature, self.bands):
+            for key in self.buckets.get(band_key, ()):
+                candidate, value = self.items[key]
+                similarity = estimate_jaccard(signature, candidate)
+                if similarity >= threshold and (best is None or similarity > best[2]):
+                    best = (key, value, similarity)
+        return best
+
+
+# ---------------------------------------------------------------------------
+# 5. Logging setup for entry points
+# ---------------------------------------------------------------------------
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+def configure_logging(level=logging.INFO):
+    """
+    Sets up root logging for a command-line entry point.
+
+    Library modules only log; the script being run calls this once from its
+    `__main__` block, so importing a module never configures logging as a side effect.
+
+    Args:
+        level (int, optional): Root log level. Benchmarks pass logging.WARNING.
+    """
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+    logging.getLogger().setLevel(level)